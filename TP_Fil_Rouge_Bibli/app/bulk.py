@@ -0,0 +1,246 @@
+import codecs
+import csv
+import json
+
+from fastapi import Request
+from pydantic import ValidationError
+from sqlalchemy import insert, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.cache import invalidate_authors, invalidate_books
+from app.database import Database
+from app.models.author import Author
+from app.models.book import Book
+from app.schemas.author import AuthorCreate
+from app.schemas.book import BookCreate
+from app.schemas.common import BulkImportReport, BulkRowError
+from app.schemas.validators import book_errors
+
+# Lignes validées et insérées par transaction
+BULK_CHUNK_SIZE = 1000
+
+# Lignes en erreur détaillées dans le rapport (les suivantes sont seulement comptées)
+BULK_MAX_ERRORS = 1000
+
+
+class StreamError(Exception):
+    """Le corps ne peut plus être lu (encodage, en-tête CSV) : la lecture s'arrête là."""
+
+
+def _format(request: Request, format: str | None) -> str:
+    """Format du corps : paramètre format, sinon Content-Type (NDJSON par défaut)."""
+    if format:
+        return format
+    content_type = request.headers.get("content-type", "")
+    return "csv" if content_type.split(";")[0].strip() in ("text/csv", "application/csv") else "ndjson"
+
+
+async def _lines(request: Request):
+    """Lignes du corps au fil de sa réception, sans le charger en entier."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for data in request.stream():
+            pending += decoder.decode(data)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise StreamError("Le fichier doit être encodé en UTF-8")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _ndjson_records(request: Request):
+    """(ligne, objet, erreur) pour chaque ligne non vide d'un corps NDJSON."""
+    line_number = 0
+    async for line in _lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, f"JSON invalide : {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Chaque ligne doit être un objet JSON"
+            continue
+        yield line_number, data, None
+
+
+async def _csv_records(request: Request, model):
+    """(ligne, objet, erreur) pour chaque enregistrement d'un CSV avec en-tête.
+
+    Un champ entre guillemets peut contenir des retours à la ligne :
+    l'enregistrement est complet quand le nombre de guillemets lus est pair.
+    Les champs vides sont omis (valeur par défaut du schéma).
+    """
+    header = None
+    buffer = []
+    quotes = 0
+    start = line_number = 0
+    async for line in _lines(request):
+        line_number += 1
+        if not buffer:
+            start = line_number
+        buffer.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "\n".join(buffer)
+        buffer, quotes = [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+
+        if header is None:
+            header = [name.strip() for name in values]
+            required = [name for name, field in model.model_fields.items() if field.is_required()]
+            missing = [name for name in required if name not in header]
+            if missing:
+                raise StreamError("Colonnes manquantes dans l'en-tête CSV : " + ", ".join(missing))
+            continue
+        if len(values) != len(header):
+            yield start, None, f"{len(values)} valeurs pour {len(header)} colonnes"
+            continue
+        yield start, {name: value for name, value in zip(header, values) if value != ""}, None
+
+    if buffer:
+        yield start, None, "Guillemet non fermé en fin de fichier"
+
+
+def _reject(report: BulkImportReport, line: int, errors: list[str]):
+    report.rejected += 1
+    if len(report.errors) < BULK_MAX_ERRORS:
+        report.errors.append(BulkRowError(line=line, errors=errors))
+    else:
+        report.errors_truncated = True
+
+
+def _validate(records: list, schema, report: BulkImportReport) -> list:
+    """Valide chaque objet avec le schéma de création ; retourne [(ligne, objet validé)]."""
+    valid = []
+    for line, data, error in records:
+        if error:
+            _reject(report, line, [error])
+            continue
+        try:
+            valid.append((line, schema.model_validate(data)))
+        except ValidationError as exc:
+            _reject(report, line, [f"{'.'.join(map(str, err['loc']))} : {err['msg']}" for err in exc.errors()])
+    return valid
+
+
+def _insert(session: Session, model, rows: list[dict], lines: list[int], report: BulkImportReport) -> bool:
+    """Insère le lot en une transaction (executemany) ; retourne True si au moins une ligne est insérée.
+
+    Si la base refuse le lot (contrainte violée par une écriture
+    concurrente...), il est coupé en deux et chaque moitié réessayée :
+    seules les lignes fautives sont rejetées, en log(n) essais par ligne.
+    """
+    if not rows:
+        return False
+    try:
+        session.exec(insert(model), params=rows)
+        session.commit()
+    except IntegrityError as exc:
+        session.rollback()
+        if len(rows) == 1:
+            _reject(report, lines[0], [f"Erreur d'insertion : {exc.orig}"])
+            return False
+        middle = len(rows) // 2
+        first = _insert(session, model, rows[:middle], lines[:middle], report)
+        second = _insert(session, model, rows[middle:], lines[middle:], report)
+        return first or second
+    report.inserted += len(rows)
+    return True
+
+
+def import_books_chunk(session: Session, records: list, report: BulkImportReport):
+    """Valide et insère un lot de livres : une requête pour les auteurs, une pour les ISBN."""
+    valid = []
+    for line, book in _validate(records, BookCreate, report):
+        errors = book_errors(book)
+        if errors:
+            _reject(report, line, errors)
+        else:
+            valid.append((line, book))
+
+    author_ids = {book.author_id for _, book in valid}
+    isbns = {book.isbn for _, book in valid}
+    known_authors = set(session.exec(select(Author.id).where(Author.id.in_(author_ids))).all()) if author_ids else set()
+    taken = set(session.exec(select(Book.isbn).where(Book.isbn.in_(isbns))).all()) if isbns else set()
+
+    rows, lines = [], []
+    for line, book in valid:
+        if book.author_id not in known_authors:
+            _reject(report, line, ["Auteur inexistant"])
+        elif book.isbn in taken:
+            _reject(report, line, [f"Un livre avec l'ISBN {book.isbn} existe déjà"])
+        else:
+            taken.add(book.isbn)  # doublon plus loin dans le même lot
+            rows.append(book.model_dump())
+            lines.append(line)
+
+    if _insert(session, Book, rows, lines, report):
+        invalidate_books()
+
+
+def import_authors_chunk(session: Session, records: list, report: BulkImportReport):
+    """Valide et insère un lot d'auteurs : une requête pour les noms déjà pris."""
+    valid = _validate(records, AuthorCreate, report)
+
+    names = {(author.first_name, author.last_name) for _, author in valid}
+    taken = set()
+    if names:
+        statement = select(Author.first_name, Author.last_name).where(
+            tuple_(Author.first_name, Author.last_name).in_(names)
+        )
+        taken = {tuple(row) for row in session.exec(statement).all()}
+
+    rows, lines = [], []
+    for line, author in valid:
+        name = (author.first_name, author.last_name)
+        if name in taken:
+            _reject(report, line, [f"Un auteur avec le nom {author.first_name} {author.last_name} existe déjà"])
+        else:
+            taken.add(name)
+            rows.append(author.model_dump())
+            lines.append(line)
+
+    if _insert(session, Author, rows, lines, report):
+        invalidate_authors()
+
+
+async def bulk_import(request: Request, format: str | None, chunk_size: int, schema, db: Database, import_chunk) -> BulkImportReport:
+    """Lit le corps (NDJSON ou CSV) au fil de l'eau et confie chaque lot à import_chunk(session, lot, rapport).
+
+    Chaque lot passe par db.run, sans bloquer la boucle d'événements
+    (voir app/database.py). Chaque lot est
+    validé puis inséré dans sa propre transaction : une erreur n'annule
+    que les lignes concernées, les lots déjà importés restent en base.
+    Si le corps devient illisible (StreamError), les lignes lues jusque-là
+    sont importées et le rapport porte l'erreur dans `error`.
+    """
+    if _format(request, format) == "csv":
+        records = _csv_records(request, schema)
+    else:
+        records = _ndjson_records(request)
+
+    report = BulkImportReport()
+    chunk = []
+    try:
+        async for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                await db.run(import_chunk, chunk, report)
+                chunk = []
+    except StreamError as exc:
+        report.error = str(exc)
+    if chunk:
+        await db.run(import_chunk, chunk, report)
+    report.errors.sort(key=lambda error: error.line)
+    return report
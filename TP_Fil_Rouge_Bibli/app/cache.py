@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.pagination import invalidate_counts
+
+# Nombre maximal de réponses gardées (les moins récemment lues sont évincées au-delà)
+CACHE_MAX_ENTRIES = 1024
+
+# Durée de vie (secondes) d'une réponse en cache, même sans écriture
+CACHE_TTL = 60
+
+
+class ResponseCache:
+    """Cache LRU + TTL des réponses GET, avec invalidation par étiquettes.
+
+    Chaque réponse est rangée sous une clé (route + paramètres normalisés)
+    et porte des étiquettes ("books", "book:12"...) : une écriture invalide
+    exactement les réponses qui portent son étiquette. La réponse est
+    sérialisée une fois ; son ETag est le hash du corps, et Last-Modified
+    la date de la dernière écriture sur ses étiquettes.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, bytes, str, float, tuple]] = OrderedDict()
+        self._by_tag: dict[str, set[tuple]] = {}
+        self._modified: dict[str, float] = {}
+        self._started = time.time()
+        self._version = 0  # incrémenté à chaque invalidation
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "expirations": 0,
+                         "invalidations": 0}
+
+    @staticmethod
+    def make_key(route: str, **params) -> tuple:
+        """Clé normalisée : paramètres absents ignorés, ordre indifférent, recherche sans casse ni espaces superflus."""
+        normalized = []
+        for name, value in sorted(params.items()):
+            if value is None:
+                continue
+            if name == "search":
+                value = " ".join(value.lower().split())
+            normalized.append((name, value))
+        return (route, *normalized)
+
+    def _remove(self, key: tuple):
+        _, _, _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def _get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry
+
+    def _put(self, key: tuple, body: bytes, tags: tuple, version: int):
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        with self._lock:
+            last_modified = max((self._modified.get(tag, self._started) for tag in tags), default=self._started)
+            entry = (time.monotonic() + self.ttl, body, etag, last_modified, tags)
+            if version != self._version:
+                return entry  # une écriture a eu lieu pendant la lecture : réponse servie mais pas gardée
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+        return entry
+
+    async def serve(self, request: Request, key: tuple, tags: tuple, build) -> Response:
+        """Répond depuis le cache, ou attend build() (qui retourne un modèle pydantic) et met le résultat en cache.
+
+        Une requête conditionnelle (If-None-Match / If-Modified-Since) dont la
+        version est à jour reçoit un 304 sans corps.
+        """
+        version = self._version
+        entry = self._get(key)
+        if entry is None:
+            result: BaseModel = await build()
+            entry = self._put(key, result.model_dump_json().encode("utf-8"), tags, version)
+        _, body, etag, last_modified, _ = entry
+        headers = {"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True)}
+
+        if self._not_modified(request, etag, last_modified):
+            with self._lock:
+                self.counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                # Last-Modified est à la seconde près
+                return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def invalidate(self, *tags: str):
+        """Retire les réponses qui portent l'une de ces étiquettes et date la modification."""
+        now = time.time()
+        with self._lock:
+            self._version += 1
+            for tag in tags:
+                self._modified[tag] = now
+                for key in list(self._by_tag.get(tag, ())):
+                    self._remove(key)
+                    self.counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else None,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_books(book_id: int | None = None):
+    """À appeler après chaque écriture sur les livres : listes, fiche du livre et totaux en cache."""
+    response_cache.invalidate("books", *([f"book:{book_id}"] if book_id is not None else []))
+    invalidate_counts("books")
+
+
+def invalidate_authors():
+    """À appeler après chaque écriture sur les auteurs."""
+    response_cache.invalidate("authors")
+    invalidate_counts("authors")
@@ -1,16 +1,71 @@
+import os
+
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import SQLModel, Session, create_engine
 
+from app.search import create_search_index
+
 DATABASE_URL = "sqlite:///./db.sqlite3"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./db.sqlite3"
+
+# async (défaut) : moteur aiosqlite, les routes attendent la base sans occuper de thread ;
+# sync : moteur synchrone, chaque requête occupe un thread du pool le temps de ses requêtes SQL
+DB_MODE = os.environ.get("DB_MODE", "async")
+
 engine = create_engine(DATABASE_URL,
     echo=True,
     connect_args={"check_same_thread": False},)
 
+async_engine = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    create_search_index(engine)
 
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+
+async def get_async_session():
+    # expire_on_commit=False : les objets restent lisibles après commit sans recharger (pas de lazy load hors await)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+class Database:
+    """Exécute une fonction f(session, ...) écrite avec l'API synchrone, quel que soit le moteur.
+
+    En mode async, f tourne via AsyncSession.run_sync : ses requêtes passent
+    par aiosqlite et la boucle d'événements reste libre pendant les I/O.
+    En mode sync, f tourne dans le pool de threads avec une Session classique.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, function, *args, **kwargs):
+        if isinstance(self.session, Session):
+            return await run_in_threadpool(function, self.session, *args, **kwargs)
+        return await self.session.run_sync(function, *args, **kwargs)
+
+
+async def get_db():
+    if async_engine is None:
+        session = Session(engine)
+        try:
+            yield Database(session)
+        finally:
+            # fermeture hors du pool de threads : si tous les threads attendent une connexion,
+            # c'est elle qui la rend au pool
+            session.close()
+        return
+    async for session in get_async_session():
+        yield Database(session)
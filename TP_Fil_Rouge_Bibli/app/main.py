@@ -1,5 +1,6 @@
 from fastapi import FastAPI
-from app.database import create_db_and_tables
+from app.cache import response_cache
+from app.database import async_engine, create_db_and_tables
 from app.routers.author import router as authors_router
 from app.routers.book import router as books_router
 from app.routers.loan import router as loans_router
@@ -15,6 +16,15 @@ app.include_router(loans_router)
 def root():
     return {"status": "ok"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    return response_cache.stats()
+
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if async_engine is not None:
+        await async_engine.dispose()
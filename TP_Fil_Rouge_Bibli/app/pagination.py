@@ -0,0 +1,132 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import Date, text, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, func, select
+
+# Durée de vie (secondes) d'un total mis en cache avec total=cached
+COUNT_CACHE_TTL = 60
+
+# Taille maximale du cache des totaux (le plus ancien est retiré au-delà)
+COUNT_CACHE_SIZE = 1024
+
+_count_cache: dict[tuple, tuple[float, int]] = {}
+_count_lock = threading.Lock()  # les routes synchrones (DB_MODE=sync) tournent dans plusieurs threads
+_count_generation: dict[str, int] = {}  # incrémenté par invalidate_counts
+
+
+def encode_cursor(sort_by: str, order: str, value, row_id: int) -> str:
+    """Curseur opaque : clé de tri + id de la dernière ligne renvoyée."""
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort_by, "o": order, "k": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str, order: str, column):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        value, row_id = payload["k"], int(payload["id"])
+        if payload["s"] != sort_by or payload["o"] != order:
+            raise ValueError
+        if isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide pour ce tri")
+    return value, row_id
+
+
+def apply_sort(statement, model, sort_by: str, order: str, cursor: str | None = None):
+    """Trie sur (colonne, id) et, avec un curseur, ne garde que les lignes qui le suivent.
+
+    L'id départage les ex æquo : l'ordre est total, aucune ligne n'est
+    sautée ni répétée d'une page à l'autre. Un index SQLite contient
+    toujours le rowid, donc l'index sur title (ou last_name) sert à la
+    fois le tri et la condition du curseur.
+    """
+    column = getattr(model, sort_by)
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_by, order, column)
+        key = tuple_(column, model.id)
+        statement = statement.where(key < (value, row_id) if order == "desc" else key > (value, row_id))
+    if order == "desc":
+        return statement.order_by(column.desc(), model.id.desc())
+    return statement.order_by(column, model.id)
+
+
+def next_cursor(items: list, page_size: int, sort_by: str, order: str) -> str | None:
+    """Curseur de la page suivante ; items contient page_size + 1 lignes s'il en reste."""
+    if len(items) <= page_size:
+        return None
+    last = items[page_size - 1]
+    return encode_cursor(sort_by, order, getattr(last, sort_by), last.id)
+
+
+def _exact_count(session: Session, statement) -> int:
+    return session.exec(select(func.count()).select_from(statement.subquery())).one()
+
+
+def _cached_count(session: Session, statement, table: str) -> int:
+    compiled = statement.compile()
+    key = (table, str(compiled), tuple(sorted(compiled.params.items(), key=lambda item: item[0])))
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        generation = _count_generation.get(table, 0)
+    if cached and cached[0] > now:
+        return cached[1]
+    total = _exact_count(session, statement)  # hors verrou : la requête peut être longue
+    with _count_lock:
+        if _count_generation.get(table, 0) != generation:
+            return total  # écriture pendant le COUNT : total servi mais pas gardé
+        _count_cache.pop(key, None)
+        if len(_count_cache) >= COUNT_CACHE_SIZE:
+            del _count_cache[next(iter(_count_cache))]
+        _count_cache[key] = (now + COUNT_CACHE_TTL, total)
+    return total
+
+
+def invalidate_counts(table: str):
+    """Oublie les totaux en cache d'une table (après une écriture)."""
+    with _count_lock:
+        _count_generation[table] = _count_generation.get(table, 0) + 1
+        for key in [key for key in _count_cache if key[0] == table]:
+            del _count_cache[key]
+
+
+def _estimated_count(session: Session, model) -> int:
+    """Nombre de lignes de la table sans la parcourir : statistiques d'ANALYZE, sinon plus grand id."""
+    table = model.__tablename__
+    try:
+        stat = session.exec(
+            text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table LIMIT 1").bindparams(table=table)
+        ).first()
+    except OperationalError:
+        stat = None  # pas de sqlite_stat1 tant qu'ANALYZE n'a pas tourné
+    if stat:
+        return int(stat[0].split()[0])
+    return session.exec(select(func.max(model.id))).one() or 0
+
+
+def count_total(session: Session, statement, model, mode: str, filtered: bool) -> int | None:
+    """Total des lignes filtrées selon le mode demandé.
+
+    exact : COUNT sur tout le filtre (coût linéaire) ; cached : le même,
+    gardé COUNT_CACHE_TTL secondes par combinaison de filtres (ou jusqu'à
+    la prochaine écriture, voir invalidate_counts) ; estimate :
+    taille de la table sans la parcourir (sans filtre), sinon comme cached ;
+    none : pas de total.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimate" and not filtered:
+        return _estimated_count(session, model)
+    if mode in ("estimate", "cached"):
+        return _cached_count(session, statement, model.__tablename__)
+    return _exact_count(session, statement)
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, func, select
 
-from app.database import get_session
+from app.bulk import BULK_CHUNK_SIZE, bulk_import, import_authors_chunk
+from app.cache import invalidate_authors, response_cache
+from app.database import Database, get_db
 from app.models.author import Author
 from app.models.book import Book
+from app.pagination import apply_sort, count_total, next_cursor
 from app.schemas.author import AuthorCreate, AuthorRead, AuthorUpdate
-from app.schemas.common import PaginatedResponse
+from app.schemas.common import BulkImportReport, PaginatedResponse
+from app.search import apply_search, authors_fts
 
 router = APIRouter(prefix="/authors", tags=["Auteurs"])
 
 
 @router.post("/", response_model=AuthorRead, status_code=201)
-def create_author(author: AuthorCreate, session: Session = Depends(get_session)):
+async def create_author(author: AuthorCreate, db: Database = Depends(get_db)):
+    return await db.run(_create_author, author)
+
+
+def _create_author(session: Session, author: AuthorCreate):
     statement = select(Author).where(
         Author.first_name == author.first_name,
         Author.last_name == author.last_name,
@@ -26,43 +34,110 @@ def create_author(author: AuthorCreate, session: Session = Depends(get_session))
     db_author = Author.model_validate(author)
     session.add(db_author)
     session.commit()
+    invalidate_authors()
     session.refresh(db_author)
     return db_author
 
 
+@router.post("/bulk", response_model=BulkImportReport)
+async def import_authors(
+    request: Request,
+    response: Response,
+    format: str | None = Query(None, pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=5000),
+    db: Database = Depends(get_db),
+):
+    # Import en masse d'auteurs (NDJSON ou CSV avec en-tête), voir app/bulk.py
+    report = await bulk_import(request, format, chunk_size, AuthorCreate, db, import_authors_chunk)
+    if report.error:
+        response.status_code = 400  # lecture interrompue : le rapport dit ce qui a été importé avant
+    return report
+
+
 @router.get("/", response_model=PaginatedResponse[AuthorRead])
-def list_authors(
-    session: Session = Depends(get_session),
+async def list_authors(
+    request: Request,
+    db: Database = Depends(get_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     search: str | None = None,
     nationality: str | None = None,
-    sort_by: str = Query("last_name", pattern="^(last_name|first_name|birth_date)$"),
+    sort_by: str | None = Query(None, pattern="^(last_name|first_name|birth_date|relevance)$"),
     order: str = Query("asc", pattern="^(asc|desc)$"),
+    pagination: str = Query("page", pattern="^(page|cursor)$"),
+    cursor: str | None = None,
+    total: str | None = Query(None, pattern="^(exact|estimate|cached|none)$"),
+):
+    # Réponse mise en cache par combinaison de paramètres, invalidée à chaque écriture (voir app/cache.py)
+    params = dict(
+        page=page,
+        page_size=page_size,
+        search=search,
+        nationality=nationality,
+        sort_by=sort_by,
+        order=order,
+        pagination=pagination,
+        cursor=cursor,
+        total=total,
+    )
+    key = response_cache.make_key("authors", **params)
+    return await response_cache.serve(request, key, ("authors",), lambda: db.run(_list_authors, **params))
+
+
+def _list_authors(
+    session: Session,
+    page: int,
+    page_size: int,
+    search: str | None,
+    nationality: str | None,
+    sort_by: str | None,
+    order: str,
+    pagination: str,
+    cursor: str | None,
+    total: str | None,
 ):
     statement = select(Author)
 
+    # Recherche plein texte (FTS5, sans accents ni casse), voir app/search.py
+    searched = False
     if search:
-        statement = statement.where(
-            (Author.first_name.ilike(f"%{search}%")) | (Author.last_name.ilike(f"%{search}%"))
-        )
+        statement, searched = apply_search(statement, Author, authors_fts, search)
     if nationality:
         statement = statement.where(Author.nationality == nationality.upper())
 
-    sort_column = getattr(Author, sort_by)
-    statement = statement.order_by(sort_column.desc() if order == "desc" else sort_column)
-
-    count_statement = select(func.count()).select_from(statement.subquery())
-    total = session.exec(count_statement).one()
+    # Mode curseur : la page suivante part de la dernière clé de tri (pas d'OFFSET)
+    keyset = pagination == "cursor" or cursor is not None
+
+    # Une recherche paginée par numéro de page est triée par pertinence (bm25) par défaut
+    if sort_by is None or (sort_by == "relevance" and not searched):
+        sort_by = "relevance" if searched and not keyset else "last_name"
+    if keyset and sort_by == "relevance":
+        raise HTTPException(status_code=400, detail="Le tri par pertinence se pagine par numéro de page, pas par curseur")
+
+    filtered = statement.whereclause is not None
+    total_count = count_total(session, statement, Author, total or ("none" if keyset else "exact"), filtered)
+    total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
+
+    if keyset:
+        authors = session.exec(apply_sort(statement, Author, sort_by, order, cursor).limit(page_size + 1)).all()
+        return PaginatedResponse[AuthorRead](
+            items=authors[:page_size],
+            total=total_count,
+            page_size=page_size,
+            total_pages=total_pages,
+            next_cursor=next_cursor(authors, page_size, sort_by, order),
+        )
 
     offset = (page - 1) * page_size
+    if sort_by == "relevance":
+        statement = statement.order_by(authors_fts.c.rank, Author.id)
+    else:
+        statement = apply_sort(statement, Author, sort_by, order)
     authors = session.exec(statement.offset(offset).limit(page_size)).all()
 
-    total_pages = (total + page_size - 1) // page_size
-
-    return PaginatedResponse(
+    return PaginatedResponse[AuthorRead](
         items=authors,
-        total=total,
+        total=total_count,
         page=page,
         page_size=page_size,
         total_pages=total_pages,
@@ -70,11 +145,15 @@ def list_authors(
 
 
 @router.patch("/{author_id}", response_model=AuthorRead)
-def update_author(
+async def update_author(
     author_id: int,
     author_update: AuthorUpdate,
-    session: Session = Depends(get_session),
+    db: Database = Depends(get_db),
 ):
+    return await db.run(_update_author, author_id, author_update)
+
+
+def _update_author(session: Session, author_id: int, author_update: AuthorUpdate):
     db_author = session.get(Author, author_id)
     if not db_author:
         raise HTTPException(status_code=404, detail="Auteur non trouvé")
@@ -100,12 +179,17 @@ def update_author(
 
     session.add(db_author)
     session.commit()
+    invalidate_authors()
     session.refresh(db_author)
     return db_author
 
 
 @router.delete("/{author_id}")
-def delete_author(author_id: int, session: Session = Depends(get_session)):
+async def delete_author(author_id: int, db: Database = Depends(get_db)):
+    return await db.run(_delete_author, author_id)
+
+
+def _delete_author(session: Session, author_id: int):
     db_author = session.get(Author, author_id)
     if not db_author:
         raise HTTPException(status_code=404, detail="Auteur non trouvé")
@@ -119,4 +203,5 @@ def delete_author(author_id: int, session: Session = Depends(get_session)):
 
     session.delete(db_author)
     session.commit()
+    invalidate_authors()
     return {"message": "Auteur supprimé"}
@@ -1,19 +1,26 @@
-from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import Session, select
 
-from app.database import get_session
-from app.models.book import Book, BookCategory
+from app.bulk import BULK_CHUNK_SIZE, bulk_import, import_books_chunk
+from app.cache import invalidate_books, response_cache
+from app.database import Database, get_db
+from app.models.book import Book
 from app.models.author import Author
+from app.pagination import apply_sort, count_total, next_cursor
 from app.schemas.book import BookCreate, BookRead, BookUpdate
-from app.schemas.common import PaginatedResponse
+from app.schemas.common import BulkImportReport, PaginatedResponse
+from app.schemas.validators import book_errors
+from app.search import apply_search, books_fts
 
 router = APIRouter(prefix="/books", tags=["Livres"])
 
 
 @router.post("/", response_model=BookRead, status_code=201)
-def create_book(book: BookCreate, session: Session = Depends(get_session)):
+async def create_book(book: BookCreate, db: Database = Depends(get_db)):
+    return await db.run(_create_book, book)
 
+
+def _create_book(session: Session, book: BookCreate):
     author = session.get(Author, book.author_id)
     if not author:
         raise HTTPException(status_code=404, detail="Auteur inexistant")
@@ -22,52 +29,89 @@ def create_book(book: BookCreate, session: Session = Depends(get_session)):
     if existing:
         raise HTTPException(status_code=400, detail=f"Un livre avec l'ISBN {book.isbn} existe déjà")
     
-    if len(book.isbn) > 13:
-        raise HTTPException(status_code=400, detail="L'ISBN ne doit pas dépasser 13 caractères")
-    
-    if not book.isbn.isdigit():
-        raise HTTPException(status_code=400, detail="L'ISBN doit contenir uniquement des chiffres")
-    
-    existing = session.exec(select(Book).where(Book.language == book.language)).first()
-    if len(book.language) > 2:
-        raise HTTPException(status_code=400, detail="Le code langue ne doit pas dépasser 2 caractères")
-    
-    existing = session.exec(select(Book).where(Book.publication_year == book.publication_year)).first()
-    if book.publication_year < 1450 or book.publication_year > date.today().year:
-        raise HTTPException(status_code=400, detail=f"La année de publication doit être comprise entre 1450 et {date.today().year}")
-    
-    existing = session.exec(select(Book).where(Book.category == book.category)).first()
-    if book.category not in BookCategory.__members__.values():
-        raise HTTPException(status_code=400, detail="Catégorie de livre invalide il doit être parmi les suivantes : " + ", ".join([cat.value for cat in BookCategory]))
-    
+    # Mêmes règles que l'import en masse (app/schemas/validators.py)
+    errors = book_errors(book)
+    if errors:
+        raise HTTPException(status_code=400, detail=errors[0])
+
     db_book = Book.model_validate(book)
     
     session.add(db_book)
     session.commit()
     session.refresh(db_book)
+    invalidate_books()
     return db_book
 
 
+@router.post("/bulk", response_model=BulkImportReport)
+async def import_books(
+    request: Request,
+    response: Response,
+    format: str | None = Query(None, pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=5000),
+    db: Database = Depends(get_db),
+):
+    # Import en masse de livres (NDJSON ou CSV avec en-tête), voir app/bulk.py
+    report = await bulk_import(request, format, chunk_size, BookCreate, db, import_books_chunk)
+    if report.error:
+        response.status_code = 400  # lecture interrompue : le rapport dit ce qui a été importé avant
+    return report
+
+
 @router.get("/", response_model=PaginatedResponse[BookRead])
-def list_books(
-    session: Session = Depends(get_session),
+async def list_books(
+    request: Request,
+    db: Database = Depends(get_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     search: str | None = None,
     category: str | None = None,
     language: str | None = None,
     author_id: int | None = None,
-    sort_by: str = Query("title", pattern="^(title|publication_year|pages|publisher)$"),
+    sort_by: str | None = Query(None, pattern="^(title|publication_year|pages|publisher|relevance)$"),
     order: str = Query("asc", pattern="^(asc|desc)$"),
+    pagination: str = Query("page", pattern="^(page|cursor)$"),
+    cursor: str | None = None,
+    total: str | None = Query(None, pattern="^(exact|estimate|cached|none)$"),
+):
+    # Réponse mise en cache par combinaison de paramètres, invalidée à chaque écriture (voir app/cache.py)
+    params = dict(
+        page=page,
+        page_size=page_size,
+        search=search,
+        category=category,
+        language=language,
+        author_id=author_id,
+        sort_by=sort_by,
+        order=order,
+        pagination=pagination,
+        cursor=cursor,
+        total=total,
+    )
+    key = response_cache.make_key("books", **params)
+    return await response_cache.serve(request, key, ("books",), lambda: db.run(_list_books, **params))
+
+
+def _list_books(
+    session: Session,
+    page: int,
+    page_size: int,
+    search: str | None,
+    category: str | None,
+    language: str | None,
+    author_id: int | None,
+    sort_by: str | None,
+    order: str,
+    pagination: str,
+    cursor: str | None,
+    total: str | None,
 ):
     statement = select(Book)
 
+    # Recherche plein texte (FTS5, sans accents ni casse), voir app/search.py
+    searched = False
     if search:
-        statement = statement.where(
-            (Book.title.ilike(f"%{search}%"))
-            | (Book.isbn.ilike(f"%{search}%"))
-            | (Book.publisher.ilike(f"%{search}%"))
-        )
+        statement, searched = apply_search(statement, Book, books_fts, search, substring_column=Book.isbn)
 
     if category:
         statement = statement.where(Book.category == category)
@@ -78,19 +122,39 @@ def list_books(
     if author_id:
         statement = statement.where(Book.author_id == author_id)
 
-    sort_column = getattr(Book, sort_by)
-    statement = statement.order_by(sort_column.desc() if order == "desc" else sort_column)
-
-    count_statement = select(func.count()).select_from(statement.subquery())
-    total = session.exec(count_statement).one()
+    # Mode curseur : la page suivante part de la dernière clé de tri (pas d'OFFSET)
+    keyset = pagination == "cursor" or cursor is not None
+
+    # Une recherche paginée par numéro de page est triée par pertinence (bm25) par défaut
+    if sort_by is None or (sort_by == "relevance" and not searched):
+        sort_by = "relevance" if searched and not keyset else "title"
+    if keyset and sort_by == "relevance":
+        raise HTTPException(status_code=400, detail="Le tri par pertinence se pagine par numéro de page, pas par curseur")
+
+    filtered = statement.whereclause is not None
+    total_count = count_total(session, statement, Book, total or ("none" if keyset else "exact"), filtered)
+    total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
+
+    if keyset:
+        books = session.exec(apply_sort(statement, Book, sort_by, order, cursor).limit(page_size + 1)).all()
+        return PaginatedResponse[BookRead](
+            items=books[:page_size],
+            total=total_count,
+            page_size=page_size,
+            total_pages=total_pages,
+            next_cursor=next_cursor(books, page_size, sort_by, order),
+        )
 
     offset = (page - 1) * page_size
+    if sort_by == "relevance":
+        statement = statement.order_by(books_fts.c.rank, Book.id)
+    else:
+        statement = apply_sort(statement, Book, sort_by, order)
     books = session.exec(statement.offset(offset).limit(page_size)).all()
-    total_pages = (total + page_size - 1) // page_size
 
-    return PaginatedResponse(
+    return PaginatedResponse[BookRead](
         items=books,
-        total=total,
+        total=total_count,
         page=page,
         page_size=page_size,
         total_pages=total_pages,
@@ -98,15 +162,24 @@ def list_books(
 
 
 @router.get("/{book_id}", response_model=BookRead)
-def get_book(book_id: int, session: Session = Depends(get_session)):
+async def get_book(book_id: int, request: Request, db: Database = Depends(get_db)):
+    key = response_cache.make_key("book", book_id=book_id)
+    return await response_cache.serve(request, key, (f"book:{book_id}",), lambda: db.run(_get_book, book_id))
+
+
+def _get_book(session: Session, book_id: int):
     book = session.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
-    return book
+    return BookRead.model_validate(book)
 
 
 @router.patch("/{book_id}", response_model=BookRead)
-def update_book(book_id: int, book_update: BookUpdate, session: Session = Depends(get_session)):
+async def update_book(book_id: int, book_update: BookUpdate, db: Database = Depends(get_db)):
+    return await db.run(_update_book, book_id, book_update)
+
+
+def _update_book(session: Session, book_id: int, book_update: BookUpdate):
     db_book = session.get(Book, book_id)
     if not db_book:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
@@ -133,15 +206,21 @@ def update_book(book_id: int, book_update: BookUpdate, session: Session = Depend
     session.add(db_book)
     session.commit()
     session.refresh(db_book)
+    invalidate_books(book_id)
     return db_book
 
 
 @router.delete("/{book_id}")
-def delete_book(book_id: int, session: Session = Depends(get_session)):
+async def delete_book(book_id: int, db: Database = Depends(get_db)):
+    return await db.run(_delete_book, book_id)
+
+
+def _delete_book(session: Session, book_id: int):
     db_book = session.get(Book, book_id)
     if not db_book:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
 
     session.delete(db_book)
     session.commit()
+    invalidate_books(book_id)
     return {"message": "Livre supprimé"}
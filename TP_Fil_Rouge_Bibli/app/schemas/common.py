@@ -1,11 +1,25 @@
-from typing import Generic, TypeVar
+from typing import Generic, Optional, TypeVar
 from pydantic import BaseModel
 
 T = TypeVar("T")
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: list[T]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class BulkRowError(BaseModel):
+    line: int
+    errors: list[str]
+
+
+class BulkImportReport(BaseModel):
+    inserted: int = 0
+    rejected: int = 0
+    errors: list[BulkRowError] = []
+    errors_truncated: bool = False
+    error: Optional[str] = None
@@ -0,0 +1,22 @@
+from datetime import date
+
+from app.schemas.book import BookCategory, BookCreate
+
+
+def book_errors(book: BookCreate) -> list[str]:
+    """Règles métier d'un livre à créer (hors auteur et unicité de l'ISBN, qui demandent la base)."""
+    errors = []
+    if len(book.isbn) > 13:
+        errors.append("L'ISBN ne doit pas dépasser 13 caractères")
+    if not book.isbn.isdigit():
+        errors.append("L'ISBN doit contenir uniquement des chiffres")
+    if len(book.language) > 2:
+        errors.append("Le code langue ne doit pas dépasser 2 caractères")
+    if book.publication_year < 1450 or book.publication_year > date.today().year:
+        errors.append(f"La année de publication doit être comprise entre 1450 et {date.today().year}")
+    if book.category not in {category.value for category in BookCategory}:
+        errors.append(
+            "Catégorie de livre invalide il doit être parmi les suivantes : "
+            + ", ".join([cat.value for cat in BookCategory])
+        )
+    return errors
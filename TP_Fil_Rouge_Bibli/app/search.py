@@ -0,0 +1,116 @@
+import re
+import sys
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, or_, select, text
+
+# Tables FTS5 : déclarées dans leur propre MetaData pour que create_all ne les crée pas
+fts_metadata = MetaData()
+
+# Colonnes indexées de chaque table du catalogue
+FTS_COLUMNS = {
+    "books": ("title", "isbn", "publisher"),
+    "authors": ("first_name", "last_name"),
+}
+
+# unicode61 + remove_diacritics : « Misérables » et « miserables » donnent le même jeton
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+
+def _fts_table(source: str) -> Table:
+    name = f"{source}_fts"
+    return Table(
+        name,
+        fts_metadata,
+        Column("rowid", Integer, primary_key=True),
+        Column(name, String),  # colonne cachée du même nom que la table, cible de MATCH
+        Column("rank", Float),
+        *(Column(column, String) for column in FTS_COLUMNS[source]),
+    )
+
+
+books_fts = _fts_table("books")
+authors_fts = _fts_table("authors")
+
+
+def _ddl(source: str) -> list[str]:
+    """Table FTS5 à contenu externe et triggers qui la tiennent à jour à chaque écriture."""
+    fts = f"{source}_fts"
+    columns = ", ".join(FTS_COLUMNS[source])
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS[source])
+    old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS[source])
+    delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+        f"content='{source}', content_rowid='id', tokenize='{FTS_TOKENIZE}', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {source} BEGIN {delete} {insert} END",
+    ]
+
+
+def create_search_index(engine):
+    """Crée les index plein texte et leurs triggers s'ils n'existent pas (remplis depuis les tables)."""
+    with engine.begin() as connection:
+        for source in FTS_COLUMNS:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": f"{source}_fts"}
+            ).first()
+            for statement in _ddl(source):
+                connection.execute(text(statement))
+            if not exists:
+                connection.execute(text(f"INSERT INTO {source}_fts({source}_fts) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(engine):
+    """Reconstruit les index plein texte à partir des tables (après un import SQL direct par exemple)."""
+    with engine.begin() as connection:
+        for source in FTS_COLUMNS:
+            for statement in _ddl(source):
+                connection.execute(text(statement))
+            connection.execute(text(f"INSERT INTO {source}_fts({source}_fts) VALUES ('rebuild')"))
+            connection.execute(text(f"INSERT INTO {source}_fts({source}_fts) VALUES ('optimize')"))
+
+
+def fts_query(search: str) -> str | None:
+    """Transforme la saisie en requête FTS5 : chaque mot est un préfixe, tous sont requis.
+
+    Les mots sont mis entre guillemets : la syntaxe FTS5 (AND, NEAR, *...)
+    tapée par l'utilisateur est cherchée telle quelle et ne provoque pas
+    d'erreur.
+    """
+    terms = re.findall(r"\w+", search)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def apply_search(statement, model, fts: Table, search: str, substring_column=None):
+    """Restreint la requête aux lignes qui correspondent à la recherche ; retourne (requête, trié par pertinence).
+
+    FTS5 ne trouve que des préfixes de mots. Si substring_column est donné
+    (l'ISBN) et que la saisie n'est faite que de chiffres (tirets et espaces
+    ignorés), une sous-chaîne de cette colonne correspond aussi, comme avec
+    l'ancien ilike('%...%') : « 36042 » trouve 9782070360420. Ce cas n'a
+    pas de score bm25 et suit le tri demandé.
+    """
+    query = fts_query(search)
+    if query is None:
+        return statement, False
+    digits = search.replace("-", "").replace(" ", "")
+    if substring_column is not None and digits.isdigit():
+        # MATCH ne peut pas être combiné par OR dans la même requête : sous-requête sur l'index
+        matched = select(fts.c.rowid).where(fts.c[fts.name].match(query))
+        return statement.where(or_(model.id.in_(matched), substring_column.contains(digits))), False
+    statement = statement.join(fts, fts.c.rowid == model.id).where(fts.c[fts.name].match(query))
+    return statement, True
+
+
+if __name__ == "__main__":
+    # python -m app.search rebuild
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage : python -m app.search rebuild")
+        sys.exit(1)
+    from app.database import engine
+    rebuild_search_index(engine)
+    print("Index de recherche reconstruits")
@@ -0,0 +1,147 @@
+"""Débit des routes du catalogue sous charge concurrente : moteur sync contre async.
+
+    python benchmark.py [--books 20000] [--requests 3000] [--concurrency 1 50 200] [--timeout 1800]
+
+Chaque mode tourne dans son propre processus (DB_MODE est lu à l'import de
+app.database), sur une base temporaire. Le cache des réponses est désactivé
+pour mesurer la base et non le cache. La charge mélange des lectures par id
+(70 %) et des pages filtrées (30 %), envoyées en ASGI direct (sans réseau).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+PROJECT = os.path.dirname(os.path.abspath(__file__))
+CATEGORIES = ("Fiction", "Science", "Histoire", "BD")
+
+
+def _seed(engine, books: int):
+    from sqlalchemy import insert
+    from sqlmodel import Session
+
+    from app.models.author import Author
+    from app.models.book import Book
+
+    with Session(engine) as session:
+        session.exec(insert(Author), params=[
+            {"first_name": f"Prénom{i}", "last_name": f"Nom{i}", "birth_date": date(1900, 1, 1), "nationality": "FR"}
+            for i in range(100)
+        ])
+        session.exec(insert(Book), params=[
+            {
+                "author_id": 1 + i % 100,
+                "title": f"Livre {i}",
+                "isbn": str(9780000000000 + i),
+                "publication_year": 1900 + i % 120,
+                "total_copies": 1,
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "language": "fr",
+                "pages": 100,
+                "publisher": "Éditeur",
+            }
+            for i in range(books)
+        ])
+        session.commit()
+
+
+async def _load(app, books: int, requests: int, concurrency: int) -> dict:
+    import httpx
+
+    rng = random.Random(0)
+    paths = []
+    for _ in range(requests):
+        if rng.random() < 0.7:
+            paths.append(f"/books/{rng.randint(1, books)}")
+        else:
+            paths.append(f"/books/?category={rng.choice(CATEGORIES)}&page={rng.randint(1, 50)}&total=none")
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def call(path):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        await asyncio.gather(*(call(path) for path in paths[:50]))  # chauffe
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(call(path) for path in paths))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+    }
+
+
+def run_mode(books: int, requests: int, concurrencies: list[int]):
+    """Tourne dans le sous-processus : DB_MODE est déjà positionné."""
+    os.chdir(tempfile.mkdtemp(prefix="bench_bibli_"))
+    sys.path.insert(0, PROJECT)
+    import app.database as database
+    import app.models  # noqa: F401  (tables déclarées avant create_all)
+
+    database.engine.echo = False
+    if database.async_engine is not None:
+        database.async_engine.echo = False
+    database.create_db_and_tables()
+    _seed(database.engine, books)
+
+    from app.cache import response_cache
+    from app.main import app
+
+    response_cache.max_entries = 0
+
+    async def load_all():
+        # une seule boucle : les connexions aiosqlite du pool y sont attachées
+        try:
+            return [await _load(app, books, requests, concurrency) for concurrency in concurrencies]
+        finally:
+            # ASGITransport ne lance pas le lifespan (pas de on_shutdown) : sans dispose, les threads
+            # non démons d'aiosqlite empêchent le processus de se terminer
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    print(json.dumps(asyncio.run(load_all())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--timeout", type=float, default=1800, help="durée maximale (s) de chaque mode")
+    parser.add_argument("--mode", choices=("sync", "async"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.books, args.requests, args.concurrency)
+        return
+
+    print(f"{'mode':<6} {'conc.':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode in ("sync", "async"):
+        command = [sys.executable, os.path.abspath(__file__), "--mode", mode, "--books", str(args.books),
+                   "--requests", str(args.requests), "--concurrency", *map(str, args.concurrency)]
+        output = subprocess.run(command, env={**os.environ, "DB_MODE": mode}, stdout=subprocess.PIPE, text=True,
+                                check=True, timeout=args.timeout)
+        for result in json.loads(output.stdout.strip().splitlines()[-1]):
+            print(f"{mode:<6} {result['concurrency']:>6} {result['rps']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# La base (./db.sqlite3) est ouverte à l'import de app.database : les tests tournent
+# dans un dossier temporaire, sans toucher à la base du projet
+os.chdir(tempfile.mkdtemp(prefix="tests_bibli_"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app.database as database  # noqa: E402
+from app.main import app  # noqa: E402
+
+database.engine.echo = False
+if database.async_engine is not None:
+    database.async_engine.echo = False
+
+_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    # un seul client : en mode async, les connexions aiosqlite restent attachées à sa boucle
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def author_id(client):
+    """Auteur propre au test : filtrer sur son id isole les livres créés par le test."""
+    number = next(_numbers)
+    response = client.post("/authors/", json={
+        "first_name": f"Prénom{number}", "last_name": f"Nom{number}",
+        "birth_date": "1950-01-01", "nationality": "FR",
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def book_payload(author_id: int, **fields) -> dict:
+    """Livre valide avec un ISBN unique ; fields remplace les valeurs par défaut."""
+    return {
+        "title": "Livre",
+        "isbn": str(9780000000000 + next(_numbers)),
+        "publication_year": 2000,
+        "author_id": author_id,
+        "total_copies": 1,
+        "category": "Fiction",
+        "language": "fr",
+        "pages": 100,
+        "publisher": "Éditeur",
+        **fields,
+    }
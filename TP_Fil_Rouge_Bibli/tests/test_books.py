@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from tests.conftest import book_payload
+
+
+def _create_books(client, author_id: int, count: int) -> list[int]:
+    ids = []
+    for i in range(count):
+        # titres et années en double : l'id doit départager les ex æquo
+        response = client.post("/books/", json=book_payload(
+            author_id, title=f"Titre {i % 3}", publication_year=1990 + i % 4, pages=50 + i,
+        ))
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+@pytest.mark.parametrize("sort_by", ["title", "publication_year", "pages"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_walk_returns_each_book_once(client, author_id, sort_by, order):
+    created = _create_books(client, author_id, 11)
+
+    seen, cursor = [], None
+    while True:
+        params = {"author_id": author_id, "pagination": "cursor", "page_size": 4, "sort_by": sort_by, "order": order}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/books/", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        seen += [book["id"] for book in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert sorted(seen) == sorted(created)
+
+
+@pytest.mark.parametrize("cursor", ["pas-un-curseur", "e30", "eyJzIjoidGl0bGUifQ"])
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get("/books/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Curseur invalide pour ce tri"
+
+
+def test_cursor_from_another_sort_is_rejected(client, author_id):
+    _create_books(client, author_id, 3)
+    page = client.get("/books/", params={"author_id": author_id, "pagination": "cursor", "page_size": 1}).json()
+
+    response = client.get("/books/", params={"author_id": author_id, "sort_by": "pages", "cursor": page["next_cursor"]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/books/{id}", "/books/?author_id={author_id}"])
+def test_conditional_request_gets_304(client, author_id, path):
+    book_id = _create_books(client, author_id, 1)[0]
+    url = path.format(id=book_id, author_id=author_id)
+    response = client.get(url)
+    assert response.status_code == 200
+
+    not_modified = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+    since = client.get(url, headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+    stale = client.get(url, headers={"If-None-Match": '"autre-version"'})
+    assert stale.status_code == 200
+    assert stale.json() == response.json()
+
+
+def test_patch_invalidates_cached_list_and_book(client, author_id):
+    book_id = _create_books(client, author_id, 1)[0]
+    list_url, book_url = f"/books/?author_id={author_id}", f"/books/{book_id}"
+    old_list, old_book = client.get(list_url), client.get(book_url)  # mises en cache
+
+    response = client.patch(book_url, json={"title": "Titre modifié"})
+    assert response.status_code == 200, response.text
+
+    new_book = client.get(book_url, headers={"If-None-Match": old_book.headers["ETag"]})
+    assert new_book.status_code == 200
+    assert new_book.json()["title"] == "Titre modifié"
+    new_list = client.get(list_url, headers={"If-None-Match": old_list.headers["ETag"]})
+    assert new_list.status_code == 200
+    assert [book["title"] for book in new_list.json()["items"]] == ["Titre modifié"]
+
+
+def test_bulk_import_invalidates_cached_list(client, author_id):
+    _create_books(client, author_id, 1)
+    list_url = f"/books/?author_id={author_id}"
+    assert client.get(list_url).json()["total"] == 1  # mise en cache
+
+    body = "\n".join(json.dumps(book_payload(author_id, title=f"Import {i}")) for i in range(2))
+    response = client.post("/books/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+
+    books = client.get(list_url).json()
+    assert books["total"] == 3
+    imported = [book for book in books["items"] if book["title"].startswith("Import")]
+    assert len(imported) == 2
+    for book in imported:
+        assert client.get(f"/books/{book['id']}").json() == book
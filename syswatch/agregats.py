@@ -0,0 +1,156 @@
+import glob
+import os
+import time
+from datetime import datetime
+
+from ecrivain_csv import EcrivainCSV, lire_fenetre
+from index_temps import iso_vers_epoch_us
+from statistiques import COLONNES_IGNOREES
+
+# (nom, largeur d'un seau en secondes, rétention en secondes)
+PALIERS = (
+    ("1min", 60, 7 * 86400),
+    ("5min", 300, 30 * 86400),
+    ("1h", 3600, 365 * 86400),
+)
+
+# Nombre minimum de seaux dans une fenêtre pour qu'un palier soit utilisé
+SEAUX_MINIMUM = 10
+
+
+class Palier:
+    """Un niveau d'agrégation : moyenne, min, max et nombre par métrique et par seau.
+
+    Les seaux sont fermés au fil de l'eau, dès qu'un échantillon tombe dans
+    le seau suivant, et écrits dans racine_<nom>.csv (avec son index
+    temporel). Le fichier tourne tous les quarts de rétention et les
+    segments plus vieux que la rétention sont supprimés.
+    """
+
+    def __init__(self, racine, nom, largeur, retention):
+        self.nom = nom
+        self.largeur = largeur
+        self.retention = retention
+        self.fichier = f"{racine}_{nom}.csv"
+        self.ecrivain = EcrivainCSV(self.fichier, taille_tampon=10, duree_max=retention / 4, pas_index=10)
+        self.debut = None
+        self.cumuls = {}
+
+    def ajouter(self, ligne):
+        seconde = iso_vers_epoch_us(ligne["timestamp"]) // 1_000_000
+        seau = seconde - seconde % self.largeur
+        if self.debut is not None and seau != self.debut:
+            self._fermer_seau()
+        self.debut = seau
+
+        for colonne, valeur in ligne.items():
+            if colonne in COLONNES_IGNOREES:
+                continue
+            try:
+                valeur = float(valeur)
+            except (TypeError, ValueError):
+                continue
+            cumul = self.cumuls.get(colonne)
+            if cumul is None:
+                self.cumuls[colonne] = [valeur, 1, valeur, valeur]
+            else:
+                cumul[0] += valeur
+                cumul[1] += 1
+                if valeur < cumul[2]:
+                    cumul[2] = valeur
+                if valeur > cumul[3]:
+                    cumul[3] = valeur
+
+    def _fermer_seau(self):
+        if not self.cumuls:
+            return
+        ligne = {"timestamp": datetime.fromtimestamp(self.debut).isoformat()}
+        for colonne, (somme, nombre, minimum, maximum) in self.cumuls.items():
+            ligne[f"{colonne}_moy"] = round(somme / nombre, 3)
+            ligne[f"{colonne}_min"] = minimum
+            ligne[f"{colonne}_max"] = maximum
+            ligne[f"{colonne}_n"] = nombre
+        self.ecrivain.ecrire(ligne)
+        self.cumuls = {}
+        self.appliquer_retention()
+
+    def appliquer_retention(self):
+        """Supprime les segments archivés dont la dernière écriture dépasse la rétention."""
+        limite = time.time() - self.retention
+        racine, extension = os.path.splitext(self.fichier)
+        for segment in glob.glob(f"{glob.escape(racine)}-*{extension}*"):
+            if os.path.getmtime(segment) < limite:
+                os.remove(segment)
+
+    def fermer(self):
+        """Écrit le seau en cours (même incomplet) puis ferme le fichier."""
+        self._fermer_seau()
+        self.debut = None
+        self.ecrivain.fermer()
+
+
+class Paliers:
+    """Ensemble des paliers (1 min / 5 min / 1 h) mis à jour à chaque échantillon."""
+
+    def __init__(self, racine="historique", paliers=PALIERS):
+        self.racine = racine
+        self.paliers = [Palier(racine, *p) for p in paliers]
+
+    def ajouter(self, ligne):
+        for palier in self.paliers:
+            palier.ajouter(ligne)
+
+    def fermer(self):
+        for palier in self.paliers:
+            palier.fermer()
+
+
+def choisir_palier(racine, debut_us, fin_us, paliers=PALIERS):
+    """Retourne le palier le plus grossier adapté à la fenêtre, ou None (données brutes).
+
+    Un palier convient si la fenêtre contient au moins SEAUX_MINIMUM seaux
+    et si sa rétention remonte jusqu'au début de la fenêtre.
+    """
+    if debut_us is None:
+        return None
+    fin_us = time.time() * 1_000_000 if fin_us is None else fin_us
+    duree = (fin_us - debut_us) / 1_000_000
+    age = time.time() - debut_us / 1_000_000
+
+    for nom, largeur, retention in reversed(paliers):
+        fichier = f"{racine}_{nom}.csv"
+        if duree >= SEAUX_MINIMUM * largeur and age <= retention and os.path.exists(fichier):
+            return nom, fichier
+    return None
+
+
+def resumer_palier(fichier, debut_us=None, fin_us=None):
+    """Retourne {métrique: {moyenne, min, max, nombre}} sur les seaux d'un fichier de palier.
+
+    Un seau est compté si son début est dans la fenêtre : les bords sont
+    donc approchés à un seau près.
+    """
+    totaux = {}
+    for ligne in lire_fenetre(fichier, debut_us, fin_us):
+        for colonne, valeur in ligne.items():
+            if not colonne.endswith("_moy") or valeur == "":
+                continue
+            metrique = colonne[:-4]
+            nombre = int(ligne[f"{metrique}_n"])
+            minimum = float(ligne[f"{metrique}_min"])
+            maximum = float(ligne[f"{metrique}_max"])
+            total = totaux.setdefault(metrique, {"somme": 0.0, "nombre": 0, "min": minimum, "max": maximum})
+            total["somme"] += float(valeur) * nombre
+            total["nombre"] += nombre
+            total["min"] = min(total["min"], minimum)
+            total["max"] = max(total["max"], maximum)
+
+    return {
+        metrique: {
+            "moyenne": total["somme"] / total["nombre"],
+            "min": total["min"],
+            "max": total["max"],
+            "nombre": total["nombre"],
+        }
+        for metrique, total in totaux.items() if total["nombre"]
+    }
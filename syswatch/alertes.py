@@ -0,0 +1,237 @@
+import json
+import operator
+import queue
+import re
+import shlex
+import subprocess
+import threading
+
+from index_temps import iso_vers_epoch_us
+from statistiques import COLONNES_IGNOREES
+
+# Opérateur d'entrée dans l'alerte, et opérateur de sortie (avec le seuil décalé de l'hystérésis)
+OPERATEURS = {
+    ">": (operator.gt, operator.le),
+    ">=": (operator.ge, operator.lt),
+    "<": (operator.lt, operator.ge),
+    "<=": (operator.le, operator.gt),
+}
+
+# ex : "disk_root_percent > 90" ou "mem_percent >= 80%"
+_CONDITION = re.compile(r"\s*([\w.:\-]+)\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*%?\s*")
+
+
+def colonne_texte(metrique):
+    """Vrai pour les colonnes texte de l'historique (hôte, horodatage, noms des processus)."""
+    colonne = metrique.rsplit(":", 1)[-1]
+    return colonne in COLONNES_IGNOREES or (colonne.startswith("proc_") and colonne.endswith("_nom"))
+
+
+class Condition:
+    """Comparaison d'une métrique à un seuil, avec hystérésis.
+
+    La condition devient vraie quand la valeur franchit le seuil, et ne
+    redevient fausse qu'une fois revenue de `hysteresis` du côté normal :
+    une valeur qui oscille autour du seuil ne fait pas clignoter l'alerte.
+    """
+
+    def __init__(self, metrique, op, seuil, hysteresis=0.0):
+        self.metrique = metrique
+        self.op = op
+        self.seuil = seuil
+        self.hysteresis = hysteresis
+        entree, sortie = OPERATEURS[op]
+        seuil_sortie = seuil - hysteresis if op in (">", ">=") else seuil + hysteresis
+        self._entrer = lambda valeur: entree(valeur, seuil)
+        self._sortir = lambda valeur: sortie(valeur, seuil_sortie)
+        self.vraie = False
+        self.valeur = None
+
+    def mettre_a_jour(self, valeur):
+        self.valeur = valeur
+        if self.vraie:
+            if self._sortir(valeur):
+                self.vraie = False
+        elif self._entrer(valeur):
+            self.vraie = True
+
+    def __str__(self):
+        return f"{self.metrique} {self.op} {self.seuil:g}"
+
+
+class Regle:
+    """Alerte levée quand toutes ses conditions sont vraies assez longtemps.
+
+    pendant est le nombre d'échantillons consécutifs requis, duree le
+    temps minimal (en secondes) depuis que les conditions sont vraies ;
+    les deux doivent être atteints. L'alerte est résolue dès qu'une
+    condition redevient fausse.
+    """
+
+    def __init__(self, nom, conditions, pendant=1, duree=0.0, message=None):
+        self.nom = nom
+        self.conditions = conditions
+        self.pendant = pendant
+        self.duree_us = int(duree * 1_000_000)
+        self.message = message or " et ".join(str(c) for c in conditions)
+        self.active = False
+        self._compte = 0
+        self._depuis = None
+
+    def evaluer(self, temps_us):
+        """Retourne "declenchee", "resolue" ou None (pas de changement)."""
+        if all(c.vraie for c in self.conditions):
+            if self._depuis is None:
+                self._depuis = temps_us
+            self._compte += 1
+            if not self.active and self._compte >= self.pendant and temps_us - self._depuis >= self.duree_us:
+                self.active = True
+                return "declenchee"
+            return None
+        self._compte = 0
+        self._depuis = None
+        if self.active:
+            self.active = False
+            return "resolue"
+        return None
+
+
+def compiler(definitions):
+    """Compile les définitions de règles (dictionnaires) en objets Regle.
+
+    Une définition : {"nom", "si": condition ou liste de conditions,
+    "pendant": échantillons, "duree": secondes, "hysteresis", "message"}.
+    Les conditions identiques (même métrique, opérateur, seuil et
+    hystérésis) sont partagées entre les règles : elles ne sont évaluées
+    qu'une fois par échantillon.
+    """
+    partagees = {}
+    regles = []
+    for i, definition in enumerate(definitions):
+        nom = definition.get("nom", f"regle_{i + 1}")
+        textes = definition.get("si")
+        if not textes:
+            raise ValueError(f"Règle {nom} : aucune condition (clé \"si\")")
+        if isinstance(textes, str):
+            textes = [textes]
+        hysteresis = float(definition.get("hysteresis", 0))
+        conditions = []
+        for texte in textes:
+            correspondance = _CONDITION.fullmatch(texte)
+            if correspondance is None:
+                raise ValueError(f"Règle {nom} : condition invalide : {texte!r} (ex : \"cpu_percent > 95\")")
+            metrique, op, seuil = correspondance.group(1), correspondance.group(2), float(correspondance.group(3))
+            if colonne_texte(metrique):
+                raise ValueError(f"Règle {nom} : {metrique} n'est pas une métrique numérique : {texte!r}")
+            cle = (metrique, op, seuil, hysteresis)
+            if cle not in partagees:
+                partagees[cle] = Condition(metrique, op, seuil, hysteresis)
+            conditions.append(partagees[cle])
+        regles.append(Regle(nom, conditions, int(definition.get("pendant", 1)),
+                            float(definition.get("duree", 0)), definition.get("message")))
+    return regles
+
+
+class MoteurAlertes:
+    """Évalue les règles compilées sur chaque échantillon de la collecte continue.
+
+    Les conditions sont indexées par métrique, et chaque condition connaît
+    les règles qui l'utilisent : un échantillon ne coûte que les règles qui
+    portent sur ses métriques. Les alertes (déclenchées et résolues) sont
+    affichées, ajoutées en NDJSON à `fichier`, et transmises en JSON sur
+    l'entrée standard de `commande`, lancée dans un thread à part pour ne
+    pas retarder la collecte.
+    """
+
+    def __init__(self, regles, fichier=None, commande=None, afficher=True):
+        self.regles = regles
+        self.afficher = afficher
+        self._par_metrique = {}
+        for regle in regles:
+            for condition in regle.conditions:
+                par_condition = self._par_metrique.setdefault(condition.metrique, {})
+                par_condition.setdefault(condition, []).append(regle)
+        self._f = open(fichier, "a", encoding="utf-8") if fichier else None
+        self._commande = shlex.split(commande) if commande else None
+        self._file = None
+        if self._commande:
+            self._file = queue.SimpleQueue()
+            self._thread = threading.Thread(target=self._executer_commandes, name="syswatch-alertes", daemon=True)
+            self._thread.start()
+
+    def evaluer(self, metriques, ligne):
+        """Observateur de collecter_en_continu : reçoit l'échantillon et sa ligne d'historique."""
+        touchees = {}
+        for metrique, conditions in self._par_metrique.items():
+            valeur = ligne.get(metrique)
+            if valeur is None or valeur == "":
+                continue  # métrique absente : les conditions gardent leur état
+            valeur = float(valeur)
+            for condition, regles in conditions.items():
+                condition.mettre_a_jour(valeur)
+                for regle in regles:
+                    touchees[regle] = None
+        if not touchees:
+            return
+        temps_us = iso_vers_epoch_us(ligne["timestamp"])
+        for regle in touchees:
+            etat = regle.evaluer(temps_us)
+            if etat is not None:
+                self._emettre(ligne["timestamp"], regle, etat)
+
+    def actives(self):
+        """Noms des alertes en cours."""
+        return [regle.nom for regle in self.regles if regle.active]
+
+    def _emettre(self, timestamp, regle, etat):
+        alerte = {
+            "timestamp": timestamp,
+            "regle": regle.nom,
+            "etat": etat,
+            "message": regle.message,
+            "valeurs": {c.metrique: c.valeur for c in regle.conditions},
+        }
+        if self.afficher:
+            valeurs = ", ".join(f"{m}={v:g}" for m, v in alerte["valeurs"].items())
+            libelle = "[Alerte]" if etat == "declenchee" else "[Alerte résolue]"
+            print(f"{libelle} {regle.nom} : {regle.message} ({valeurs})")
+        if self._f is not None:
+            self._f.write(json.dumps(alerte) + "\n")
+            self._f.flush()
+        if self._file is not None:
+            self._file.put(alerte)
+
+    def _executer_commandes(self):
+        while True:
+            alerte = self._file.get()
+            if alerte is None:
+                return
+            try:
+                subprocess.run(self._commande, input=json.dumps(alerte).encode("utf-8"), timeout=30)
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"[Erreur] commande d'alerte : {e}")
+
+    def fermer(self):
+        """Ferme le fichier d'alertes et attend les commandes en cours."""
+        if self._file is not None:
+            self._file.put(None)
+            self._thread.join()
+            self._file = None
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def charger_alertes(fichier, afficher=True):
+    """Crée le MoteurAlertes décrit par un fichier JSON ou YAML (PyYAML requis pour le YAML).
+
+    Le fichier contient "regles" (voir compiler) et, au choix, "fichier"
+    (journal NDJSON des alertes) et "commande" (appelée à chaque alerte).
+    """
+    with open(fichier, "r", encoding="utf-8") as f:
+        if fichier.endswith((".yaml", ".yml")):
+            import yaml
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+    return MoteurAlertes(compiler(config.get("regles", [])), config.get("fichier"), config.get("commande"), afficher)
@@ -0,0 +1,222 @@
+import os
+from array import array
+
+import numpy as np
+
+from ecrivain_csv import lire_fenetre
+from index_temps import epoch_us_vers_iso, iso_vers_epoch_us
+from stockage_colonnes import MagasinColonnes
+
+# Nombre de valeurs copiées à la fois par percentile_glissant (borne la mémoire)
+VALEURS_PAR_BLOC = 1 << 22
+
+
+def charger(source, colonnes, debut_us=None, fin_us=None):
+    """Charge des colonnes de l'historique en tableaux NumPy : {"timestamp": int64 µs, colonne: float}.
+
+    Un MagasinColonnes (dossier) est lu sans copie : les tableaux sont des
+    vues sur le mmap des fichiers de colonnes. Un CSV doit être parcouru
+    ligne à ligne ; pour des dizaines de millions d'échantillons, le
+    convertir d'abord (--convertir) est beaucoup plus rapide.
+    """
+    if os.path.isdir(source):
+        magasin = MagasinColonnes(source)
+        debut, fin = magasin.intervalle(debut_us, fin_us)
+        resultat = {"timestamp": np.frombuffer(magasin.lire("timestamp", debut, fin), dtype=np.int64)}
+        for colonne in colonnes:
+            if colonne not in magasin.colonnes():
+                raise KeyError(f"Colonne inconnue : {colonne}")
+            resultat[colonne] = np.frombuffer(magasin.lire(colonne, debut, fin), dtype=np.float32)
+        return resultat
+
+    temps = array("q")
+    valeurs = {colonne: array("d") for colonne in colonnes}
+    for ligne in lire_fenetre(source, debut_us, fin_us):
+        temps.append(iso_vers_epoch_us(ligne["timestamp"]))
+        for colonne, tableau in valeurs.items():
+            valeur = ligne.get(colonne, "")
+            tableau.append(float(valeur) if valeur != "" else np.nan)
+
+    resultat = {"timestamp": np.frombuffer(temps, dtype=np.int64)}
+    for colonne, tableau in valeurs.items():
+        if len(tableau) and not np.isfinite(np.frombuffer(tableau, dtype=np.float64)).any():
+            raise KeyError(f"Colonne inconnue ou vide : {colonne}")
+        resultat[colonne] = np.frombuffer(tableau, dtype=np.float64)
+    return resultat
+
+
+def _combler(x):
+    """Remplace chaque NaN par la dernière valeur connue (les NaN de tête restent)."""
+    x = np.asarray(x, dtype=np.float64)
+    connus = ~np.isnan(x)
+    if connus.all():
+        return x
+    positions = np.where(connus, np.arange(len(x)), 0)
+    np.maximum.accumulate(positions, out=positions)
+    return x[positions]
+
+
+def moyenne_mobile(x, fenetre):
+    """Moyenne des `fenetre` derniers échantillons (NaN ignorés), par sommes cumulées.
+
+    Les fenetre - 1 premières valeurs sont NaN (fenêtre incomplète).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    connus = ~np.isnan(x)
+    sommes = np.concatenate(([0.0], np.cumsum(np.where(connus, x, 0.0))))
+    nombres = np.concatenate(([0], np.cumsum(connus)))
+    resultat = np.full(len(x), np.nan)
+    if len(x) >= fenetre:
+        n = nombres[fenetre:] - nombres[:-fenetre]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            resultat[fenetre - 1:] = (sommes[fenetre:] - sommes[:-fenetre]) / n
+    return resultat
+
+
+def ewma(x, alpha):
+    """Moyenne mobile exponentielle y[i] = (1 - alpha) * y[i-1] + alpha * x[i], vectorisée.
+
+    Sur un bloc de n valeurs, y = p * (y_avant + alpha * cumsum(x / p)) avec
+    p = (1 - alpha) ** (1..n). Les blocs sont assez courts pour que 1 / p
+    reste représentable ; seule la boucle sur les blocs reste en Python.
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha doit être dans ]0, 1]")
+    x = _combler(x)
+    resultat = np.full(len(x), np.nan)
+    if alpha == 1:
+        resultat[:] = x
+        return resultat
+
+    # Après _combler, seuls les NaN de tête restent (colonne ajoutée en cours de route) :
+    # ils restent NaN et la moyenne démarre sur la première valeur connue
+    connus = np.flatnonzero(~np.isnan(x))
+    if not len(connus):
+        return resultat
+    premier = connus[0]
+
+    taille_bloc = max(1, int(600 / -np.log1p(-alpha)))
+    puissances = (1 - alpha) ** np.arange(1, min(taille_bloc, len(x) - premier) + 1)
+    precedent = x[premier]
+    for debut in range(premier, len(x), taille_bloc):
+        bloc = x[debut:debut + taille_bloc]
+        p = puissances[:len(bloc)]
+        y = p * (precedent + alpha * np.cumsum(bloc / p))
+        resultat[debut:debut + len(bloc)] = y
+        precedent = y[-1]
+    return resultat
+
+
+def percentile_glissant(x, fenetre, q):
+    """Percentile q des `fenetre` derniers échantillons, traité par blocs de fenêtres.
+
+    Le coût est proportionnel à len(x) * fenetre : garder des fenêtres de
+    l'ordre de la centaine d'échantillons sur de longues séries.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    resultat = np.full(len(x), np.nan)
+    if len(x) < fenetre:
+        return resultat
+    fenetres = np.lib.stride_tricks.sliding_window_view(x, fenetre)
+    lignes_par_bloc = max(1, VALEURS_PAR_BLOC // fenetre)
+    for debut in range(0, len(fenetres), lignes_par_bloc):
+        bloc = fenetres[debut:debut + lignes_par_bloc]
+        # Le tri ligne par ligne (vectorisé) est plus rapide que np.percentile(axis=1) ;
+        # les NaN passent à la fin et on interpole entre les rangs encadrants des valeurs connues
+        trie = np.sort(bloc, axis=1)
+        connus = (~np.isnan(bloc)).sum(axis=1)
+        rang = q / 100 * np.maximum(connus - 1, 0)
+        bas = np.floor(rang).astype(np.intp)
+        haut = np.minimum(bas + 1, np.maximum(connus - 1, 0))
+        v_bas = np.take_along_axis(trie, bas[:, None], axis=1)[:, 0]
+        v_haut = np.take_along_axis(trie, haut[:, None], axis=1)[:, 0]
+        resultat[fenetre - 1 + debut:fenetre - 1 + debut + len(bloc)] = np.where(
+            connus > 0, v_bas + (v_haut - v_bas) * (rang - bas), np.nan)
+    return resultat
+
+
+def taux_variation(temps_us, x, fenetre):
+    """Variation par heure entre chaque échantillon et celui `fenetre` échantillons plus tôt.
+
+    Pour un disque en %, c'est la vitesse de remplissage en points par heure.
+    """
+    x = _combler(x)
+    temps = np.asarray(temps_us, dtype=np.float64)
+    resultat = np.full(len(x), np.nan)
+    if len(x) > fenetre:
+        duree = (temps[fenetre:] - temps[:-fenetre]) / 3.6e9
+        with np.errstate(invalid="ignore", divide="ignore"):
+            resultat[fenetre:] = (x[fenetre:] - x[:-fenetre]) / duree
+    return resultat
+
+
+def scores_z(x, fenetre):
+    """Écart de chaque échantillon à la moyenne glissante, en écarts-types glissants.
+
+    Les sommes cumulées sont calculées sur les valeurs centrées sur la
+    moyenne globale, ce qui limite les pertes de précision sur de longues séries.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    centre = x - np.nanmean(x)
+    moyenne = moyenne_mobile(centre, fenetre)
+    carres = moyenne_mobile(centre * centre, fenetre)
+    ecart_type = np.sqrt(np.maximum(carres - moyenne * moyenne, 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (centre - moyenne) / ecart_type
+    z[ecart_type == 0] = 0.0
+    return z
+
+
+def analyser(source, colonne, fenetre=60, alpha=0.1, q=95, seuil_z=3.0, debut_us=None, fin_us=None):
+    """Calcule tous les indicateurs d'une colonne ; retourne un dictionnaire de tableaux.
+
+    fenetre est en nombre d'échantillons. "anomalies" contient les indices
+    des échantillons dont le score z dépasse seuil_z en valeur absolue.
+    """
+    donnees = charger(source, [colonne], debut_us, fin_us)
+    temps, x = donnees["timestamp"], donnees[colonne]
+    z = scores_z(x, fenetre)
+    with np.errstate(invalid="ignore"):
+        anomalies = np.flatnonzero(np.abs(z) > seuil_z)
+    return {
+        "timestamp": temps,
+        "valeur": x,
+        "moyenne_mobile": moyenne_mobile(x, fenetre),
+        "ewma": ewma(x, alpha),
+        f"p{q:g}": percentile_glissant(x, fenetre, q),
+        "taux_par_heure": taux_variation(temps, x, fenetre),
+        "score_z": z,
+        "anomalies": anomalies,
+    }
+
+
+def afficher_analyse(colonne, resultats, nombre_anomalies=10):
+    """Affiche les dernières valeurs des indicateurs, l'estimation de saturation et les anomalies."""
+    temps = resultats["timestamp"]
+    if not len(temps):
+        print("Aucune donnée dans la fenêtre.")
+        return
+
+    print(f"=== ANALYSE : {colonne} ({len(temps)} échantillons) ===")
+    for nom, serie in resultats.items():
+        if nom in ("timestamp", "anomalies"):
+            continue
+        print(f"{nom} : {serie[-1]:.3f}")
+
+    # Un disque qui se remplit : estimation du temps restant avant 100 %
+    taux = resultats["taux_par_heure"][-1]
+    if colonne.startswith("disk_") and taux > 0:
+        heures = (100 - resultats["valeur"][-1]) / taux
+        print(f"Saturation estimée dans {heures:.1f} h ({taux:.3f} points/h)")
+
+    anomalies = resultats["anomalies"]
+    print(f"Anomalies : {len(anomalies)}")
+    if len(anomalies):
+        pires = anomalies[np.argsort(-np.abs(resultats["score_z"][anomalies]))[:nombre_anomalies]]
+        for i in np.sort(pires):
+            print(f"  {epoch_us_vers_iso(int(temps[i]))} | {resultats['valeur'][i]:.2f} (z = {resultats['score_z'][i]:+.1f})")
+
+
+def sauver_analyse(fichier, resultats):
+    """Enregistre tous les tableaux de l'analyse dans une archive .npz."""
+    np.savez(fichier, **resultats)
@@ -0,0 +1,162 @@
+import math
+import threading
+from array import array
+
+# Fenêtres glissantes tenues à jour, en secondes (comme la charge système 1 / 5 / 15 min)
+FENETRES = (60, 300, 900)
+
+# Colonnes numériques gardées par défaut dans l'anneau
+COLONNES_ANNEAU = ("cpu_percent", "mem_percent", "disk_root_percent")
+
+
+class _FileMonotone:
+    """File d'indices (numéros d'échantillon) à valeurs monotones, sur un tableau circulaire préalloué.
+
+    Avec plus_petit=True, la tête est l'indice du minimum de la fenêtre ;
+    sinon celui du maximum. Chaque indice entre et sort une fois : O(1) amorti.
+    """
+
+    def __init__(self, capacite, plus_petit):
+        self.indices = array("q", bytes(8 * capacite))
+        self.capacite = capacite
+        self.plus_petit = plus_petit
+        self.tete = 0
+        self.longueur = 0
+
+    def ajouter(self, numero, valeur, valeurs):
+        capacite = self.capacite
+        # On retire de la queue les indices qui ne pourront plus jamais être l'extremum
+        while self.longueur:
+            dernier = self.indices[(self.tete + self.longueur - 1) % capacite]
+            precedente = valeurs[dernier % capacite]
+            if (precedente >= valeur) if self.plus_petit else (precedente <= valeur):
+                self.longueur -= 1
+            else:
+                break
+        self.indices[(self.tete + self.longueur) % capacite] = numero
+        self.longueur += 1
+
+    def retirer(self, numero):
+        """Appelé quand l'échantillon `numero` sort de la fenêtre."""
+        if self.longueur and self.indices[self.tete] == numero:
+            self.tete = (self.tete + 1) % self.capacite
+            self.longueur -= 1
+
+    def extremum(self, valeurs):
+        if not self.longueur:
+            return math.nan
+        return valeurs[self.indices[self.tete] % self.capacite]
+
+
+class _Fenetre:
+    """Somme, nombre, min et max d'une colonne sur une fenêtre glissante de l'anneau."""
+
+    def __init__(self, capacite):
+        self.somme = 0.0
+        self.nombre = 0
+        self.minimum = _FileMonotone(capacite, plus_petit=True)
+        self.maximum = _FileMonotone(capacite, plus_petit=False)
+
+
+class AnneauEchantillons:
+    """Derniers échantillons en mémoire, dans des tableaux de taille fixe, avec fenêtres glissantes.
+
+    Chaque colonne est un array de `capacite` doubles réécrit en boucle ;
+    pour chaque fenêtre (FENETRES) et chaque colonne, la somme, le nombre
+    et les files du min et du max sont mis à jour en O(1) à chaque
+    échantillon : lire une moyenne ou un max sur 15 min ne parcourt rien
+    et ne touche pas au disque. La capacité doit couvrir la plus grande
+    fenêtre (voir capacite_pour) ; sinon les fenêtres sont tronquées aux
+    `capacite` derniers échantillons. Les valeurs absentes sont ignorées.
+    """
+
+    def __init__(self, capacite, colonnes=COLONNES_ANNEAU, fenetres=FENETRES):
+        self.capacite = capacite
+        self.colonnes = tuple(colonnes)
+        self.durees = tuple(fenetres)
+        self.temps = array("q", bytes(8 * capacite))
+        self.valeurs = {c: array("d", bytes(8 * capacite)) for c in self.colonnes}
+        self.total = 0
+        # Pour chaque fenêtre : numéro du plus ancien échantillon encore dedans
+        self._debuts = [0] * len(self.durees)
+        self._fenetres = [{c: _Fenetre(capacite) for c in self.colonnes} for _ in self.durees]
+        self._verrou = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacite)
+
+    def ajouter(self, temps_us, ligne):
+        """Ajoute un échantillon (ligne d'historique) daté de temps_us."""
+        capacite = self.capacite
+        with self._verrou:
+            numero = self.total
+            # Les échantillons trop vieux (ou dont la case va être réécrite) sortent des fenêtres
+            for k, duree in enumerate(self.durees):
+                limite = temps_us - duree * 1_000_000
+                debut = self._debuts[k]
+                while debut < numero and (numero - debut >= capacite or self.temps[debut % capacite] <= limite):
+                    for colonne, fenetre in self._fenetres[k].items():
+                        valeur = self.valeurs[colonne][debut % capacite]
+                        if valeur == valeur:  # pas NaN
+                            fenetre.somme -= valeur
+                            fenetre.nombre -= 1
+                            if not fenetre.nombre:
+                                fenetre.somme = 0.0  # repart de zéro : pas d'erreur d'arrondi accumulée
+                            fenetre.minimum.retirer(debut)
+                            fenetre.maximum.retirer(debut)
+                    debut += 1
+                self._debuts[k] = debut
+
+            case = numero % capacite
+            self.temps[case] = temps_us
+            for colonne in self.colonnes:
+                valeur = ligne.get(colonne)
+                valeur = math.nan if valeur in (None, "") else float(valeur)
+                self.valeurs[colonne][case] = valeur
+                if valeur != valeur:
+                    continue
+                for fenetres in self._fenetres:
+                    fenetre = fenetres[colonne]
+                    fenetre.somme += valeur
+                    fenetre.nombre += 1
+                    fenetre.minimum.ajouter(numero, valeur, self.valeurs[colonne])
+                    fenetre.maximum.ajouter(numero, valeur, self.valeurs[colonne])
+            self.total += 1
+
+    def resume(self, duree):
+        """Retourne {colonne: {moyenne, min, max, nombre}} sur la fenêtre de `duree` secondes."""
+        k = self.durees.index(duree)
+        with self._verrou:
+            resultat = {}
+            for colonne, fenetre in self._fenetres[k].items():
+                valeurs = self.valeurs[colonne]
+                resultat[colonne] = {
+                    "moyenne": fenetre.somme / fenetre.nombre if fenetre.nombre else math.nan,
+                    "min": fenetre.minimum.extremum(valeurs),
+                    "max": fenetre.maximum.extremum(valeurs),
+                    "nombre": fenetre.nombre,
+                }
+            return resultat
+
+    def moyennes(self, colonne):
+        """Moyennes de la colonne sur chaque fenêtre, de la plus courte à la plus longue."""
+        with self._verrou:
+            return tuple(
+                fenetres[colonne].somme / fenetres[colonne].nombre if fenetres[colonne].nombre else math.nan
+                for fenetres in self._fenetres
+            )
+
+    def derniers(self, nombre):
+        """Retourne les `nombre` derniers échantillons : [(temps_us, {colonne: valeur})], du plus ancien au plus récent."""
+        with self._verrou:
+            nombre = min(nombre, len(self))
+            resultat = []
+            for numero in range(self.total - nombre, self.total):
+                case = numero % self.capacite
+                resultat.append((self.temps[case], {c: self.valeurs[c][case] for c in self.colonnes}))
+            return resultat
+
+
+def capacite_pour(intervalle, fenetres=FENETRES):
+    """Nombre de cases nécessaire pour couvrir la plus grande fenêtre à cet intervalle d'échantillonnage."""
+    return math.ceil(max(fenetres) / intervalle) + 1
@@ -0,0 +1,297 @@
+import collections
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+
+# Tailles (en lignes) des historiques synthétiques du banc de statistiques
+TAILLES_HISTORIQUE = (10_000, 1_000_000, 10_000_000)
+
+# Nombres de points de montage simulés pour la collecte des disques
+NOMBRES_MONTAGES = (1, 10, 100)
+
+# Écart relatif toléré par rapport à la référence avant de signaler une régression
+TOLERANCE = 0.20
+
+_TempsCPU = collections.namedtuple("scputimes", "user nice system idle iowait")
+_Memoire = collections.namedtuple("svmem", "total available percent used free")
+_Partition = collections.namedtuple("sdiskpart", "device mountpoint fstype opts")
+_Usage = collections.namedtuple("sdiskusage", "total used free percent")
+_TempsProcessus = collections.namedtuple("pcputimes", "user system")
+_MemoireProcessus = collections.namedtuple("pmem", "rss vms")
+
+
+def psutil_simule(nb_montages=1, nb_processus=300):
+    """Module psutil déterministe : mêmes valeurs à chaque exécution, sans appel système.
+
+    Les compteurs (temps CPU) avancent d'un pas fixe à chaque lecture, et
+    non avec l'horloge, pour que deux campagnes mesurent le même travail.
+    """
+    module = types.ModuleType("psutil")
+    lectures = {"cpu": 0, "processus": 0}
+
+    def cpu_times(percpu=False):
+        lectures["cpu"] += 1
+        n = lectures["cpu"]
+        coeur = _TempsCPU(n * 0.25, 0.0, n * 0.05, n * 0.7, 0.0)
+        return [coeur] * 8 if percpu else _TempsCPU(*(v * 8 for v in coeur))
+
+    def process_iter(attrs=None):
+        lectures["processus"] += 1
+        n = lectures["processus"]
+        for pid in range(1, nb_processus + 1):
+            p = types.SimpleNamespace(pid=pid)
+            p.info = {
+                "pid": pid,
+                "name": f"processus{pid % 40}",
+                "cpu_times": _TempsProcessus(n * (pid % 13) / 10, n * (pid % 3) / 10),
+                "memory_info": _MemoireProcessus(pid * 409_600, pid * 819_200),
+                "create_time": 1_700_000_000.0,
+            }
+            yield p
+
+    module.cpu_times = cpu_times
+    module.cpu_percent = lambda interval=None, percpu=False: [30.0] * 8 if percpu else 30.0
+    module.cpu_count = lambda logical=True: 8 if logical else 4
+    module.virtual_memory = lambda: _Memoire(16 * 2 ** 30, 6 * 2 ** 30, 62.5, 10 * 2 ** 30, 6 * 2 ** 30)
+    module.disk_partitions = lambda all=False: [_Partition("/dev/sda1", "/", "ext4", "rw")] + [
+        _Partition(f"/dev/sdb{i}", f"/mnt/volume{i}", "ext4", "rw") for i in range(1, nb_montages)
+    ]
+    module.disk_usage = lambda point: _Usage(500 * 2 ** 30, 200 * 2 ** 30, 300 * 2 ** 30, 40.0)
+    module.process_iter = process_iter
+    return module
+
+
+def charger_syswatch(psutil):
+    """(Re)charge les modules de syswatch sur le psutil donné ; retourne (traitement, syswatch_v3)."""
+    sys.modules["psutil"] = psutil
+    for nom in ("echantillonneur", "sonde_disques", "traitement", "syswatch_v3"):
+        if nom in sys.modules:
+            importlib.reload(sys.modules[nom])
+    import traitement
+    import syswatch_v3
+    return traitement, syswatch_v3
+
+
+def mesurer(fonction, repetitions):
+    """Exécute fonction `repetitions` fois ; retourne médiane, p95 et min en µs."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter_ns()
+        fonction()
+        durees.append((time.perf_counter_ns() - debut) / 1000)
+    durees.sort()
+    return {
+        "mediane_us": round(durees[len(durees) // 2], 2),
+        "p95_us": round(durees[min(int(len(durees) * 0.95), len(durees) - 1)], 2),
+        "min_us": round(durees[0], 2),
+        "valeur": round(durees[len(durees) // 2], 2),
+        "sens": "bas",
+    }
+
+
+def banc_collecte(repetitions):
+    """Latence de chaque sonde, et des disques selon le nombre de points de montage."""
+    resultats = {}
+    traitement, _ = charger_syswatch(psutil_simule())
+
+    def statique_froid():
+        traitement.invalider_statique()
+        traitement.recuperer_statique()
+
+    sondes = {
+        "recuperer_statique": statique_froid,
+        "recuperer_cpu": traitement.recuperer_cpu,
+        "recuperer_memoire": traitement.recuperer_memoire,
+        "recuperer_processus": traitement.recuperer_processus,
+        "recuperer_tout": traitement.recuperer_tout,
+    }
+    for nom, fonction in sondes.items():
+        resultats[f"collecte.{nom}"] = mesurer(fonction, repetitions)
+
+    for nb_montages in NOMBRES_MONTAGES:
+        traitement, _ = charger_syswatch(psutil_simule(nb_montages))
+        resultats[f"collecte.recuperer_disques[{nb_montages}]"] = mesurer(traitement.recuperer_disques, repetitions)
+    return resultats
+
+
+def banc_export(dossier, nb_lignes):
+    """Débit (lignes/s) de exporter_csv (CSV et magasin en colonnes), du journal et de exporter_json."""
+    resultats = {}
+    traitement, syswatch_v3 = charger_syswatch(psutil_simule(nb_montages=4))
+    metriques = traitement.recuperer_tout()
+    debut = datetime(2024, 1, 1)
+    echantillons = [{**metriques, "timestamp": (debut + timedelta(seconds=i)).isoformat()} for i in range(nb_lignes)]
+
+    ecrivains = {
+        "csv": lambda: syswatch_v3.EcrivainCSV(os.path.join(dossier, "export.csv")),
+        "colonnes": lambda: syswatch_v3.MagasinColonnes(os.path.join(dossier, "export_colonnes")),
+    }
+    for nom, creer in ecrivains.items():
+        ecrivain = creer()
+        chrono = time.perf_counter()
+        for echantillon in echantillons:
+            syswatch_v3.exporter_csv(echantillon, ecrivain)
+        ecrivain.fermer()
+        duree = time.perf_counter() - chrono
+        resultats[f"export.{nom}"] = {"lignes_par_s": round(nb_lignes / duree), "valeur": round(nb_lignes / duree), "sens": "haut"}
+
+    nb_json = max(nb_lignes // 100, 1)
+    fichier = os.path.join(dossier, "export.json")
+    chrono = time.perf_counter()
+    for echantillon in echantillons[:nb_json]:
+        syswatch_v3.exporter_json(echantillon, fichier)
+    duree = time.perf_counter() - chrono
+    resultats["export.json"] = {"fichiers_par_s": round(nb_json / duree), "valeur": round(nb_json / duree), "sens": "haut"}
+
+    from journal import JournalInstantanes
+    chrono = time.perf_counter()
+    with JournalInstantanes(os.path.join(dossier, "collectes.ndjson")) as journal:
+        for echantillon in echantillons:
+            journal.ajouter(echantillon)
+    duree = time.perf_counter() - chrono
+    resultats["export.journal"] = {"lignes_par_s": round(nb_lignes / duree), "valeur": round(nb_lignes / duree), "sens": "haut"}
+    return resultats
+
+
+def generer_historique(fichier, nb_lignes, graine=42):
+    """Écrit un historique synthétique (mêmes colonnes que preparer_ligne, 4 disques)."""
+    hasard = random.Random(graine)
+    entete = ["timestamp", "hote", "cpu_percent", "mem_dispo_gb", "mem_percent",
+              "disk_root_percent", "disk_mnt_volume1_percent", "disk_mnt_volume2_percent", "disk_mnt_volume3_percent"]
+    debut = int(datetime(2024, 1, 1).timestamp())
+    with open(fichier, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(entete) + "\n")
+        lot = []
+        for i in range(nb_lignes):
+            cpu = hasard.random() * 100
+            lot.append(f"{datetime.fromtimestamp(debut + i).isoformat()},bench0000,{cpu:.1f},"
+                       f"{6 + cpu / 50:.3f},{40 + cpu / 4:.1f},40.0,55.5,12.0,{cpu / 2:.1f}\n")
+            if len(lot) == 10_000:
+                f.writelines(lot)
+                lot = []
+        f.writelines(lot)
+
+
+def banc_statistiques(dossier, tailles):
+    """Débit de calculer_moyennes sur des historiques synthétiques de différentes tailles."""
+    resultats = {}
+    _, syswatch_v3 = charger_syswatch(psutil_simule())
+    for nb_lignes in tailles:
+        fichier = os.path.join(dossier, f"historique_{nb_lignes}.csv")
+        generer_historique(fichier, nb_lignes)
+        chrono = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            syswatch_v3.calculer_moyennes(fichier, brut=True)
+        duree = time.perf_counter() - chrono
+        os.remove(fichier)
+        resultats[f"stats.calculer_moyennes[{nb_lignes}]"] = {
+            "duree_s": round(duree, 3),
+            "lignes_par_s": round(nb_lignes / duree),
+            "valeur": round(nb_lignes / duree),
+            "sens": "haut",
+        }
+    return resultats
+
+
+def banc_alertes(repetitions, nb_regles=500):
+    """Latence du moteur d'alertes par échantillon, avec nb_regles règles sur les colonnes usuelles."""
+    from alertes import MoteurAlertes, compiler
+    colonnes = ("cpu_percent", "mem_percent", "disk_root_percent", "mem_dispo_gb")
+    definitions = [{"nom": f"regle{i}", "si": [f"{colonnes[i % 4]} > {50 + i % 50}", f"{colonnes[(i + 1) % 4]} < {i % 90}"],
+                    "pendant": 1 + i % 3, "hysteresis": 2} for i in range(nb_regles)]
+    moteur = MoteurAlertes(compiler(definitions), afficher=False)
+    hasard = random.Random(42)
+    debut = datetime(2024, 1, 1)
+    lignes = [{"timestamp": (debut + timedelta(seconds=i)).isoformat(),
+               **{c: round(hasard.random() * 100, 1) for c in colonnes}} for i in range(max(repetitions, 1))]
+    suivante = iter(lignes * 2)
+    resultat = mesurer(lambda: moteur.evaluer(None, next(suivante)), repetitions)
+    return {f"alertes.evaluer[{nb_regles}]": resultat}
+
+
+def executer(tailles=TAILLES_HISTORIQUE, repetitions=200, lignes_export=20_000):
+    """Lance tous les bancs et retourne le rapport (sérialisable en JSON)."""
+    psutil_reel = sys.modules.get("psutil")
+    dossier = tempfile.mkdtemp(prefix="syswatch-bench-")
+    try:
+        resultats = banc_collecte(repetitions)
+        resultats.update(banc_export(dossier, lignes_export))
+        resultats.update(banc_statistiques(dossier, tailles))
+        resultats.update(banc_alertes(repetitions))
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+        if psutil_reel is not None:
+            sys.modules["psutil"] = psutil_reel
+        else:
+            sys.modules.pop("psutil", None)
+
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "processeur": platform.machine(),
+        "resultats": resultats,
+    }
+
+
+def comparer(rapport, reference, tolerance=TOLERANCE):
+    """Retourne la liste des régressions de `rapport` par rapport à `reference`.
+
+    Chaque résultat porte une "valeur" et son "sens" : "bas" (latence, plus
+    petit est meilleur) ou "haut" (débit). Les bancs absents d'un des deux
+    rapports sont ignorés.
+    """
+    regressions = []
+    for nom, resultat in rapport["resultats"].items():
+        ancien = reference["resultats"].get(nom)
+        if ancien is None or not ancien["valeur"]:
+            continue
+        ecart = (resultat["valeur"] - ancien["valeur"]) / ancien["valeur"]
+        if resultat["sens"] == "haut":
+            ecart = -ecart
+        if ecart > tolerance:
+            regressions.append({"banc": nom, "reference": ancien["valeur"],
+                                "mesure": resultat["valeur"], "ecart": round(ecart, 3)})
+    return regressions
+
+
+if __name__ == "__main__":
+
+    args = sys.argv
+
+    tailles = TAILLES_HISTORIQUE
+    if "--tailles" in args:
+        tailles = [int(t) for t in args[args.index("--tailles") + 1].split(",")]
+
+    repetitions = 200
+    if "--repetitions" in args:
+        repetitions = int(args[args.index("--repetitions") + 1])
+
+    rapport = executer(tailles, repetitions)
+
+    if "--sauver" in args:
+        with open(args[args.index("--sauver") + 1], "w", encoding="utf-8") as f:
+            json.dump(rapport, f, indent=2)
+
+    print(json.dumps(rapport, indent=2))
+
+    # COMPARAISON avec une référence : code de sortie 1 en cas de régression
+    if "--comparer" in args:
+        tolerance = TOLERANCE
+        if "--tolerance" in args:
+            tolerance = float(args[args.index("--tolerance") + 1])
+        with open(args[args.index("--comparer") + 1], "r", encoding="utf-8") as f:
+            regressions = comparer(rapport, json.load(f), tolerance)
+        for r in regressions:
+            print(f"[Régression] {r['banc']} : {r['reference']} → {r['mesure']} ({r['ecart']:+.0%})", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
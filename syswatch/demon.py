@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import re
+import socket
+import stat
+import threading
+from collections import deque
+
+# Adresse d'écoute par défaut : socket Unix quand c'est possible, sinon TCP local
+if hasattr(socket, "AF_UNIX"):
+    ADRESSE_DEFAUT = "/tmp/syswatch.sock"
+else:
+    ADRESSE_DEFAUT = "127.0.0.1:8765"
+
+
+def adresse_tcp(adresse):
+    """Retourne (hôte, port) si l'adresse est de la forme hote:port, sinon None (socket Unix)."""
+    correspondance = re.fullmatch(r"([\w.\-]+):(\d+)", adresse)
+    if correspondance is None:
+        return None
+    return correspondance.group(1), int(correspondance.group(2))
+
+
+def liberer_socket(adresse):
+    """Prépare le chemin d'une socket Unix : retire une socket abandonnée, rien d'autre.
+
+    OSError si le chemin est un autre fichier ou une socket où un démon
+    répond encore (on ne lui vole pas son adresse).
+    """
+    try:
+        mode = os.lstat(adresse).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{adresse} existe et n'est pas une socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as test:
+        try:
+            test.connect(adresse)
+        except ConnectionRefusedError:
+            os.remove(adresse)  # plus personne n'écoute : socket d'un démon arrêté brutalement
+            return
+    raise OSError(f"{adresse} est utilisée par un démon actif")
+
+
+def _erreur(message):
+    return (json.dumps({"erreur": message}) + "\n").encode("utf-8")
+
+
+def _entier_positif(mots, defaut):
+    """Argument numérique d'une commande (mots[1]) ; ValueError si ce n'est pas un entier >= 0."""
+    if len(mots) < 2:
+        return defaut
+    if not mots[1].isdigit():
+        raise ValueError(f"Nombre invalide : {mots[1]} (entier positif attendu)")
+    return int(mots[1])
+
+
+def instantane_complet(statique, metriques):
+    """Complète un échantillon dynamique avec les infos statiques : même forme que recuperer_tout()."""
+    return {
+        "timestamp": metriques["timestamp"],
+        "hote": metriques["hote"],
+        "systeme": statique["systeme"],
+        "cpu": {
+            "coeurs_physiques": statique["coeurs_physiques"],
+            "coeurs_logiques": statique["coeurs_logiques"],
+            **metriques["cpu"]
+        } if "cpu" in metriques else None,
+        "memoire": {"total": statique["memoire_totale"], **metriques["memoire"]} if "memoire" in metriques else None,
+        "disques": metriques.get("disques"),
+        "processus": metriques.get("processus"),
+        "_meta": metriques.get("_meta")
+    }
+
+
+class EtatDemon:
+    """Dernier instantané et historique récent, partagés entre la collecte et le serveur.
+
+    La réponse à "dernier" est encodée une seule fois, au moment de la mise
+    à jour : une requête ne fait qu'écrire des octets déjà prêts. "fenetres"
+    lit les moyennes, min et max 1 / 5 / 15 min dans l'anneau de la
+    collecte (anneau.AnneauEchantillons), tenus à jour à chaque échantillon.
+    """
+
+    def __init__(self, taille_historique=720):
+        self._verrou = threading.Lock()
+        self._historique = deque(maxlen=taille_historique)
+        self._dernier = b"null\n"
+        self.statique = None
+        self.anneau = None
+
+    def mettre_a_jour(self, metriques, ligne):
+        """Reçoit l'échantillon dynamique et sa ligne d'historique (voir collecter_en_continu)."""
+        instantane = instantane_complet(self.statique, metriques)
+        encode = (json.dumps(instantane) + "\n").encode("utf-8")
+        with self._verrou:
+            self._dernier = encode
+            self._historique.append(ligne)
+
+    def repondre(self, commande):
+        """Retourne la réponse (octets JSON terminés par un saut de ligne) à une commande."""
+        mots = commande.split()
+        if not mots or mots[0] == "dernier":
+            return self._dernier
+        if mots[0] == "historique":
+            try:
+                nombre = _entier_positif(mots, len(self._historique))
+            except ValueError as e:
+                return _erreur(str(e))
+            with self._verrou:
+                lignes = list(self._historique)[-nombre:] if nombre else []
+            return (json.dumps(lignes) + "\n").encode("utf-8")
+        if mots[0] == "fenetres":
+            if self.anneau is None:
+                return b"null\n"
+            try:
+                durees = [_entier_positif(mots, None)] if len(mots) > 1 else self.anneau.durees
+            except ValueError as e:
+                return _erreur(str(e))
+            if any(duree not in self.anneau.durees for duree in durees):
+                return _erreur(f"Fenêtres disponibles : {list(self.anneau.durees)}")
+            # NaN (fenêtre vide) n'existe pas en JSON : on répond null
+            fenetres = {duree: {colonne: {cle: None if isinstance(v, float) and math.isnan(v) else v
+                                          for cle, v in resume.items()}
+                                for colonne, resume in self.anneau.resume(duree).items()}
+                        for duree in durees}
+            return (json.dumps(fenetres) + "\n").encode("utf-8")
+        if mots[0] == "ping":
+            return b'"pong"\n'
+        return _erreur(f"Commande inconnue : {mots[0]}")
+
+
+async def _traiter_client(etat, lecteur, ecrivain):
+    """Une commande par ligne ; une requête HTTP GET (/dernier, /historique/10...) est aussi acceptée."""
+    try:
+        while True:
+            ligne = await lecteur.readline()
+            if not ligne:
+                break
+            texte = ligne.decode("utf-8", "replace").strip()
+
+            if texte.startswith("GET "):
+                # Requête HTTP : on ignore les en-têtes, on répond puis on ferme
+                while (await lecteur.readline()).strip():
+                    pass
+                commande = texte.split()[1].strip("/").replace("/", " ")
+                corps = etat.repondre(commande)
+                ecrivain.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                               b"Content-Length: " + str(len(corps)).encode() + b"\r\n"
+                               b"Connection: close\r\n\r\n" + corps)
+                await ecrivain.drain()
+                break
+
+            ecrivain.write(etat.repondre(texte))
+            await ecrivain.drain()
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        ecrivain.close()
+
+
+async def servir(etat, adresse=ADRESSE_DEFAUT, arret=None):
+    """Sert les requêtes sur la socket Unix ou l'adresse TCP jusqu'à ce que `arret` soit posé."""
+    # Importé ici : le client (interroger) démarre plus vite sans asyncio
+    import asyncio
+
+    traiter = lambda lecteur, ecrivain: _traiter_client(etat, lecteur, ecrivain)
+    tcp = adresse_tcp(adresse)
+    if tcp is None:
+        liberer_socket(adresse)
+        serveur = await asyncio.start_unix_server(traiter, adresse)
+    else:
+        serveur = await asyncio.start_server(traiter, *tcp)
+
+    try:
+        async with serveur:
+            if arret is None:
+                await serveur.serve_forever()
+            else:
+                await arret.wait()
+    finally:
+        if tcp is None and os.path.exists(adresse):
+            os.remove(adresse)
+
+
+def interroger(commande="dernier", adresse=ADRESSE_DEFAUT, delai=2.0):
+    """Client minimal : envoie une commande au démon et retourne la réponse décodée."""
+    tcp = adresse_tcp(adresse)
+    if tcp is None:
+        connexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        cible = adresse
+    else:
+        connexion = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cible = tcp
+
+    with connexion:
+        connexion.settimeout(delai)
+        connexion.connect(cible)
+        connexion.sendall(commande.encode("utf-8") + b"\n")
+        with connexion.makefile("rb") as f:
+            return json.loads(f.readline())
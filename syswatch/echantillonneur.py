@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import deque
+
+import psutil
+
+
+def _temps_occupe(t):
+    """Retourne (temps total, temps occupé) d'une entrée de psutil.cpu_times()."""
+    total = sum(t)
+    # Sous Linux, guest et guest_nice sont déjà comptés dans user et nice
+    total -= getattr(t, "guest", 0) + getattr(t, "guest_nice", 0)
+    occupe = total - t.idle - getattr(t, "iowait", 0)
+    return total, occupe
+
+
+def _pourcentage(avant, apres):
+    """Calcule le pourcentage d'utilisation entre deux relevés cpu_times."""
+    total_avant, occupe_avant = _temps_occupe(avant)
+    total_apres, occupe_apres = _temps_occupe(apres)
+    delta_total = total_apres - total_avant
+    if delta_total <= 0:
+        return 0.0
+    pourcentage = (occupe_apres - occupe_avant) / delta_total * 100
+    return round(min(max(pourcentage, 0.0), 100.0), 1)
+
+
+class EchantillonneurCPU:
+    """Suit l'utilisation CPU (totale et par cœur) sans bloquer l'appelant.
+
+    Un thread relève psutil.cpu_times() toutes les `periode` secondes et
+    garde les relevés des `fenetre` dernières secondes. L'utilisation est
+    recalculée à chaque relevé, donc lire() ne fait que renvoyer la
+    dernière valeur. Sans thread démarré, lire() calcule le delta depuis
+    le plus ancien relevé de la fenêtre (mode suivi par horloge monotone).
+    """
+
+    def __init__(self, fenetre=1.0, periode=0.1):
+        if fenetre <= 0 or periode <= 0:
+            raise ValueError("La fenêtre et la période doivent être positives")
+        self.fenetre = fenetre
+        self.periode = min(periode, fenetre)
+        self._releves = deque()
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._thread = None
+        self._dernier = None
+        self._relever()
+
+    def _relever(self):
+        """Ajoute un relevé à la fenêtre et met à jour la dernière valeur."""
+        maintenant = time.monotonic()
+        releve = (maintenant, psutil.cpu_times(), psutil.cpu_times(percpu=True))
+
+        with self._verrou:
+            self._releves.append(releve)
+            # On garde le plus récent relevé plus vieux que la fenêtre comme référence
+            while len(self._releves) > 2 and maintenant - self._releves[1][0] >= self.fenetre:
+                self._releves.popleft()
+
+            debut = self._releves[0]
+            if debut is releve:
+                return
+
+            self._dernier = {
+                "utilisation": _pourcentage(debut[1], releve[1]),
+                "par_coeur": [_pourcentage(a, b) for a, b in zip(debut[2], releve[2])],
+                "fenetre": round(maintenant - debut[0], 3),
+            }
+
+    def _boucle(self):
+        prochain = time.monotonic()
+        while not self._arret.is_set():
+            self._relever()
+            prochain += self.periode
+            attente = prochain - time.monotonic()
+            if attente < 0:
+                # Retard : on repart de maintenant plutôt que de rattraper
+                prochain = time.monotonic()
+                attente = 0
+            self._arret.wait(attente)
+
+    def demarrer(self):
+        """Lance le thread de fond (sans effet s'il tourne déjà)."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name="syswatch-cpu", daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        """Arrête le thread de fond."""
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def en_marche(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def lire(self):
+        """Retourne la dernière utilisation connue.
+
+        Si le thread ne tourne pas, un relevé est fait immédiatement. Tant que
+        la fenêtre ne contient qu'un seul relevé, on attend `periode` pour en
+        avoir un second plutôt que de renvoyer une valeur fausse.
+        """
+        if not self.en_marche():
+            self._relever()
+        while self._dernier is None:
+            time.sleep(self.periode)
+            self._relever()
+        with self._verrou:
+            return dict(self._dernier, par_coeur=list(self._dernier["par_coeur"]))
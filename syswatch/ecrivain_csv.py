@@ -0,0 +1,273 @@
+import csv
+import glob
+import gzip
+import io
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from index_temps import IndexTemps, chemin_index, iso_vers_epoch_us, reconstruire_index
+
+POLITIQUES_FSYNC = ("jamais", "flush", "toujours")
+
+
+def lire_entete(fichier, taille_bloc=64 * 1024):
+    """Retourne le dernier en-tête écrit dans le CSV et sa position en octets.
+
+    Le fichier est lu à reculons, par blocs, depuis la fin : l'ouverture
+    d'un gros historique ne coûte que la distance au dernier en-tête.
+    Retourne (None, 0) si le fichier n'existe pas ou n'a pas d'en-tête.
+    """
+    motif = b"\ntimestamp,"
+    try:
+        f = open(fichier, "rb")
+    except FileNotFoundError:
+        return None, 0
+    with f:
+        fin = f.seek(0, os.SEEK_END)
+        # début du bloc suivant : un motif à cheval sur deux blocs est quand même trouvé
+        suite = b""
+        while fin > 0:
+            debut = max(0, fin - taille_bloc)
+            f.seek(debut)
+            bloc = f.read(fin - debut) + suite
+            i = bloc.rfind(motif)
+            if i >= 0:
+                position = debut + i + 1
+                break
+            if debut == 0 and bloc.startswith(motif[1:]):
+                position = 0
+                break
+            suite = bloc[:len(motif) - 1]
+            fin = debut
+        else:
+            return None, 0
+        f.seek(position)
+        entete = f.readline()
+    return next(csv.reader([entete.decode("utf-8")])), position
+
+
+def fichiers_historique(fichier):
+    """Retourne les segments archivés (du plus ancien au plus récent) puis le fichier courant."""
+    racine, extension = os.path.splitext(fichier)
+    motif = f"{glob.escape(racine)}-*{extension}"
+    archives = set(glob.glob(motif))
+    # Un segment en cours de compression existe encore en clair : on garde le clair
+    archives |= {a for a in glob.glob(motif + ".gz") if a[:-3] not in archives}
+    segments = sorted(archives)
+    if os.path.exists(fichier):
+        segments.append(fichier)
+    return segments
+
+
+def ouvrir_segment(fichier):
+    """Ouvre un segment en lecture texte, qu'il soit compressé ou non."""
+    if fichier.endswith(".gz"):
+        return gzip.open(fichier, "rt", newline="", encoding="utf-8")
+    return open(fichier, "r", newline="", encoding="utf-8")
+
+
+def lire_historique(fichier):
+    """Parcourt les lignes du CSV sous forme de dictionnaires.
+
+    Si les colonnes ont changé en cours de fichier, un nouvel en-tête a été
+    écrit : on le détecte et on l'utilise pour les lignes suivantes.
+    """
+    with ouvrir_segment(fichier) as f:
+        entete = None
+        for ligne in csv.reader(f):
+            if not ligne:
+                continue
+            if ligne[0] == "timestamp":
+                entete = ligne
+                continue
+            if entete is not None:
+                yield dict(zip(entete, ligne))
+
+
+def _lire_depuis(fichier, position_ligne, position_entete):
+    """Parcourt les lignes d'un CSV non compressé à partir d'une position connue."""
+    with open(fichier, "rb") as f:
+        f.seek(position_entete)
+        entete = next(csv.reader([f.readline().decode("utf-8")]))
+        f.seek(position_ligne)
+        for ligne in f:
+            valeurs = next(csv.reader([ligne.decode("utf-8")]), None)
+            if not valeurs:
+                continue
+            if valeurs[0] == "timestamp":
+                entete = valeurs
+                continue
+            yield dict(zip(entete, valeurs))
+
+
+def lire_fenetre(fichier, debut_us=None, fin_us=None):
+    """Parcourt seulement les lignes dont le timestamp est dans [debut_us, fin_us].
+
+    Grâce à l'index de chaque segment, on saute directement près du début de
+    la fenêtre (recherche dichotomique) et on s'arrête après la fin : le coût
+    ne dépend pas de la taille de l'historique. Les segments compressés ne
+    permettent pas de sauter : ils sont ignorés s'ils sont hors fenêtre,
+    sinon lus en entier.
+    """
+    debut_us = -2 ** 63 if debut_us is None else debut_us
+    fin_us = 2 ** 63 - 1 if fin_us is None else fin_us
+    segments = fichiers_historique(fichier)
+    index = [IndexTemps(chemin_index(s)) for s in segments]
+
+    for k, segment in enumerate(segments):
+        premier = index[k].premier_temps()
+        if premier is not None and premier > fin_us:
+            return
+        suivant = index[k + 1].premier_temps() if k + 1 < len(segments) else None
+        if suivant is not None and suivant < debut_us:
+            continue
+
+        depart = None if segment.endswith(".gz") else index[k].chercher(debut_us)
+        lignes = lire_historique(segment) if depart is None else _lire_depuis(segment, *depart)
+        for ligne in lignes:
+            temps = iso_vers_epoch_us(ligne["timestamp"])
+            if temps > fin_us:
+                return
+            if temps >= debut_us:
+                yield ligne
+
+
+def _compresser(chemin):
+    with open(chemin, "rb") as source, gzip.open(chemin + ".gz.tmp", "wb") as cible:
+        shutil.copyfileobj(source, cible)
+    os.replace(chemin + ".gz.tmp", chemin + ".gz")
+    os.remove(chemin)
+
+
+class EcrivainCSV:
+    """Écrivain CSV ouvert pour toute la session, avec tampon et rotation.
+
+    - taille_tampon / delai_flush : les lignes sont écrites par lots, dès que
+      le tampon est plein ou que le dernier flush date de plus de delai_flush s ;
+    - fsync : "jamais" (on laisse faire l'OS), "flush" (après chaque lot) ou
+      "toujours" (après chaque ligne, le plus sûr et le plus lent) ;
+    - taille_max (octets) / duree_max (secondes) : rotation du fichier courant
+      vers historique-AAAAMMJJ-HHMMSS.csv, compressé en .gz si compresser=True ;
+    - pas_index : une entrée d'index temporel (fichier + ".idx") toutes les
+      pas_index lignes, pour les requêtes par fenêtre (0 pour désactiver).
+    """
+
+    def __init__(self, fichier, taille_tampon=100, delai_flush=5.0, fsync="jamais",
+                 taille_max=None, duree_max=None, compresser=False, pas_index=100):
+        if fsync not in POLITIQUES_FSYNC:
+            raise ValueError(f"Politique fsync inconnue : {fsync} (choix : {', '.join(POLITIQUES_FSYNC)})")
+        self.fichier = fichier
+        self.taille_tampon = 1 if fsync == "toujours" else taille_tampon
+        self.delai_flush = delai_flush
+        self.fsync = fsync
+        self.taille_max = taille_max
+        self.duree_max = duree_max
+        self.compresser = compresser
+        self.pas_index = pas_index
+        self._tampon = []
+        self._texte = io.StringIO()
+        self._csv = csv.writer(self._texte)
+        self._compressions = []
+        self._ouvrir()
+
+    def _ouvrir(self):
+        self._entete, self._position_entete = lire_entete(self.fichier)
+        self._f = open(self.fichier, "ab")
+        self.taille = self._f.tell()
+        self.index = None
+        if self.pas_index:
+            # Historique existant sans index (ancienne version) : on le reconstruit une fois
+            if self.taille and not os.path.exists(chemin_index(self.fichier)):
+                reconstruire_index(self.fichier, self.pas_index)
+            self.index = IndexTemps(chemin_index(self.fichier), self.pas_index)
+        self._ouvert_le = time.monotonic()
+        self._dernier_flush = time.monotonic()
+
+    def _formater(self, valeurs):
+        self._texte.seek(0)
+        self._texte.truncate()
+        self._csv.writerow(valeurs)
+        return self._texte.getvalue().encode("utf-8")
+
+    def ecrire(self, ligne):
+        """Ajoute une ligne (dictionnaire) au tampon ; retourne sa position en octets."""
+        colonnes = list(ligne.keys())
+        if colonnes != self._entete:
+            # Fichier neuf ou colonnes différentes : on (ré)écrit l'en-tête
+            self._position_entete = self.taille
+            self._ajouter(self._formater(colonnes))
+            self._entete = colonnes
+
+        position = self.taille
+        self._ajouter(self._formater(ligne.values()))
+        if self.index is not None:
+            self.index.ajouter(ligne["timestamp"], position, self._position_entete)
+
+        if len(self._tampon) >= self.taille_tampon or time.monotonic() - self._dernier_flush >= self.delai_flush:
+            self.flush()
+        return position
+
+    def _ajouter(self, octets):
+        self._tampon.append(octets)
+        self.taille += len(octets)
+
+    def flush(self):
+        """Écrit le tampon sur disque puis applique la politique fsync."""
+        if self._tampon:
+            self._f.write(b"".join(self._tampon))
+            self._tampon.clear()
+            self._f.flush()
+            if self.fsync != "jamais":
+                os.fsync(self._f.fileno())
+            # L'index n'est écrit qu'après les données qu'il référence
+            if self.index is not None:
+                self.index.flush()
+        self._dernier_flush = time.monotonic()
+        self._verifier_rotation()
+
+    def _verifier_rotation(self):
+        trop_gros = self.taille_max is not None and self.taille >= self.taille_max
+        trop_vieux = self.duree_max is not None and time.monotonic() - self._ouvert_le >= self.duree_max
+        if (trop_gros or trop_vieux) and self.taille > 0:
+            self.rotation()
+
+    def rotation(self):
+        """Ferme le fichier courant, l'archive sous un nom horodaté et en ouvre un neuf."""
+        self._f.write(b"".join(self._tampon))
+        self._tampon.clear()
+        self._f.close()
+
+        racine, extension = os.path.splitext(self.fichier)
+        archive = f"{racine}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{extension}"
+        os.replace(self.fichier, archive)
+        if self.index is not None:
+            self.index.flush()
+            os.replace(self.index.chemin, chemin_index(archive))
+
+        if self.compresser:
+            # La compression se fait en arrière-plan pour ne pas retarder la collecte
+            thread = threading.Thread(target=_compresser, args=(archive,), daemon=True)
+            thread.start()
+            self._compressions.append(thread)
+
+        self._ouvrir()
+        return archive
+
+    def fermer(self):
+        """Vide le tampon et ferme le fichier (attend les compressions en cours)."""
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.close()
+        for thread in self._compressions:
+            thread.join()
+        self._compressions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+from demon import adresse_tcp, liberer_socket
+from stockage_colonnes import MagasinColonnes
+
+
+def encoder_lot(lignes):
+    """Encode un lot de lignes en messages compacts (colonnes une fois, puis les valeurs).
+
+    Des lignes consécutives aux mêmes colonnes partagent un message ; un
+    changement de colonnes (disque ajouté...) en commence un nouveau.
+    """
+    messages = []
+    colonnes, valeurs = None, []
+    for ligne in lignes:
+        cles = list(ligne.keys())
+        if cles != colonnes:
+            if valeurs:
+                messages.append(json.dumps({"colonnes": colonnes, "lignes": valeurs}) + "\n")
+            colonnes, valeurs = cles, []
+        valeurs.append(list(ligne.values()))
+    if valeurs:
+        messages.append(json.dumps({"colonnes": colonnes, "lignes": valeurs}) + "\n")
+    return [m.encode("utf-8") for m in messages]
+
+
+def _connecter(adresse, delai):
+    tcp = adresse_tcp(adresse)
+    if tcp is None:
+        connexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        cible = adresse
+    else:
+        connexion = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cible = tcp
+    connexion.settimeout(delai)
+    try:
+        connexion.connect(cible)
+    except OSError:
+        connexion.close()
+        raise
+    return connexion
+
+
+class Agent:
+    """Pousse les échantillons vers un agrégateur central, par lots.
+
+    - la collecte n'est jamais bloquée : envoyer() dépose la ligne dans une
+      file bornée, et si la file est pleine la ligne part dans le spool ;
+    - un thread forme des lots (taille_lot lignes ou delai_lot secondes) et
+      attend l'accusé "ok" de l'agrégateur avant le lot suivant : c'est
+      l'agrégateur qui impose le rythme (contre-pression) ;
+    - si l'agrégateur est injoignable, les lots sont ajoutés au spool
+      (NDJSON sur disque) et renvoyés en priorité à la reconnexion ;
+    - un lot que l'agrégateur refuse ("rejete ...") est abandonné et compté
+      dans `rejetes` : le renvoyer ne changerait rien et bloquerait la file.
+
+    hote remplace la clé d'hôte des lignes (utile pour lancer plusieurs
+    agents sur une même machine).
+    """
+
+    def __init__(self, adresse, taille_lot=100, delai_lot=1.0, spool="spool_agent.ndjson",
+                 capacite=10_000, delai_reseau=5.0, hote=None):
+        self.adresse = adresse
+        self.hote = hote
+        self.taille_lot = taille_lot
+        self.delai_lot = delai_lot
+        self.spool = spool
+        self.delai_reseau = delai_reseau
+        self._file = queue.Queue(maxsize=capacite)
+        self._verrou_spool = threading.Lock()
+        self._connexion = None
+        self._lecteur = None
+        self._arret = threading.Event()
+        self.envoyes = 0
+        self.spoules = 0
+        self.rejetes = 0
+        self._thread = threading.Thread(target=self._boucle, name="syswatch-agent", daemon=True)
+        self._thread.start()
+
+    def envoyer(self, metriques, ligne):
+        """Observateur de collecter_en_continu : ne bloque jamais la collecte."""
+        if self.hote is not None:
+            ligne = {**ligne, "hote": self.hote}
+        try:
+            self._file.put_nowait(ligne)
+        except queue.Full:
+            self._spooler(encoder_lot([ligne]))
+
+    def _spooler(self, messages):
+        with self._verrou_spool:
+            with open(self.spool, "ab") as f:
+                f.writelines(messages)
+        self.spoules += len(messages)
+
+    def _former_lot(self):
+        lot = []
+        limite = time.monotonic() + self.delai_lot
+        while len(lot) < self.taille_lot:
+            reste = limite - time.monotonic()
+            if reste <= 0:
+                break
+            try:
+                lot.append(self._file.get(timeout=reste))
+            except queue.Empty:
+                break
+        return lot
+
+    def _transmettre(self, message):
+        """Envoie un lot ; True s'il est stocké, False si l'agrégateur le refuse."""
+        if self._connexion is None:
+            self._connexion = _connecter(self.adresse, self.delai_reseau)
+            self._lecteur = self._connexion.makefile("rb")
+        self._connexion.sendall(message)
+        accuse = self._lecteur.readline()
+        if accuse == b"ok\n":
+            return True
+        if accuse.startswith(b"rejete"):
+            self.rejetes += 1
+            return False
+        raise ConnectionError("Accusé de réception invalide")
+
+    def _vider_spool(self):
+        """Renvoie le spool dans l'ordre ; garde sur disque ce qui n'a pas pu partir."""
+        with self._verrou_spool:
+            if not os.path.exists(self.spool):
+                return
+            with open(self.spool, "rb") as f:
+                messages = f.readlines()
+            os.remove(self.spool)
+
+        for i, message in enumerate(messages):
+            try:
+                accepte = self._transmettre(message)
+            except OSError:
+                self._spooler(messages[i:])
+                raise
+            self.envoyes += accepte
+
+    def _deconnecter(self):
+        if self._connexion is not None:
+            self._lecteur.close()
+            self._connexion.close()
+        self._connexion = self._lecteur = None
+
+    def _boucle(self):
+        attente = 0.5
+        while not (self._arret.is_set() and self._file.empty()):
+            messages = encoder_lot(self._former_lot())
+            partis = 0
+            try:
+                self._vider_spool()
+                for message in messages:
+                    accepte = self._transmettre(message)
+                    partis += 1
+                    self.envoyes += accepte
+                attente = 0.5
+            except OSError:
+                self._deconnecter()
+                if messages[partis:]:
+                    self._spooler(messages[partis:])
+                if self._arret.is_set():
+                    break
+                # Reconnexion avec attente croissante (plafonnée à 30 s)
+                self._arret.wait(attente)
+                attente = min(attente * 2, 30.0)
+        self._deconnecter()
+
+    def fermer(self):
+        """Envoie (ou met au spool) ce qui reste dans la file puis arrête le thread."""
+        self._arret.set()
+        self._thread.join()
+        restant = []
+        while not self._file.empty():
+            restant.append(self._file.get_nowait())
+        if restant:
+            self._spooler(encoder_lot(restant))
+
+
+def _hote_valide(hote):
+    """La clé vient du réseau et nomme un dossier : lettres, chiffres, « - », « _ » et « . » (FQDN),
+    mais ni séparateur de chemin ni « .. » qui la ferait sortir du dossier."""
+    return ".." not in hote and hote.replace("-", "").replace("_", "").replace(".", "").isalnum()
+
+
+class Agregateur:
+    """Reçoit les lots des agents : un MagasinColonnes par hôte et la dernière ligne en mémoire."""
+
+    def __init__(self, dossier="flotte", taille_tampon=100):
+        self.dossier = dossier
+        self.taille_tampon = taille_tampon
+        self.derniers = {}
+        self.magasins = {}
+        self.lignes_recues = 0
+
+    def recevoir(self, message):
+        """Stocke un lot ; ValueError (sans rien écrire) si une de ses clés d'hôte est invalide."""
+        colonnes = message["colonnes"]
+        lignes = [dict(zip(colonnes, valeurs)) for valeurs in message["lignes"]]
+        for ligne in lignes:
+            hote = str(ligne.get("hote", "inconnu"))
+            if not _hote_valide(hote):
+                raise ValueError(f"Clé d'hôte invalide : {hote!r}")
+        for ligne in lignes:
+            hote = str(ligne.get("hote", "inconnu"))
+            magasin = self.magasins.get(hote)
+            if magasin is None:
+                magasin = MagasinColonnes(os.path.join(self.dossier, hote), self.taille_tampon)
+                self.magasins[hote] = magasin
+            magasin.ecrire(ligne)
+            self.derniers[hote] = ligne
+            self.lignes_recues += 1
+
+    def top(self, metrique, nombre=10):
+        """Les `nombre` hôtes dont la dernière valeur de `metrique` est la plus haute."""
+        candidats = ((ligne[metrique], hote) for hote, ligne in self.derniers.items()
+                     if isinstance(ligne.get(metrique), (int, float)))
+        return [{"hote": hote, metrique: valeur} for valeur, hote in heapq.nlargest(nombre, candidats)]
+
+    def repondre(self, commande):
+        mots = commande.split()
+        if not mots or mots[0] == "hotes":
+            reponse = sorted(self.derniers)
+        elif mots[0] == "top":
+            metrique = mots[1] if len(mots) > 1 else "cpu_percent"
+            reponse = self.top(metrique, int(mots[2]) if len(mots) > 2 else 10)
+        elif mots[0] == "dernier" and len(mots) > 1:
+            reponse = self.derniers.get(mots[1])
+        elif mots[0] == "etat":
+            reponse = {"hotes": len(self.derniers), "lignes_recues": self.lignes_recues}
+        else:
+            reponse = {"erreur": f"Commande inconnue : {mots[0]}"}
+        return (json.dumps(reponse) + "\n").encode("utf-8")
+
+    def fermer(self):
+        for magasin in self.magasins.values():
+            magasin.fermer()
+
+
+async def _traiter_connexion(agregateur, lecteur, ecrivain):
+    """Un lot (objet JSON) reçoit "ok" une fois stocké, "rejete <raison>" s'il est invalide ;
+    toute autre ligne est une requête."""
+    try:
+        while True:
+            ligne = await lecteur.readline()
+            if not ligne:
+                break
+            if ligne.startswith(b"{"):
+                try:
+                    agregateur.recevoir(json.loads(ligne))
+                except (ValueError, KeyError, TypeError) as exc:
+                    # refus explicite : l'agent abandonne ce lot au lieu de le renvoyer sans fin
+                    raison = str(exc).replace("\n", " ")
+                    ecrivain.write(f"rejete {raison}\n".encode("utf-8"))
+                else:
+                    ecrivain.write(b"ok\n")
+            else:
+                ecrivain.write(agregateur.repondre(ligne.decode("utf-8", "replace")))
+            await ecrivain.drain()
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        ecrivain.close()
+
+
+async def servir_agregateur(agregateur, adresse, arret=None):
+    """Sert agents et requêtes de flotte jusqu'à ce que `arret` soit posé."""
+    traiter = lambda lecteur, ecrivain: _traiter_connexion(agregateur, lecteur, ecrivain)
+    tcp = adresse_tcp(adresse)
+    if tcp is None:
+        liberer_socket(adresse)
+        serveur = await asyncio.start_unix_server(traiter, adresse, limit=2 ** 24)
+    else:
+        serveur = await asyncio.start_server(traiter, *tcp, limit=2 ** 24)
+
+    try:
+        async with serveur:
+            if arret is None:
+                await serveur.serve_forever()
+            else:
+                await arret.wait()
+    finally:
+        agregateur.fermer()
+        if tcp is None and os.path.exists(adresse):
+            os.remove(adresse)
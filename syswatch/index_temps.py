@@ -0,0 +1,105 @@
+import bisect
+import os
+from array import array
+from datetime import datetime
+
+
+def iso_vers_epoch_us(texte):
+    """Convertit un timestamp ISO (heure locale) en microsecondes depuis l'epoch."""
+    instant = datetime.fromisoformat(texte)
+    return int(instant.timestamp()) * 1_000_000 + instant.microsecond
+
+
+def epoch_us_vers_iso(valeur):
+    return datetime.fromtimestamp(valeur / 1_000_000).isoformat()
+
+
+class IndexTemps:
+    """Index temporel clairsemé, stocké à côté des données (fichier + ".idx").
+
+    Une entrée toutes les `pas` lignes : (timestamp en µs, position de la
+    ligne en octets, position de l'en-tête en vigueur), soit trois int64.
+    Une recherche est donc une recherche dichotomique puis une lecture
+    d'au plus `pas` lignes. Les timestamps sont supposés croissants
+    (ordre d'écriture) ; un recul d'horloge rend l'index approximatif.
+    """
+
+    def __init__(self, chemin, pas=100):
+        self.chemin = chemin
+        self.pas = pas
+        self.temps = array("q")
+        self.lignes = array("q")
+        self.entetes = array("q")
+        try:
+            with open(chemin, "rb") as f:
+                donnees = array("q")
+                donnees.frombytes(f.read())
+        except FileNotFoundError:
+            donnees = array("q")
+        # Une écriture interrompue peut laisser une entrée incomplète
+        donnees = donnees[:len(donnees) - len(donnees) % 3]
+        self.temps = donnees[0::3]
+        self.lignes = donnees[1::3]
+        self.entetes = donnees[2::3]
+        self._ecrites = len(self.temps)
+        # Après réouverture on ne sait pas où en était le compteur : on repart d'une entrée
+        self._compteur = 0
+
+    def __len__(self):
+        return len(self.temps)
+
+    def ajouter(self, timestamp, position, position_entete):
+        """Compte une ligne écrite ; garde une entrée toutes les `pas` lignes."""
+        if self._compteur % self.pas == 0:
+            if isinstance(timestamp, str):
+                timestamp = iso_vers_epoch_us(timestamp)
+            self.temps.append(timestamp)
+            self.lignes.append(position)
+            self.entetes.append(position_entete)
+        self._compteur += 1
+
+    def flush(self):
+        if self._ecrites == len(self.temps):
+            return
+        nouvelles = array("q")
+        for i in range(self._ecrites, len(self.temps)):
+            nouvelles.extend((self.temps[i], self.lignes[i], self.entetes[i]))
+        with open(self.chemin, "ab") as f:
+            nouvelles.tofile(f)
+        self._ecrites = len(self.temps)
+
+    def chercher(self, debut_us):
+        """Retourne (position ligne, position en-tête) d'où commencer la lecture, ou None."""
+        if not self.temps:
+            return None
+        i = max(bisect.bisect_left(self.temps, debut_us) - 1, 0)
+        return self.lignes[i], self.entetes[i]
+
+    def premier_temps(self):
+        return self.temps[0] if self.temps else None
+
+
+def chemin_index(segment):
+    """Chemin de l'index d'un segment (un segment compressé garde l'index de sa version en clair)."""
+    if segment.endswith(".gz"):
+        segment = segment[:-3]
+    return segment + ".idx"
+
+
+def reconstruire_index(fichier, pas=100):
+    """Reconstruit entièrement l'index d'un fichier CSV (non compressé)."""
+    chemin = chemin_index(fichier)
+    if os.path.exists(chemin):
+        os.remove(chemin)
+    index = IndexTemps(chemin, pas)
+    position = 0
+    position_entete = 0
+    with open(fichier, "rb") as f:
+        for ligne in f:
+            if ligne.startswith(b"timestamp,"):
+                position_entete = position
+            elif ligne.strip():
+                index.ajouter(ligne.split(b",", 1)[0].decode("utf-8"), position, position_entete)
+            position += len(ligne)
+    index.flush()
+    return index
@@ -0,0 +1,262 @@
+import glob
+import gzip
+import json
+import lzma
+import os
+import shutil
+import threading
+from datetime import datetime
+
+from index_temps import iso_vers_epoch_us
+
+# Extension et fonction d'ouverture de chaque compression de segment
+COMPRESSIONS = {"gzip": (".gz", gzip.open), "lzma": (".xz", lzma.open)}
+
+
+def aplatir(instantane, chemin=(), plat=None):
+    """Transforme un instantané imbriqué en {chemin: valeur}, chemin étant un tuple de clés.
+
+    Les indices de liste restent des entiers : ["disques", 0, "utilise"] se
+    distingue ainsi d'une clé de dictionnaire "0". Un conteneur vide est
+    gardé comme valeur.
+    """
+    plat = {} if plat is None else plat
+    if isinstance(instantane, dict) and instantane:
+        for cle, valeur in instantane.items():
+            aplatir(valeur, chemin + (cle,), plat)
+    elif isinstance(instantane, list) and instantane:
+        for i, valeur in enumerate(instantane):
+            aplatir(valeur, chemin + (i,), plat)
+    else:
+        plat[chemin] = instantane
+    return plat
+
+
+def reconstruire(plat):
+    """Inverse de aplatir : rebâtit l'instantané imbriqué."""
+    if () in plat:
+        return plat[()]
+    racine = {}
+    for chemin, valeur in plat.items():
+        noeud = racine
+        for cle in chemin[:-1]:
+            noeud = noeud.setdefault(cle, {})
+        noeud[chemin[-1]] = valeur
+
+    def listes(noeud):
+        # Les dictionnaires à clés entières redeviennent des listes
+        if not isinstance(noeud, dict) or not noeud:
+            return noeud
+        if all(isinstance(cle, int) for cle in noeud):
+            return [listes(noeud[i]) for i in sorted(noeud)]
+        return {cle: listes(valeur) for cle, valeur in noeud.items()}
+
+    return listes(racine)
+
+
+def difference(avant, apres):
+    """Delta entre deux instantanés aplatis : (valeurs modifiées ou ajoutées, chemins supprimés)."""
+    modifies = [[list(chemin), valeur] for chemin, valeur in apres.items()
+                if chemin not in avant or avant[chemin] != valeur]
+    supprimes = [list(chemin) for chemin in avant if chemin not in apres]
+    return modifies, supprimes
+
+
+def appliquer(plat, entree):
+    """Applique une ligne du journal (image clé ou delta) à un instantané aplati."""
+    if "cle" in entree:
+        return aplatir(entree["cle"])
+    for chemin in entree.get("suppr", ()):
+        plat.pop(tuple(chemin), None)
+    for chemin, valeur in entree.get("maj", ()):
+        plat[tuple(chemin)] = valeur
+    return plat
+
+
+def segments_journal(fichier):
+    """Segments archivés (compressés ou non, du plus ancien au plus récent) puis le fichier courant."""
+    racine, extension = os.path.splitext(fichier)
+    motif = f"{glob.escape(racine)}-*{extension}"
+    archives = set(glob.glob(motif))
+    for suffixe, _ in COMPRESSIONS.values():
+        # Un segment en cours de compression existe encore en clair : on garde le clair
+        archives |= {a for a in glob.glob(motif + suffixe) if a[:-len(suffixe)] not in archives}
+    segments = sorted(archives)
+    if os.path.exists(fichier):
+        segments.append(fichier)
+    return segments
+
+
+def _ouvrir(segment):
+    for suffixe, ouvrir in COMPRESSIONS.values():
+        if segment.endswith(suffixe):
+            return ouvrir(segment, "rt", encoding="utf-8")
+    return open(segment, "r", encoding="utf-8")
+
+
+def _entrees(segment):
+    """Parcourt les lignes d'un segment ; une dernière ligne tronquée (arrêt brutal) est ignorée."""
+    with _ouvrir(segment) as f:
+        for ligne in f:
+            try:
+                yield json.loads(ligne)
+            except json.JSONDecodeError:
+                return
+
+
+def lire_journal(fichier):
+    """Parcourt tout le journal : (timestamp, instantané complet) pour chaque collecte."""
+    for segment in segments_journal(fichier):
+        plat = {}
+        for entree in _entrees(segment):
+            plat = appliquer(plat, entree)
+            yield entree["t"], reconstruire(plat)
+
+
+def instantane_a(fichier, instant_us):
+    """Retourne l'instantané en vigueur à instant_us (le dernier collecté avant), ou None.
+
+    Chaque segment commence par une image clé : on saute les segments qui
+    commencent après l'instant, puis on rejoue depuis la dernière image clé.
+    """
+    candidat = None
+    for segment in segments_journal(fichier):
+        premiere = next(_entrees(segment), None)
+        if premiere is None or iso_vers_epoch_us(premiere["t"]) > instant_us:
+            break
+        candidat = segment
+    if candidat is None:
+        return None
+
+    plat = None
+    for entree in _entrees(candidat):
+        if iso_vers_epoch_us(entree["t"]) > instant_us:
+            break
+        plat = appliquer(plat or {}, entree)
+    return reconstruire(plat)
+
+
+def _etat_courant(fichier):
+    """Retourne (instantané aplati, lignes depuis l'image clé) en relisant depuis la dernière image clé.
+
+    La position de cette image est gardée dans fichier + ".cle" : seules les
+    lignes qui la suivent sont lues, quelle que soit la taille du segment.
+    """
+    try:
+        with open(fichier + ".cle", "r", encoding="utf-8") as f:
+            position = int(f.read() or 0)
+    except (FileNotFoundError, ValueError):
+        position = 0
+    plat, lignes = {}, 0
+    try:
+        with open(fichier, "rb") as f:
+            f.seek(position)
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                lignes = 0 if "cle" in entree else lignes + 1
+                plat = appliquer(plat, entree)
+    except FileNotFoundError:
+        pass
+    return plat, lignes
+
+
+def dernier_instantane(fichier):
+    """Dernier instantané du journal (None si vide), en ne lisant que la fin du segment courant."""
+    plat, _ = _etat_courant(fichier)
+    return reconstruire(plat) if plat else None
+
+
+def _compresser(chemin, compression):
+    suffixe, ouvrir = COMPRESSIONS[compression]
+    with open(chemin, "rb") as source, ouvrir(chemin + suffixe + ".tmp", "wb") as cible:
+        shutil.copyfileobj(source, cible)
+    os.replace(chemin + suffixe + ".tmp", chemin + suffixe)
+    os.remove(chemin)
+
+
+class JournalInstantanes:
+    """Journal d'instantanés en ajout seul (NDJSON), encodé en deltas.
+
+    Une ligne sur `intervalle_cle` est une image clé complète
+    ({"t", "cle"}) ; les autres ne contiennent que les champs modifiés
+    ({"t", "maj": [[chemin, valeur]...], "suppr": [chemin...]}). Les infos
+    statiques et les totaux des disques ne sont donc écrits qu'aux images
+    clés. Au-delà de taille_max octets, le segment courant est archivé et
+    compressé (gzip ou lzma) ; chaque segment commence par une image clé,
+    il se relit donc seul.
+    """
+
+    def __init__(self, fichier="collectes.ndjson", intervalle_cle=60, taille_max=4 * 1024 ** 2,
+                 compression="gzip"):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Compression inconnue : {compression} (choix : {', '.join(COMPRESSIONS)})")
+        self.fichier = fichier
+        self.intervalle_cle = intervalle_cle
+        self.taille_max = taille_max
+        self.compression = compression
+        self._compressions = []
+        # On reprend le journal existant là où il s'est arrêté (utile pour les collectes ponctuelles)
+        self._plat, self._depuis_cle = _etat_courant(fichier)
+        self._f = open(fichier, "a", encoding="utf-8")
+
+    def ajouter(self, instantane):
+        """Ajoute un instantané (il doit contenir "timestamp") : image clé ou différence avec le précédent."""
+        plat = aplatir(instantane)
+        if not self._plat or self._depuis_cle + 1 >= self.intervalle_cle:
+            self._ecrire_cle(instantane)
+        else:
+            modifies, supprimes = difference(self._plat, plat)
+            entree = {"t": instantane["timestamp"], "maj": modifies}
+            if supprimes:
+                entree["suppr"] = supprimes
+            self._f.write(json.dumps(entree, separators=(",", ":")) + "\n")
+            self._depuis_cle += 1
+        self._f.flush()
+        self._plat = plat
+
+        if self.taille_max and self._f.tell() >= self.taille_max:
+            self.rotation()
+
+    def _ecrire_cle(self, instantane):
+        self._f.flush()
+        position = os.path.getsize(self.fichier)
+        self._f.write(json.dumps({"t": instantane["timestamp"], "cle": instantane}, separators=(",", ":")) + "\n")
+        with open(self.fichier + ".cle.tmp", "w", encoding="utf-8") as f:
+            f.write(str(position))
+        os.replace(self.fichier + ".cle.tmp", self.fichier + ".cle")
+        self._depuis_cle = 0
+
+    def rotation(self):
+        """Archive le segment courant (compressé en arrière-plan) et en commence un neuf."""
+        self._f.close()
+        racine, extension = os.path.splitext(self.fichier)
+        archive = f"{racine}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{extension}"
+        os.replace(self.fichier, archive)
+        if os.path.exists(self.fichier + ".cle"):
+            os.remove(self.fichier + ".cle")
+        if self.compression is not None:
+            thread = threading.Thread(target=_compresser, args=(archive, self.compression), daemon=True)
+            thread.start()
+            self._compressions.append(thread)
+        self._f = open(self.fichier, "a", encoding="utf-8")
+        # Le nouveau segment doit commencer par une image clé
+        self._plat = {}
+        return archive
+
+    def fermer(self):
+        """Ferme le segment courant (attend les compressions en cours)."""
+        if self._f.closed:
+            return
+        self._f.close()
+        for thread in self._compressions:
+            thread.join()
+        self._compressions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
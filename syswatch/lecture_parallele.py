@@ -0,0 +1,164 @@
+import bisect
+import csv
+import io
+import math
+import mmap
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from ecrivain_csv import fichiers_historique, lire_historique
+from index_temps import iso_vers_epoch_us
+from statistiques import fusionner_stats, stats_depuis_lignes
+
+# En dessous de cette taille totale, on lit sans processus (les démarrer coûterait plus cher)
+TAILLE_MIN_PARALLELE = 16 * 1024 ** 2
+
+# Taille maximale d'un morceau : borne la mémoire de chaque processus
+TAILLE_MAX_MORCEAU = 64 * 1024 ** 2
+
+# Morceaux par processus : de petits morceaux équilibrent mieux la charge
+MORCEAUX_PAR_PROCESSUS = 4
+
+
+def entetes(fichier):
+    """Retourne [(position, colonnes)] pour chaque en-tête du CSV, par position croissante.
+
+    La recherche se fait sur un mmap (en C) : on ne découpe pas le fichier
+    en lignes pour trouver les quelques en-têtes réécrits en cours de route.
+    """
+    resultat = []
+    with open(fichier, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return resultat
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as carte:
+            positions = [0] if carte[:10] == b"timestamp," else []
+            trouve = carte.find(b"\ntimestamp,")
+            while trouve >= 0:
+                positions.append(trouve + 1)
+                trouve = carte.find(b"\ntimestamp,", trouve + 1)
+            for position in positions:
+                fin = carte.find(b"\n", position)
+                ligne = carte[position:fin if fin >= 0 else len(carte)].decode("utf-8").rstrip("\r")
+                resultat.append((position, next(csv.reader([ligne]))))
+    return resultat
+
+
+def decouper(fichier, taille_morceau):
+    """Découpe le fichier en intervalles d'octets [debut, fin) qui commencent chacun en début de ligne."""
+    taille = os.path.getsize(fichier)
+    bornes = [0]
+    with open(fichier, "rb") as f:
+        for cible in range(taille_morceau, taille, taille_morceau):
+            if cible <= bornes[-1]:
+                continue
+            # On recule d'un octet : si la cible tombe pile en début de ligne, readline ne lit que le "\n"
+            f.seek(cible - 1)
+            f.readline()
+            if f.tell() < taille:
+                bornes.append(f.tell())
+    bornes.append(taille)
+    return list(zip(bornes, bornes[1:]))
+
+
+def morceaux(segments, coeurs):
+    """Découpe les segments en tâches (segment, debut, fin, en-tête en vigueur au début).
+
+    Un segment compressé ne se découpe pas : il forme une seule tâche
+    (debut et fin à None), lue en entier par lire_historique.
+    """
+    en_clair = [s for s in segments if not s.endswith(".gz")]
+    total = sum(os.path.getsize(s) for s in en_clair)
+    taille_morceau = max(1, min(TAILLE_MAX_MORCEAU, -(-total // (coeurs * MORCEAUX_PAR_PROCESSUS))))
+
+    taches = []
+    for segment in segments:
+        if segment.endswith(".gz"):
+            taches.append((segment, None, None, None))
+            continue
+        positions = entetes(segment)
+        departs = [position for position, _ in positions]
+        for debut, fin in decouper(segment, taille_morceau):
+            # L'en-tête en vigueur est le dernier écrit avant le début du morceau
+            k = bisect.bisect_right(departs, debut) - 1
+            taches.append((segment, debut, fin, positions[k][1] if k >= 0 else None))
+    return taches
+
+
+def lire_morceau(segment, debut, fin, entete):
+    """Parcourt les lignes (dictionnaires) d'un morceau, en suivant les en-têtes rencontrés."""
+    if debut is None:
+        yield from lire_historique(segment)
+        return
+    with open(segment, "rb") as f:
+        f.seek(debut)
+        texte = f.read(fin - debut).decode("utf-8")
+    for valeurs in csv.reader(io.StringIO(texte, newline="")):
+        if not valeurs:
+            continue
+        if valeurs[0] == "timestamp":
+            entete = valeurs
+            continue
+        if entete is not None:
+            yield dict(zip(entete, valeurs))
+
+
+def _stats_morceau(tache):
+    return stats_depuis_lignes(lire_morceau(*tache))
+
+
+def _colonnes_morceau(tache):
+    """Convertit un morceau en colonnes : (nombre de lignes, hôte, {colonne: array}).
+
+    Même règles que MagasinColonnes.ecrire : timestamp en µs, les valeurs
+    non numériques sont ignorées, une case vide vaut NaN.
+    """
+    colonnes = {"timestamp": array("q")}
+    hote, nombre = None, 0
+    for ligne in lire_morceau(*tache):
+        # Les anciens CSV répètent le hostname : il devient la clé d'hôte
+        if "hostname" in ligne and "hote" not in ligne:
+            ligne["hote"] = ligne.pop("hostname")
+        hote = ligne.get("hote") or hote
+        colonnes["timestamp"].append(iso_vers_epoch_us(ligne["timestamp"]))
+        for colonne, valeur in ligne.items():
+            if colonne == "timestamp":
+                continue
+            try:
+                valeur = float(valeur)
+            except (TypeError, ValueError):
+                continue
+            if colonne not in colonnes:
+                colonnes[colonne] = array("f", [math.nan]) * nombre
+            colonnes[colonne].append(valeur)
+        nombre += 1
+        for tableau in colonnes.values():
+            if len(tableau) < nombre:
+                tableau.append(math.nan)
+    return nombre, hote, colonnes
+
+
+def traiter_morceaux(fichier, fonction, coeurs=None):
+    """Applique fonction à chaque morceau de l'historique (segments compris) ; résultats dans l'ordre.
+
+    Les morceaux sont répartis sur `coeurs` processus (tous par défaut).
+    Un petit historique, ou coeurs=1, est traité dans le processus courant.
+    """
+    coeurs = coeurs or os.cpu_count() or 1
+    segments = fichiers_historique(fichier)
+    taches = morceaux(segments, coeurs)
+    if coeurs == 1 or sum(os.path.getsize(s) for s in segments) < TAILLE_MIN_PARALLELE:
+        yield from map(fonction, taches)
+        return
+    with ProcessPoolExecutor(coeurs) as executeur:
+        yield from executeur.map(fonction, taches)
+
+
+def stats_en_parallele(fichier, coeurs=None):
+    """Retourne {colonne: StatsFlux} pour tout l'historique CSV, calculé morceau par morceau puis fusionné."""
+    return fusionner_stats(*traiter_morceaux(fichier, _stats_morceau, coeurs))
+
+
+def colonnes_en_parallele(fichier, coeurs=None):
+    """Parcourt l'historique CSV converti en blocs (nombre, hôte, {colonne: array}), dans l'ordre."""
+    return traiter_morceaux(fichier, _colonnes_morceau, coeurs)
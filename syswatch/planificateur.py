@@ -0,0 +1,93 @@
+import heapq
+import threading
+import time
+
+
+class Tache:
+    """Une tâche périodique du planificateur (voir Planificateur.ajouter)."""
+
+    def __init__(self, nom, periode, fonction, une_fois):
+        self.nom = nom
+        self.periode = periode
+        self.fonction = fonction
+        self.une_fois = une_fois
+        self.tick = 0
+        self.executions = 0
+        self.manques = 0
+        self.retard_max = 0.0
+
+
+class Planificateur:
+    """Exécute des tâches à fréquences différentes, sur une grille régulière.
+
+    Les échéances sont calculées depuis l'origine (origine + tick * période,
+    sur l'horloge monotone) et non depuis la fin de l'exécution précédente :
+    la durée des tâches ne fait donc pas dériver la grille. Une tâche en
+    retard de plus d'une demi-période saute les ticks dépassés, qui sont
+    comptés comme manqués.
+    """
+
+    def __init__(self, signaler_retard=None):
+        self.taches = {}
+        self._file = []
+        self._sequence = 0
+        self._arret = threading.Event()
+        self.signaler_retard = signaler_retard
+        self.origine = None
+        self.origine_mur = None
+
+    def ajouter(self, nom, periode, fonction, une_fois=False):
+        """Ajoute une tâche ; fonction(heure_prevue) reçoit l'heure prévue (epoch, grille)."""
+        if periode <= 0 and not une_fois:
+            raise ValueError(f"La période de la tâche {nom} doit être positive")
+        self.taches[nom] = Tache(nom, periode, fonction, une_fois)
+        return self.taches[nom]
+
+    def _programmer(self, tache):
+        echeance = self.origine + tache.tick * tache.periode
+        # La séquence départage les échéances égales : ordre d'ajout des tâches
+        heapq.heappush(self._file, (echeance, self._sequence, tache))
+        self._sequence += 1
+
+    def arreter(self):
+        self._arret.set()
+
+    def executer(self):
+        """Boucle jusqu'à arreter() (ou une exception, KeyboardInterrupt compris)."""
+        self._arret.clear()
+        self.origine = time.monotonic()
+        self.origine_mur = time.time()
+        for tache in self.taches.values():
+            self._programmer(tache)
+
+        while self._file and not self._arret.is_set():
+            echeance, _, tache = heapq.heappop(self._file)
+            attente = echeance - time.monotonic()
+            if attente > 0 and self._arret.wait(attente):
+                break
+
+            tache.retard_max = max(tache.retard_max, time.monotonic() - echeance)
+            tache.fonction(self.origine_mur + (echeance - self.origine))
+            tache.executions += 1
+            if tache.une_fois:
+                continue
+
+            tache.tick += 1
+            maintenant = time.monotonic()
+            tolerance = tache.periode / 2
+            manques = 0
+            while self.origine + tache.tick * tache.periode + tolerance < maintenant:
+                tache.tick += 1
+                manques += 1
+            if manques:
+                tache.manques += manques
+                if self.signaler_retard is not None:
+                    self.signaler_retard(tache, manques)
+            self._programmer(tache)
+
+    def rapport(self):
+        """Retourne {tâche: {executions, manques, retard_max}}."""
+        return {
+            nom: {"executions": t.executions, "manques": t.manques, "retard_max": round(t.retard_max, 4)}
+            for nom, t in self.taches.items()
+        }
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import psutil
+
+# Systèmes de fichiers réseau, souvent responsables des blocages
+TYPES_RESEAU = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "sshfs", "fuse.sshfs", "afs", "9p"}
+
+
+class _Pool:
+    """Petit pool de threads démons qui grandit à la demande.
+
+    On n'utilise pas ThreadPoolExecutor car ses threads sont joints à la sortie
+    de l'interpréteur : un montage NFS bloqué empêcherait le script de quitter.
+    Un thread bloqué sur un montage ne doit pas non plus retarder les autres,
+    d'où la création d'un thread quand aucun n'est libre (jusqu'à nb_max).
+    """
+
+    def __init__(self, nb_max):
+        self.nb_max = nb_max
+        self._taches = queue.Queue()
+        self._verrou = threading.Lock()
+        self._nb_threads = 0
+        self._libres = 0
+        self._en_attente = 0
+
+    def _travailler(self):
+        while True:
+            future, fonction, argument = self._taches.get()
+            with self._verrou:
+                self._en_attente -= 1
+                self._libres -= 1
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fonction(argument))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._verrou:
+                self._libres += 1
+
+    def soumettre(self, fonction, argument):
+        future = Future()
+        with self._verrou:
+            self._en_attente += 1
+            if self._en_attente > self._libres and self._nb_threads < self.nb_max:
+                self._nb_threads += 1
+                self._libres += 1
+                threading.Thread(target=self._travailler, name=f"syswatch-disque-{self._nb_threads}",
+                                 daemon=True).start()
+        self._taches.put((future, fonction, argument))
+        return future
+
+
+class SondeDisques:
+    """Interroge tous les points de montage en parallèle, en temps borné.
+
+    - delai : temps maximum (en secondes) accordé à l'ensemble des montages ;
+    - nb_threads : nombre maximum de threads (les montages bloqués en occupent un) ;
+    - types_exclus / types_inclus : filtre sur le type de système de fichiers
+      ("reseau" dans types_exclus écarte tous les types de TYPES_RESEAU) ;
+    - seuil_echecs / duree_quarantaine : un montage qui dépasse le délai (ou
+      dont disk_usage échoue) `seuil_echecs` fois de suite est ignoré
+      pendant `duree_quarantaine` s.
+    """
+
+    def __init__(self, delai=2.0, nb_threads=64, types_exclus=None, types_inclus=None,
+                 seuil_echecs=2, duree_quarantaine=300.0):
+        self.delai = delai
+        self.types_exclus = set(types_exclus or ())
+        if "reseau" in self.types_exclus:
+            self.types_exclus |= TYPES_RESEAU
+        self.types_inclus = set(types_inclus or ())
+        self.seuil_echecs = seuil_echecs
+        self.duree_quarantaine = duree_quarantaine
+        self._pool = _Pool(nb_threads)
+        self._en_cours = {}       # point de montage -> Future encore en cours
+        self._echecs = {}         # point de montage -> nombre d'échecs consécutifs
+        self._quarantaine = {}    # point de montage -> fin de quarantaine (monotone)
+        self.derniers_ignores = []
+
+    def _garder(self, partition):
+        if self.types_inclus and partition.fstype not in self.types_inclus:
+            return False
+        return partition.fstype not in self.types_exclus
+
+    def _ignorer(self, point, raison):
+        self.derniers_ignores.append({"point_montage": point, "raison": raison})
+
+    def recuperer(self):
+        """Retourne les infos disques, dans l'ordre de psutil.disk_partitions()."""
+        maintenant = time.monotonic()
+        self.derniers_ignores = []
+        futures = {}
+
+        for p in psutil.disk_partitions():
+            point = p.mountpoint
+            if not self._garder(p):
+                continue
+            if self._quarantaine.get(point, 0) > maintenant:
+                self._ignorer(point, "quarantaine")
+                continue
+            precedent = self._en_cours.get(point)
+            if precedent is not None and not precedent.done():
+                # L'appel précédent est toujours bloqué : inutile d'en empiler un autre
+                self._compter_echec(point, maintenant)
+                self._ignorer(point, "toujours bloqué")
+                continue
+            futures[point] = self._pool.soumettre(psutil.disk_usage, point)
+
+        self._en_cours.update(futures)
+        wait(futures.values(), timeout=self.delai)
+        maintenant = time.monotonic()
+
+        resultat = []
+        for point, future in futures.items():
+            if not future.done():
+                self._compter_echec(point, maintenant)
+                self._ignorer(point, "délai dépassé")
+                continue
+            del self._en_cours[point]
+            try:
+                usage = future.result()
+            except PermissionError:
+                self._compter_echec(point, maintenant)
+                self._ignorer(point, "accès refusé")
+                continue
+            except OSError as exc:
+                self._compter_echec(point, maintenant)
+                self._ignorer(point, f"erreur : {exc.strerror or exc}")
+                continue
+            self._echecs.pop(point, None)
+            resultat.append({
+                "point_montage": point,
+                "total": usage.total,
+                "utilise": usage.used,
+                "pourcentage": usage.percent
+            })
+
+        return resultat
+
+    def _compter_echec(self, point, maintenant):
+        self._echecs[point] = self._echecs.get(point, 0) + 1
+        if self._echecs[point] >= self.seuil_echecs:
+            self._quarantaine[point] = maintenant + self.duree_quarantaine
+            self._echecs[point] = 0
+
+    def liberer(self, point):
+        """Sort un montage de la quarantaine (invalidation du cache négatif)."""
+        self._quarantaine.pop(point, None)
+        self._echecs.pop(point, None)
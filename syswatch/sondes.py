@@ -0,0 +1,97 @@
+import importlib
+import importlib.util
+import time
+
+
+class Sonde:
+    """Une sonde du registre : nom, période par défaut, dépendances et fonction de collecte.
+
+    La fonction est désignée par son module et son nom ; le module n'est
+    importé qu'au premier appel, si bien qu'un mode qui ne sonde rien
+    (--stats, requêtes...) n'importe jamais psutil. `complete` désigne la
+    variante du rapport complet (recuperer_tout), la fonction elle-même
+    par défaut.
+    """
+
+    def __init__(self, nom, periode, module, fonction, dependances=(), modules=(), complete=None):
+        self.nom = nom
+        self.periode = periode
+        self.module = module
+        self.fonction = fonction
+        self.dependances = tuple(dependances)
+        self.modules = tuple(modules)
+        self.complete = complete or fonction
+        self._fonction = None
+
+    def charger(self):
+        """Importe le module de la sonde (une seule fois) et retourne sa fonction."""
+        if self._fonction is None:
+            self._fonction = getattr(importlib.import_module(self.module), self.fonction)
+        return self._fonction
+
+    def charger_complete(self):
+        """Retourne la fonction du rapport complet (voir traitement.recuperer_tout)."""
+        return getattr(importlib.import_module(self.module), self.complete)
+
+    def disponible(self):
+        """Vrai si les modules requis sont installés (vérifié sans les importer)."""
+        return all(importlib.util.find_spec(m) is not None for m in self.modules)
+
+    def __call__(self, *args):
+        return self.charger()(*args)
+
+
+# Sondes connues, dans l'ordre d'exécution et d'export
+REGISTRE = {}
+
+
+def declarer(nom, periode, module, fonction, dependances=(), modules=("psutil",), complete=None):
+    """Ajoute (ou remplace) une sonde du registre.
+
+    periode est la fréquence par défaut en collecte continue (0 : une seule
+    fois au démarrage) ; dependances liste les sondes à activer avec elle ;
+    complete nomme la fonction du rapport complet, si elle diffère.
+    """
+    REGISTRE[nom] = Sonde(nom, periode, module, fonction, dependances, modules, complete)
+    return REGISTRE[nom]
+
+
+declarer("statique", 0, "traitement", "recuperer_statique")
+declarer("cpu", 1, "traitement", "recuperer_utilisation_cpu", dependances=("statique",), complete="recuperer_cpu")
+declarer("memoire", 5, "traitement", "recuperer_utilisation_memoire", dependances=("statique",),
+         complete="recuperer_memoire")
+declarer("disques", 60, "traitement", "recuperer_disques", dependances=("statique",))
+declarer("processus", 5, "traitement", "recuperer_processus", dependances=("statique",))
+
+
+def selectionner(noms=None):
+    """Retourne les sondes demandées (toutes par défaut) et leurs dépendances, dans l'ordre du registre."""
+    if noms is None:
+        noms = list(REGISTRE)
+    retenues = set()
+    a_voir = list(noms)
+    while a_voir:
+        nom = a_voir.pop()
+        if nom not in REGISTRE:
+            raise ValueError(f"Sonde inconnue : {nom} (disponibles : {', '.join(REGISTRE)})")
+        if nom not in retenues:
+            retenues.add(nom)
+            a_voir.extend(REGISTRE[nom].dependances)
+    return [sonde for nom, sonde in REGISTRE.items() if nom in retenues]
+
+
+def nouvelle_meta():
+    """Section "_meta" vide : durée de chaque sonde (ms), erreurs et disques ignorés."""
+    return {"durees_ms": {}, "erreurs": {}, "disques_ignores": []}
+
+
+def chronometrer(meta, nom, fonction, *args):
+    """Appelle fonction(*args) en notant sa durée dans meta ; une exception y est notée puis relancée."""
+    debut = time.perf_counter()
+    try:
+        return fonction(*args)
+    except Exception as e:
+        meta["erreurs"][nom] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        meta["durees_ms"][nom] = round((time.perf_counter() - debut) * 1000, 3)
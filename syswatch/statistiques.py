@@ -0,0 +1,256 @@
+import math
+
+# Colonnes qui ne sont pas des métriques
+COLONNES_IGNOREES = {"timestamp", "hote", "hostname"}
+
+
+class Croquis:
+    """Croquis de quantiles à erreur relative bornée (principe de DDSketch).
+
+    Chaque valeur positive tombe dans le seau ceil(log(x) / log(gamma)) :
+    un quantile est estimé à `precision` près (1 % par défaut), quelle que
+    soit la quantité de données. La mémoire dépend seulement de l'étendue
+    des valeurs (quelques centaines de seaux pour des pourcentages), et deux
+    croquis se fusionnent en additionnant leurs seaux.
+    """
+
+    def __init__(self, precision=0.01, max_seaux=2048):
+        self.precision = precision
+        self.max_seaux = max_seaux
+        self.gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self.gamma)
+        self.positifs = {}
+        self.negatifs = {}
+        self.zeros = 0
+        self.nombre = 0
+
+    def _indice(self, valeur):
+        return math.ceil(math.log(valeur) / self._log_gamma)
+
+    def _valeur(self, indice):
+        # Milieu (en erreur relative) du seau ]gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** indice / (self.gamma + 1)
+
+    def ajouter(self, valeur, poids=1):
+        if valeur > 0:
+            seaux = self.positifs
+        elif valeur < 0:
+            seaux, valeur = self.negatifs, -valeur
+        else:
+            self.zeros += poids
+            self.nombre += poids
+            return
+        indice = self._indice(valeur)
+        seaux[indice] = seaux.get(indice, 0) + poids
+        self.nombre += poids
+        if len(seaux) > self.max_seaux:
+            self._reduire(seaux)
+
+    def _reduire(self, seaux):
+        """Regroupe les deux plus petits seaux (on perd en précision sur les petites valeurs)."""
+        premier, second = sorted(seaux)[:2]
+        seaux[second] += seaux.pop(premier)
+
+    def fusionner(self, autre):
+        if autre.gamma != self.gamma:
+            raise ValueError("Impossible de fusionner des croquis de précisions différentes")
+        for source, cible in ((autre.positifs, self.positifs), (autre.negatifs, self.negatifs)):
+            for indice, nombre in source.items():
+                cible[indice] = cible.get(indice, 0) + nombre
+            while len(cible) > self.max_seaux:
+                self._reduire(cible)
+        self.zeros += autre.zeros
+        self.nombre += autre.nombre
+        return self
+
+    def quantile(self, q):
+        """Retourne une estimation du quantile q (entre 0 et 1), ou None si vide."""
+        if self.nombre == 0:
+            return None
+        rang = q * (self.nombre - 1)
+        cumul = 0
+        for indice in sorted(self.negatifs, reverse=True):
+            cumul += self.negatifs[indice]
+            if cumul > rang:
+                return -self._valeur(indice)
+        cumul += self.zeros
+        if cumul > rang:
+            return 0.0
+        for indice in sorted(self.positifs):
+            cumul += self.positifs[indice]
+            if cumul > rang:
+                return self._valeur(indice)
+        return self._valeur(max(self.positifs))
+
+    def vers_dict(self):
+        return {
+            "precision": self.precision,
+            "positifs": {str(i): n for i, n in self.positifs.items()},
+            "negatifs": {str(i): n for i, n in self.negatifs.items()},
+            "zeros": self.zeros,
+        }
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        croquis = cls(donnees["precision"])
+        croquis.positifs = {int(i): n for i, n in donnees["positifs"].items()}
+        croquis.negatifs = {int(i): n for i, n in donnees["negatifs"].items()}
+        croquis.zeros = donnees["zeros"]
+        croquis.nombre = croquis.zeros + sum(croquis.positifs.values()) + sum(croquis.negatifs.values())
+        return croquis
+
+
+class StatsFlux:
+    """Statistiques d'une métrique calculées en un seul passage, en mémoire constante.
+
+    Moyenne et variance suivent l'algorithme de Welford ; deux StatsFlux
+    (par exemple calculées sur deux fichiers) se fusionnent sans relire les données.
+    """
+
+    def __init__(self, precision=0.01):
+        self.nombre = 0
+        self.moyenne = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.croquis = Croquis(precision)
+
+    def ajouter(self, valeur):
+        if math.isnan(valeur):
+            return
+        self.nombre += 1
+        ecart = valeur - self.moyenne
+        self.moyenne += ecart / self.nombre
+        self._m2 += ecart * (valeur - self.moyenne)
+        if valeur < self.min:
+            self.min = valeur
+        if valeur > self.max:
+            self.max = valeur
+        self.croquis.ajouter(valeur)
+
+    def fusionner(self, autre):
+        """Ajoute les statistiques d'un autre flux (formule parallèle de Chan)."""
+        if autre.nombre == 0:
+            return self
+        total = self.nombre + autre.nombre
+        ecart = autre.moyenne - self.moyenne
+        self._m2 += autre._m2 + ecart * ecart * self.nombre * autre.nombre / total
+        self.moyenne += ecart * autre.nombre / total
+        self.nombre = total
+        self.min = min(self.min, autre.min)
+        self.max = max(self.max, autre.max)
+        self.croquis.fusionner(autre.croquis)
+        return self
+
+    @property
+    def variance(self):
+        return self._m2 / (self.nombre - 1) if self.nombre > 1 else 0.0
+
+    @property
+    def ecart_type(self):
+        return math.sqrt(self.variance)
+
+    def _quantile(self, q):
+        # L'estimation du croquis peut sortir légèrement de [min, max]
+        valeur = self.croquis.quantile(q)
+        return None if valeur is None else min(max(valeur, self.min), self.max)
+
+    def resume(self):
+        return {
+            "nombre": self.nombre,
+            "moyenne": self.moyenne,
+            "ecart_type": self.ecart_type,
+            "min": self.min,
+            "max": self.max,
+            "p50": self._quantile(0.50),
+            "p95": self._quantile(0.95),
+            "p99": self._quantile(0.99),
+        }
+
+    def vers_dict(self):
+        return {
+            "nombre": self.nombre,
+            "moyenne": self.moyenne,
+            "m2": self._m2,
+            "min": self.min,
+            "max": self.max,
+            "croquis": self.croquis.vers_dict(),
+        }
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        stats = cls()
+        stats.nombre = donnees["nombre"]
+        stats.moyenne = donnees["moyenne"]
+        stats._m2 = donnees["m2"]
+        stats.min = donnees["min"]
+        stats.max = donnees["max"]
+        stats.croquis = Croquis.depuis_dict(donnees["croquis"])
+        return stats
+
+
+def stats_depuis_lignes(lignes, stats=None):
+    """Met à jour un dictionnaire {colonne: StatsFlux} avec des lignes CSV (dictionnaires).
+
+    Toutes les colonnes numériques sont couvertes, y compris celles qui
+    n'apparaissent qu'en cours de fichier (disques ajoutés...). Les
+    colonnes du top-N (proc_cpu_1_percent...) ne sont comptées que par nom
+    de processus : chaque rang est occupé par un processus différent
+    d'une ligne à l'autre, ses statistiques ne voudraient rien dire.
+    """
+    stats = {} if stats is None else stats
+    for ligne in lignes:
+        for colonne, valeur in ligne.items():
+            if colonne in COLONNES_IGNOREES or valeur in ("", None):
+                continue
+            if colonne.startswith("proc_"):
+                if colonne.endswith("_nom"):
+                    _ajouter_processus(stats, ligne, colonne, valeur)
+                continue
+            try:
+                valeur = float(valeur)
+            except ValueError:
+                continue
+            if colonne not in stats:
+                stats[colonne] = StatsFlux()
+            stats[colonne].ajouter(valeur)
+    return stats
+
+
+def _ajouter_processus(stats, ligne, colonne, nom):
+    """Compte la mesure d'un processus du top-N sous une colonne "proc_<type>:<nom>".
+
+    Ex : proc_cpu_1_nom=python et proc_cpu_1_percent=12.5 alimentent "proc_cpu:python".
+    """
+    prefixe = colonne[:-3]
+    for voisine, valeur in ligne.items():
+        if voisine.startswith(prefixe) and voisine != colonne and valeur not in ("", None):
+            type_mesure = colonne.split("_")[1]
+            stats.setdefault(f"proc_{type_mesure}:{nom}", StatsFlux()).ajouter(float(valeur))
+            return
+
+
+def stats_depuis_colonnes(magasin, stats=None, debut_us=None, fin_us=None):
+    """Même chose que stats_depuis_lignes, colonne par colonne, pour un MagasinColonnes.
+
+    Le magasin ne garde pas les noms de processus : les colonnes du top-N
+    (proc_...) sont ignorées.
+    """
+    stats = {} if stats is None else stats
+    debut, fin = magasin.intervalle(debut_us, fin_us)
+    for colonne in magasin.colonnes():
+        if colonne in COLONNES_IGNOREES or colonne.startswith("proc_"):
+            continue
+        flux = stats.setdefault(colonne, StatsFlux())
+        for valeur in magasin.lire(colonne, debut, fin):
+            flux.ajouter(valeur)
+    return stats
+
+
+def fusionner_stats(*resultats):
+    """Fusionne plusieurs dictionnaires {colonne: StatsFlux} (un par fichier par exemple)."""
+    total = {}
+    for resultat in resultats:
+        for colonne, flux in resultat.items():
+            total.setdefault(colonne, StatsFlux()).fusionner(flux)
+    return total
@@ -0,0 +1,212 @@
+import bisect
+import json
+import math
+import mmap
+import os
+import sys
+from array import array
+
+from index_temps import iso_vers_epoch_us
+from lecture_parallele import colonnes_en_parallele
+
+# Type array/memoryview et extension de fichier de chaque sorte de colonne
+TYPE_TEMPS = ("q", ".i64")      # timestamp en microsecondes depuis l'epoch
+TYPE_METRIQUE = ("f", ".f32")   # métriques en float32
+
+
+class MagasinColonnes:
+    """Historique binaire en colonnes : un fichier par colonne dans `dossier`.
+
+    La colonne "timestamp" est en int64 (µs depuis l'epoch), toutes les autres
+    métriques en float32. L'écriture se fait uniquement en ajout, par lots ;
+    la lecture passe par mmap et renvoie des memoryview sans copie.
+    Une colonne qui apparaît en cours de route est complétée par des NaN
+    pour les lignes précédentes. Les valeurs texte ne sont pas stockées,
+    sauf la clé d'hôte qui est gardée une fois dans schema.json.
+    """
+
+    def __init__(self, dossier, taille_tampon=100):
+        self.dossier = dossier
+        self.taille_tampon = taille_tampon
+        os.makedirs(dossier, exist_ok=True)
+        self._chemin_schema = os.path.join(dossier, "schema.json")
+        try:
+            with open(self._chemin_schema, "r", encoding="utf-8") as f:
+                self.schema = json.load(f)
+        except FileNotFoundError:
+            self.schema = {"ordre_octets": sys.byteorder, "hote": None, "colonnes": ["timestamp"]}
+            self._sauver_schema()
+        if self.schema["ordre_octets"] != sys.byteorder:
+            raise ValueError(f"{dossier} a été écrit avec un autre ordre d'octets")
+        self._tampons = {}
+        self._en_attente = 0
+        self.lignes = self.nombre_lignes()
+
+    def _sauver_schema(self):
+        with open(self._chemin_schema + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.schema, f, indent=2)
+        os.replace(self._chemin_schema + ".tmp", self._chemin_schema)
+
+    def _type(self, colonne):
+        return TYPE_TEMPS if colonne == "timestamp" else TYPE_METRIQUE
+
+    def _chemin(self, colonne):
+        return os.path.join(self.dossier, colonne + self._type(colonne)[1])
+
+    def nombre_lignes(self):
+        """Nombre de lignes complètes sur disque (une écriture interrompue est ignorée)."""
+        nombres = []
+        for colonne in self.schema["colonnes"]:
+            try:
+                taille = os.path.getsize(self._chemin(colonne))
+            except FileNotFoundError:
+                taille = 0
+            nombres.append(taille // array(self._type(colonne)[0]).itemsize)
+        return min(nombres)
+
+    def _ajouter_colonne(self, colonne):
+        """Déclare une nouvelle colonne et la remplit de NaN pour les lignes déjà écrites."""
+        self.flush()
+        with open(self._chemin(colonne), "ab") as f:
+            array(TYPE_METRIQUE[0], [math.nan] * self.lignes).tofile(f)
+        self.schema["colonnes"].append(colonne)
+        self._sauver_schema()
+
+    def ecrire(self, ligne):
+        """Ajoute une ligne (dictionnaire) ; retourne son numéro."""
+        hote = ligne.get("hote")
+        if hote is not None and hote != self.schema["hote"]:
+            self.schema["hote"] = hote
+            self._sauver_schema()
+
+        valeurs = {}
+        for colonne, valeur in ligne.items():
+            if colonne == "timestamp":
+                valeurs[colonne] = valeur if isinstance(valeur, int) else iso_vers_epoch_us(valeur)
+                continue
+            try:
+                valeurs[colonne] = float(valeur)
+            except (TypeError, ValueError):
+                continue
+            if colonne not in self.schema["colonnes"]:
+                self._ajouter_colonne(colonne)
+
+        for colonne in self.schema["colonnes"]:
+            if colonne not in self._tampons:
+                self._tampons[colonne] = array(self._type(colonne)[0])
+            self._tampons[colonne].append(valeurs.get(colonne, math.nan))
+
+        numero = self.lignes + self._en_attente
+        self._en_attente += 1
+        if self._en_attente >= self.taille_tampon:
+            self.flush()
+        return numero
+
+    def ajouter_bloc(self, nombre, colonnes, hote=None):
+        """Ajoute `nombre` lignes déjà converties en colonnes ({colonne: array}).
+
+        Les colonnes du magasin absentes du bloc sont complétées par des NaN,
+        les nouvelles sont déclarées comme dans ecrire.
+        """
+        self.flush()
+        if hote is not None and hote != self.schema["hote"]:
+            self.schema["hote"] = hote
+            self._sauver_schema()
+        for colonne in colonnes:
+            if colonne not in self.schema["colonnes"]:
+                self._ajouter_colonne(colonne)
+        for colonne in self.schema["colonnes"]:
+            tableau = colonnes.get(colonne)
+            if tableau is None:
+                tableau = array(TYPE_METRIQUE[0], [math.nan]) * nombre
+            with open(self._chemin(colonne), "ab") as f:
+                tableau.tofile(f)
+        self.lignes += nombre
+
+    def flush(self):
+        """Écrit les lignes en attente à la fin de chaque fichier de colonne."""
+        if not self._en_attente:
+            return
+        for colonne, tampon in self._tampons.items():
+            with open(self._chemin(colonne), "ab") as f:
+                tampon.tofile(f)
+        self._tampons = {}
+        self.lignes += self._en_attente
+        self._en_attente = 0
+
+    def fermer(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def lire(self, colonne, debut=0, fin=None):
+        """Retourne une memoryview (mmap, sans copie) sur les lignes [debut, fin) de la colonne."""
+        code = self._type(colonne)[0]
+        taille = array(code).itemsize
+        nombre = self.nombre_lignes()
+        fin = nombre if fin is None else min(fin, nombre)
+        if colonne not in self.schema["colonnes"] or fin <= debut:
+            return memoryview(array(code))
+
+        with open(self._chemin(colonne), "rb") as f:
+            carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # La memoryview garde la carte ouverte tant qu'elle est utilisée
+        return memoryview(carte)[debut * taille:fin * taille].cast(code)
+
+    def intervalle(self, debut_us=None, fin_us=None):
+        """Retourne les lignes [debut, fin) dont le timestamp est dans [debut_us, fin_us].
+
+        La colonne timestamp est triée : une recherche dichotomique directement
+        sur le mmap suffit, sans fichier d'index à côté.
+        """
+        temps = self.lire("timestamp")
+        debut = 0 if debut_us is None else bisect.bisect_left(temps, debut_us)
+        fin = len(temps) if fin_us is None else bisect.bisect_right(temps, fin_us)
+        return debut, fin
+
+    def colonnes(self):
+        return list(self.schema["colonnes"])
+
+
+def _garder_apres(nombre, colonnes, dernier):
+    """Ne garde que les lignes plus récentes que `dernier` et que la ligne gardée avant elles.
+
+    Retourne (nombre, colonnes, dernier timestamp gardé) : la colonne
+    timestamp du magasin reste strictement croissante, condition
+    d'intervalle().
+    """
+    garder = []
+    for i, temps in enumerate(colonnes["timestamp"]):
+        if temps > dernier:
+            garder.append(i)
+            dernier = temps
+    if len(garder) == nombre:
+        return nombre, colonnes, dernier
+    return len(garder), {colonne: array(tableau.typecode, (tableau[i] for i in garder))
+                         for colonne, tableau in colonnes.items()}, dernier
+
+
+def convertir_csv(fichier_csv, dossier, taille_tampon=10_000, coeurs=None):
+    """Convertit un historique CSV (segments archivés compris) en MagasinColonnes.
+
+    Le CSV est découpé en morceaux convertis en colonnes par `coeurs`
+    processus (voir lecture_parallele) ; les blocs sont ajoutés dans
+    l'ordre. Seules les lignes plus récentes que la dernière du magasin
+    sont ajoutées : relancer la conversion, ou convertir vers un magasin
+    déjà alimenté, n'ajoute ni doublon ni timestamp dans le désordre.
+    Retourne le nombre de lignes converties.
+    """
+    nombre = 0
+    with MagasinColonnes(dossier, taille_tampon) as magasin:
+        temps = magasin.lire("timestamp")
+        dernier = temps[-1] if len(temps) else -2 ** 63
+        for lignes, hote, colonnes in colonnes_en_parallele(fichier_csv, coeurs):
+            lignes, colonnes, dernier = _garder_apres(lignes, colonnes, dernier)
+            if lignes:
+                magasin.ajouter_bloc(lignes, colonnes, hote)
+                nombre += lignes
+    return nombre
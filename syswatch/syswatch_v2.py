@@ -1,4 +1,4 @@
-import collector
+import traitement
 
 
 def octets_vers_go(octets):
@@ -42,7 +42,7 @@ def afficher_disques(data):
 if __name__ == "__main__":
     print("=== SysWatch v2.0 ===\n")
 
-    metriques = collector.recuperer_tout()
+    metriques = traitement.recuperer_tout()
 
     afficher_systeme(metriques["systeme"])
     afficher_cpu(metriques["cpu"])
@@ -1,8 +1,34 @@
-import csv
 import json
-import time
+import os
 import sys
-import traitement
+import threading
+from datetime import datetime
+from agregats import Paliers, choisir_palier, resumer_palier
+from anneau import AnneauEchantillons, capacite_pour
+from demon import ADRESSE_DEFAUT, EtatDemon, adresse_tcp, instantane_complet, interroger, liberer_socket, servir
+from ecrivain_csv import EcrivainCSV, fichiers_historique, lire_fenetre
+from index_temps import epoch_us_vers_iso, iso_vers_epoch_us, reconstruire_index
+from journal import JournalInstantanes, dernier_instantane, instantane_a
+from lecture_parallele import stats_en_parallele
+from planificateur import Planificateur
+from stockage_colonnes import MagasinColonnes, convertir_csv
+from sondes import REGISTRE, chronometrer, nouvelle_meta, selectionner
+from statistiques import StatsFlux, fusionner_stats, stats_depuis_colonnes, stats_depuis_lignes
+
+# psutil (via traitement), asyncio et flotte ne sont importés que par les modes
+# qui en ont besoin : --stats et les requêtes démarrent sans eux.
+
+# Période (en secondes) de chaque sonde en collecte continue (déclarée dans sondes.py)
+FREQUENCES = {nom: sonde.periode for nom, sonde in REGISTRE.items() if sonde.periode}
+
+# Libellés affichés par --stats (les autres colonnes gardent leur nom)
+LIBELLES = {"cpu_percent": "CPU", "mem_percent": "RAM"}
+
+
+def slug_disque(point_montage):
+    """Transforme un point de montage en nom de colonne ("/mnt/data" → "mnt_data")."""
+    slug = "".join(c if c.isalnum() else "_" for c in point_montage).strip("_")
+    return slug or "root"
 
 
 def octets_vers_go(octets):
@@ -42,115 +68,635 @@ def afficher_disques(data):
     print()
 
 
-def exporter_csv(metriques, fichier):
-    """Exporte les données essentielles dans un CSV."""
-    ligne = {
-        "timestamp": metriques["timestamp"],
-        "hostname": metriques["systeme"]["hostname"],
-        "cpu_percent": metriques["cpu"]["utilisation"],
-        "mem_total_gb": metriques["memoire"]["total"] / (1024 ** 3),
-        "mem_dispo_gb": metriques["memoire"]["disponible"] / (1024 ** 3),
-        "mem_percent": metriques["memoire"]["pourcentage"],
-        "disk_root_percent": metriques["disques"][0]["pourcentage"]
-    }
-
-    # On vérifie si le fichier existe
-    fichier_existe = False
-    try:
-        with open(fichier, "r"):
-            fichier_existe = True
-    except FileNotFoundError:
-        pass
+def afficher_processus(data):
+    print("=== Processus ===")
+    print("Par CPU :")
+    for p in data["par_cpu"]:
+        print(f"  {p['nom']} ({p['pid']}) : {p['cpu_percent']:.1f}%")
+    print("Par mémoire :")
+    for p in data["par_memoire"]:
+        print(f"  {p['nom']} ({p['pid']}) : {octets_vers_go(p['rss'])}")
+    print()
 
-    # On écrit la ligne CSV
-    with open(fichier, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=ligne.keys())
 
-        if not fichier_existe:
-            writer.writeheader()
+def afficher_rapport(metriques):
+    """Affiche un instantané complet (seulement les sections des sondes actives)."""
+    afficher_systeme(metriques["systeme"])
+    if metriques.get("cpu"):
+        afficher_cpu(metriques["cpu"])
+    if metriques.get("memoire"):
+        afficher_memoire(metriques["memoire"])
+    if metriques.get("disques"):
+        afficher_disques(metriques["disques"])
+    if metriques.get("processus"):
+        afficher_processus(metriques["processus"])
+
+
+def exporter_hote(statique, fichier):
+    """Enregistre les infos statiques de l'hôte une fois, sous sa clé."""
+    try:
+        with open(fichier, "r", encoding="utf-8") as f:
+            hotes = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        hotes = {}
 
-        writer.writerow(ligne)
+    infos = {k: v for k, v in statique.items() if k != "hote"}
+    if hotes.get(statique["hote"]) == infos:
+        return
+
+    hotes[statique["hote"]] = infos
+    with open(fichier, "w", encoding="utf-8") as f:
+        json.dump(hotes, f, indent=2)
+
+
+def preparer_ligne(metriques):
+    """Construit la ligne d'historique (données essentielles) d'un échantillon.
+
+    Les infos statiques (hostname, mémoire totale...) ne sont pas répétées :
+    la colonne "hote" renvoie vers hotes.json (voir exporter_hote).
+    """
+    ligne = {"timestamp": metriques["timestamp"], "hote": metriques["hote"]}
+    # Seules les sondes actives ont leurs colonnes (voir --sondes)
+    if "cpu" in metriques:
+        ligne["cpu_percent"] = metriques["cpu"]["utilisation"]
+    if "memoire" in metriques:
+        ligne["mem_dispo_gb"] = metriques["memoire"]["disponible"] / (1024 ** 3)
+        ligne["mem_percent"] = metriques["memoire"]["pourcentage"]
+    if metriques.get("disques"):
+        ligne["disk_root_percent"] = metriques["disques"][0]["pourcentage"]
+        # Une colonne par disque en plus du premier (déjà dans disk_root_percent)
+        for d in metriques["disques"][1:]:
+            ligne[f"disk_{slug_disque(d['point_montage'])}_percent"] = d["pourcentage"]
+    # Top-N des processus, quand la sonde est active
+    if "processus" in metriques:
+        for i, p in enumerate(metriques["processus"]["par_cpu"], 1):
+            ligne[f"proc_cpu_{i}_nom"] = p["nom"]
+            ligne[f"proc_cpu_{i}_percent"] = p["cpu_percent"]
+        for i, p in enumerate(metriques["processus"]["par_memoire"], 1):
+            ligne[f"proc_rss_{i}_nom"] = p["nom"]
+            ligne[f"proc_rss_{i}_mb"] = round(p["rss"] / 1024 ** 2, 1)
+    # Coût de la collecte : colonnes fixes, vides pour les sondes qui n'ont pas tourné
+    if "_meta" in metriques:
+        meta = metriques["_meta"]
+        for nom in REGISTRE:
+            ligne[f"meta_{nom}_ms"] = meta["durees_ms"].get(nom, "")
+        ligne["meta_total_ms"] = meta["total_ms"]
+        ligne["meta_erreurs"] = len(meta["erreurs"])
+        ligne["meta_disques_ignores"] = len(meta["disques_ignores"])
+    return ligne
+
+
+def exporter_csv(metriques, ecrivain):
+    """Exporte les données essentielles via un EcrivainCSV (ou un MagasinColonnes)."""
+    return ecrivain.ecrire(preparer_ligne(metriques))
 
 
 def exporter_json(metriques, fichier):
-    """Sauvegarde les métriques complètes dans un fichier JSON."""
+    """Sauvegarde les métriques complètes dans un fichier JSON (remplacé par le journal, voir journal.py)."""
     with open(fichier, "w", encoding="utf-8") as f:
         json.dump(metriques, f, indent=2)
 
 
-def collecter_en_continu(intervalle, nombre):
-    """Collecte les métriques en boucle (continuellement)."""
+def signaler_retard(tache, manques):
+    print(f"[Retard] {tache.nom} : {manques} tick(s) manqué(s)")
+
+
+def collecter_en_continu(intervalle, nombre, options_csv=None, stockage="csv", paliers=True,
+                         frequences=None, plan=None, observateurs=(), afficher=True, nb_processus=5,
+                         sondes=None, anneau=None):
+    """Collecte les métriques en boucle (continuellement).
+
+    Chaque sonde tourne à sa propre fréquence (FREQUENCES, modifiable avec
+    frequences) et garde sa dernière valeur ; toutes les `intervalle`
+    secondes, un échantillon est composé à partir de ces valeurs et
+    exporté. Le planificateur suit des échéances fixes : la grille ne
+    dérive pas et les ticks manqués sont signalés.
+
+    Le CSV reste ouvert pendant toute la session ; options_csv est passé
+    à EcrivainCSV (tampon, fsync, rotation...). Avec stockage="colonnes",
+    l'historique est écrit dans le magasin binaire historique_colonnes/.
+    Les paliers d'agrégation (1 min / 5 min / 1 h) sont tenus à jour au fil
+    de l'eau, sauf si paliers=False.
+
+    sondes limite la collecte à certaines sondes du registre (toutes par
+    défaut) ; nb_processus règle la taille du top des processus (0 pour
+    désactiver la sonde). Chaque observateur est appelé avec (metriques, ligne) après chaque
+    échantillon (une exception est affichée sans arrêter la collecte) ; plan permet de fournir le Planificateur pour l'arrêter
+    depuis un autre thread (mode démon).
+
+    Les derniers échantillons sont aussi gardés dans un anneau en mémoire
+    (AnneauEchantillons, créé pour couvrir 15 min si anneau n'est pas
+    fourni) : la console affiche ses moyennes 1 / 5 / 15 min sans relire
+    l'historique sur disque.
+    """
+    import traitement
+
+    frequences = {**FREQUENCES, **(frequences or {})}
+    selection = [s for s in selectionner(sondes) if s.nom != "processus" or nb_processus]
+    arguments = {"processus": (nb_processus,)}
+    # Un échantillon n'est exporté qu'une fois que chaque sonde a répondu
+    attendues = ["hote" if s.nom == "statique" else s.nom for s in selection]
+
+    if stockage == "colonnes":
+        ecrivain = MagasinColonnes("historique_colonnes")
+    else:
+        ecrivain = EcrivainCSV("historique.csv", **(options_csv or {}))
+    agregats = Paliers("historique") if paliers else None
+    if anneau is None:
+        anneau = AnneauEchantillons(capacite_pour(intervalle))
+
+    # Dernière valeur connue de chaque sonde, et coût des sondes depuis le dernier export
+    dernieres = {}
+    meta = nouvelle_meta()
     compteur = 0
-    try:
-        while nombre == 0 or compteur < nombre:
-            metriques = traitement.recuperer_tout()
-            print(f"[Collecte] {metriques['timestamp']}")
-
-            exporter_csv(metriques, "historique.csv")
-
-            compteur += 1
-            time.sleep(intervalle)
+    if plan is None:
+        plan = Planificateur(signaler_retard)
+
+    def sonder_hote(heure_prevue):
+        statique = chronometrer(meta, "statique", REGISTRE["statique"])
+        dernieres["hote"] = statique["hote"]
+        exporter_hote(statique, "hotes.json")
+
+    def sonder(nom, fonction, *args):
+        def executer(heure_prevue):
+            # Une sonde en erreur garde sa dernière valeur ; l'erreur part dans "_meta"
+            try:
+                dernieres[nom] = chronometrer(meta, nom, fonction, *args)
+            except Exception as e:
+                print(f"[Erreur] sonde {nom} : {e}")
+        return executer
+
+    def exporter(heure_prevue):
+        nonlocal compteur, meta
+        if not all(nom in dernieres for nom in attendues):
+            return  # une sonde n'a encore jamais répondu
+        metriques = {"timestamp": datetime.fromtimestamp(heure_prevue).isoformat(), **dernieres,
+                     "_meta": traitement.terminer_meta(meta)}
+        meta = nouvelle_meta()
+
+        ligne = preparer_ligne(metriques)
+        anneau.ajouter(int(heure_prevue * 1_000_000), ligne)
+        if afficher:
+            if "cpu_percent" in ligne:
+                print(f"[Collecte] {metriques['timestamp']} | CPU 1/5/15 min : "
+                      + " / ".join(f"{m:.1f}" for m in anneau.moyennes("cpu_percent")) + " %")
+            else:
+                print(f"[Collecte] {metriques['timestamp']}")
+        ecrivain.ecrire(ligne)
+        if agregats is not None:
+            agregats.ajouter(ligne)
+        for observateur in observateurs:
+            # un observateur en échec (journal, alertes, agent) n'arrête pas la collecte
+            try:
+                observateur(metriques, ligne)
+            except Exception as e:
+                print(f"[Erreur] observateur {getattr(observateur, '__qualname__', observateur)} : {e}")
+
+        compteur += 1
+        if nombre and compteur >= nombre:
+            plan.arreter()
+
+    for sonde in selection:
+        if sonde.nom == "statique":
+            plan.ajouter("hote", 0, sonder_hote, une_fois=True)
+        else:
+            plan.ajouter(sonde.nom, frequences[sonde.nom],
+                         sonder(sonde.nom, sonde, *arguments.get(sonde.nom, ())))
+    plan.ajouter("export", intervalle, exporter)
 
+    try:
+        plan.executer()
     except KeyboardInterrupt:
         print("\nArrêt manuel.")
+    finally:
+        ecrivain.fermer()
+        if agregats is not None:
+            agregats.fermer()
+
+    manques = {nom: r["manques"] for nom, r in plan.rapport().items() if r["manques"]}
+    if manques:
+        print("Ticks manqués :", ", ".join(f"{nom}={n}" for nom, n in manques.items()))
+
+
+def lancer_demon(adresse, intervalle, nombre, **options):
+    """Collecte en arrière-plan et répond aux requêtes locales (voir demon.py).
+
+    La collecte tourne dans un thread ; le serveur asyncio garde en mémoire
+    le dernier instantané et l'historique récent ; les fenêtres glissantes
+    sont lues directement dans l'anneau de la collecte.
+    """
+    import asyncio
+
+    # Vérifié avant de lancer la collecte : on ne remplace ni un fichier ni la socket d'un démon actif
+    if adresse_tcp(adresse) is None:
+        try:
+            liberer_socket(adresse)
+        except OSError as e:
+            print(f"[Erreur] {e}")
+            sys.exit(1)
+
+    etat = EtatDemon()
+    etat.statique = REGISTRE["statique"]()
+    etat.anneau = AnneauEchantillons(capacite_pour(intervalle))
+    plan = Planificateur(signaler_retard)
+    collecte = threading.Thread(
+        target=collecter_en_continu,
+        args=(intervalle, nombre),
+        kwargs={**options, "plan": plan, "afficher": False, "anneau": etat.anneau,
+                "observateurs": [etat.mettre_a_jour, *options.get("observateurs", ())]},
+        name="syswatch-collecte",
+    )
+    collecte.start()
+    print(f"[Démon] À l'écoute sur {adresse}")
+    try:
+        asyncio.run(servir(etat, adresse))
+    except KeyboardInterrupt:
+        print("\nArrêt du démon.")
+    finally:
+        plan.arreter()
+        collecte.join()
+
+
+def calculer_statistiques(source, debut_us=None, fin_us=None, coeurs=None):
+    """Retourne {colonne: StatsFlux} pour une source, en un seul passage.
+
+    source est un CSV (segments archivés compris), le dossier d'un
+    MagasinColonnes, ou un résultat partiel sauvegardé en JSON. Avec une
+    fenêtre [debut_us, fin_us], seules les lignes concernées sont lues
+    grâce à l'index temporel. Sans fenêtre, un CSV est découpé en morceaux
+    lus par `coeurs` processus (tous par défaut), puis les résultats fusionnés.
+    """
+    fenetre = debut_us is not None or fin_us is not None
+
+    if os.path.isdir(source):
+        return stats_depuis_colonnes(MagasinColonnes(source), None, debut_us, fin_us)
+
+    if source.endswith(".json"):
+        with open(source, "r", encoding="utf-8") as f:
+            return {c: StatsFlux.depuis_dict(d) for c, d in json.load(f).items()}
+
+    if fenetre:
+        return stats_depuis_lignes(lire_fenetre(source, debut_us, fin_us))
+
+    return stats_en_parallele(source, coeurs)
+
+
+def afficher_fenetre(source, debut_us=None, fin_us=None):
+    """Affiche CPU et RAM pour chaque échantillon de la fenêtre demandée."""
+    if os.path.isdir(source):
+        magasin = MagasinColonnes(source)
+        debut, fin = magasin.intervalle(debut_us, fin_us)
+        colonnes = [magasin.lire(c, debut, fin) for c in ("timestamp", "cpu_percent", "mem_percent")]
+        lignes = (
+            {"timestamp": epoch_us_vers_iso(t), "cpu_percent": c, "mem_percent": m}
+            for t, c, m in zip(*colonnes)
+        )
+    else:
+        lignes = lire_fenetre(source, debut_us, fin_us)
+
+    print("=== FENÊTRE ===")
+    for ligne in lignes:
+        print(f"{ligne['timestamp']} | CPU: {float(ligne['cpu_percent']):.2f}% | RAM: {float(ligne['mem_percent']):.2f}%")
+
+
+def afficher_resume_palier(nom, resume):
+    """Affiche les statistiques calculées à partir d'un palier d'agrégation."""
+    print(f"=== STATISTIQUES (palier {nom}) ===")
+    for metrique, r in resume.items():
+        unite = "%" if metrique.endswith("percent") else ""
+        print(f"{LIBELLES.get(metrique, metrique)} → Moyenne: {r['moyenne']:.2f}{unite}"
+              f" | Min: {r['min']:.2f}{unite} | Max: {r['max']:.2f}{unite} ({r['nombre']} valeurs)")
+
+
+def calculer_moyennes(*sources, sauvegarde=None, debut_us=None, fin_us=None, brut=False, coeurs=None):
+    """Affiche les statistiques de toutes les métriques, en mémoire constante.
+
+    Les résultats de plusieurs sources sont fusionnés ; sauvegarde permet
+    d'enregistrer le résultat partiel pour le fusionner plus tard. Sur une
+    longue fenêtre, le palier d'agrégation le plus grossier adapté est lu
+    à la place des données brutes (sauf si brut=True) : on obtient moyenne,
+    min et max, mais pas les percentiles.
+    """
+    trouvees = [s for s in sources if os.path.exists(s) or fichiers_historique(s)]
+    if not trouvees:
+        print(f"Aucun fichier {', '.join(sources)} trouvé.")
+        return
 
+    if not brut and not sauvegarde and trouvees == ["historique.csv"]:
+        palier = choisir_palier("historique", debut_us, fin_us)
+        if palier is not None:
+            nom, fichier = palier
+            afficher_resume_palier(nom, resumer_palier(fichier, debut_us, fin_us))
+            return
 
-def calculer_moyennes(fichier_csv):
-    """Affiche les statistiques CPU et RAM à partir du CSV."""
-    cpu = []
-    mem = []
-
-    try:
-        with open(fichier_csv, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
+    stats = fusionner_stats(*(calculer_statistiques(s, debut_us, fin_us, coeurs) for s in trouvees))
 
-            for ligne in reader:
-                cpu.append(float(ligne["cpu_percent"]))
-                mem.append(float(ligne["mem_percent"]))
+    if sauvegarde:
+        with open(sauvegarde, "w", encoding="utf-8") as f:
+            json.dump({c: flux.vers_dict() for c, flux in stats.items()}, f)
 
-    except FileNotFoundError:
-        print("Aucun fichier historique.csv trouvé.")
+    # Les rangs du top-N (proc_cpu_1_percent...) d'un ancien résultat partiel n'ont pas de sens : écartés
+    stats = {c: flux for c, flux in stats.items() if flux.nombre and (":" in c or not c.startswith("proc_"))}
+    if not stats:
+        print("Aucune donnée dans l'historique.")
         return
 
-    if not cpu:
-        print("Aucune donnée dans le CSV.")
-        return
+    # Les mesures par processus (proc_cpu:<nom>...) et le coût du collecteur sont affichés à part
+    processus = {c: flux for c, flux in stats.items() if ":" in c}
+    meta = {c: flux for c, flux in stats.items() if c.startswith("meta_")}
+    stats = {c: flux for c, flux in stats.items() if ":" not in c and c not in meta}
 
     print("=== STATISTIQUES ===")
-    print(f"CPU → Moyenne: {sum(cpu)/len(cpu):.2f}% | Min: {min(cpu):.2f}% | Max: {max(cpu):.2f}%")
-    print(f"RAM → Moyenne: {sum(mem)/len(mem):.2f}% | Min: {min(mem):.2f}% | Max: {max(mem):.2f}%")
+    for colonne, flux in stats.items():
+        r = flux.resume()
+        unite = "%" if colonne.endswith("percent") else ""
+        print(f"{LIBELLES.get(colonne, colonne)} → Moyenne: {r['moyenne']:.2f}{unite}"
+              f" | Écart-type: {r['ecart_type']:.2f}"
+              f" | Min: {r['min']:.2f}{unite} | Max: {r['max']:.2f}{unite}"
+              f" | p50: {r['p50']:.2f}{unite} | p95: {r['p95']:.2f}{unite} | p99: {r['p99']:.2f}{unite}"
+              f" ({r['nombre']} valeurs)")
+
+    if processus:
+        print("=== PROCESSUS LES PLUS GOURMANDS ===")
+        for type_mesure, unite in (("proc_cpu", "%"), ("proc_rss", " Mo")):
+            mesures = [(c.split(":", 1)[1], flux) for c, flux in processus.items() if c.startswith(type_mesure + ":")]
+            mesures.sort(key=lambda m: m[1].moyenne, reverse=True)
+            for nom, flux in mesures[:10]:
+                print(f"{type_mesure[5:].upper()} {nom} → Moyenne: {flux.moyenne:.2f}{unite}"
+                      f" | Max: {flux.max:.2f}{unite} (dans le top {flux.nombre} fois)")
+
+    if meta:
+        print("=== COÛT DU COLLECTEUR ===")
+        for colonne, flux in meta.items():
+            if colonne.endswith("_ms"):
+                r = flux.resume()
+                print(f"{colonne[5:-3]} → p50: {r['p50']:.2f} ms | p95: {r['p95']:.2f} ms"
+                      f" | p99: {r['p99']:.2f} ms | Max: {r['max']:.2f} ms ({r['nombre']} mesures)")
+        if "meta_erreurs" in meta:
+            print(f"Erreurs de sondes : {round(meta['meta_erreurs'].moyenne * meta['meta_erreurs'].nombre)}")
+        # compté à chaque échantillon : le même disque ignoré revient à chaque ligne, on n'additionne pas
+        if "meta_disques_ignores" in meta:
+            print(f"Disques ignorés (max par échantillon) : {round(meta['meta_disques_ignores'].max)}")
 
 
 if __name__ == "__main__":
 
     args = sys.argv
 
-    # COLLECTE CONTINUE
-    if "--continu" in args:
-        intervalle = 5
-        nombre = 0
+    # STOCKAGE : "csv" (historique.csv) ou "colonnes" (historique_colonnes/)
+    stockage = "csv"
+    if "--stockage" in args:
+        stockage = args[args.index("--stockage") + 1]
+    source = "historique_colonnes" if stockage == "colonnes" else "historique.csv"
+
+    # Nombre de processus pour lire un gros CSV (--stats, --convertir) : tous les cœurs par défaut
+    coeurs = None
+    if "--coeurs" in args:
+        coeurs = int(args[args.index("--coeurs") + 1])
+
+    # CONVERSION DE L'HISTORIQUE CSV VERS LE MAGASIN BINAIRE
+    if "--convertir" in args:
+        nombre = convertir_csv("historique.csv", "historique_colonnes", coeurs=coeurs)
+        print(f"{nombre} lignes converties dans historique_colonnes/")
+        sys.exit()
 
-        if "--intervalle" in args:
-            intervalle = int(args[args.index("--intervalle") + 1])
+    # RECONSTRUCTION DE L'INDEX TEMPOREL DES SEGMENTS CSV NON COMPRESSÉS
+    if "--reindexer" in args:
+        for segment in fichiers_historique("historique.csv"):
+            if not segment.endswith(".gz"):
+                print(f"{segment} : {len(reconstruire_index(segment))} entrées d'index")
+        sys.exit()
 
-        if "--nombre" in args:
-            nombre = int(args[args.index("--nombre") + 1])
+    # CLIENT DU DÉMON : même rapport que la collecte simple, sans rien mesurer
+    adresse = ADRESSE_DEFAUT
+    if "--adresse" in args:
+        adresse = args[args.index("--adresse") + 1]  # socket Unix ou hote:port
+    if "--client" in args and "--fenetres" in args:
+        fenetres = interroger("fenetres", adresse)
+        if fenetres is None:
+            print("Le démon n'a pas encore collecté de données.")
+            sys.exit(1)
+        for duree, colonnes in fenetres.items():
+            print(f"=== {int(duree) // 60} MIN ===")
+            for colonne, resume in colonnes.items():
+                if resume["nombre"]:
+                    print(f"{LIBELLES.get(colonne, colonne)} : moyenne {resume['moyenne']:.2f} | "
+                          f"min {resume['min']:.2f} | max {resume['max']:.2f} ({resume['nombre']} échantillons)")
+        sys.exit()
+    if "--client" in args:
+        metriques = interroger("dernier", adresse)
+        if metriques is None:
+            print("Le démon n'a pas encore collecté de données.")
+            sys.exit(1)
+        afficher_rapport(metriques)
+        sys.exit()
+
+    # AGRÉGATEUR DE FLOTTE : reçoit les agents et répond aux requêtes de flotte
+    if "--agregateur" in args:
+        import asyncio
+        from flotte import Agregateur, servir_agregateur
+        agregateur = Agregateur("flotte")
+        print(f"[Agrégateur] À l'écoute sur {adresse}")
+        try:
+            asyncio.run(servir_agregateur(agregateur, adresse))
+        except KeyboardInterrupt:
+            print("\nArrêt de l'agrégateur.")
+        except OSError as e:
+            print(f"[Erreur] {e}")
+            sys.exit(1)
+        sys.exit()
+
+    # REQUÊTE DE FLOTTE (ex : --flotte "top cpu_percent 10", --flotte hotes)
+    if "--flotte" in args:
+        print(json.dumps(interroger(args[args.index("--flotte") + 1], adresse), indent=2))
+        sys.exit()
+
+    # JOURNAL DES INSTANTANÉS : dernier instantané, ou celui en vigueur à un instant donné
+    if "--dernier" in args or "--instantane" in args:
+        if "--instantane" in args:
+            metriques = instantane_a("collectes.ndjson", iso_vers_epoch_us(args[args.index("--instantane") + 1]))
+        else:
+            metriques = dernier_instantane("collectes.ndjson")
+        if metriques is None:
+            print("Aucun instantané dans le journal collectes.ndjson.")
+            sys.exit(1)
+        print(f"Instantané du {metriques['timestamp']}\n")
+        afficher_rapport(metriques)
+        sys.exit()
 
-        collecter_en_continu(intervalle, nombre)
+    # LISTE DES SONDES DU REGISTRE
+    if "--lister-sondes" in args:
+        for nom, sonde in REGISTRE.items():
+            periode = f"toutes les {sonde.periode:g} s" if sonde.periode else "une fois"
+            etat = "disponible" if sonde.disponible() else f"indisponible (requiert {', '.join(sonde.modules)})"
+            print(f"{nom} : {periode}, dépend de [{', '.join(sonde.dependances)}], {etat}")
         sys.exit()
 
+    # FENÊTRE DE TEMPS (ex : --depuis 2025-12-15T14:00 --jusqu-a 2025-12-15T14:05)
+    debut_us = fin_us = None
+    if "--depuis" in args:
+        debut_us = iso_vers_epoch_us(args[args.index("--depuis") + 1])
+    if "--jusqu-a" in args:
+        fin_us = iso_vers_epoch_us(args[args.index("--jusqu-a") + 1])
+
     # MODE STATISTIQUES
     if "--stats" in args:
-        calculer_moyennes("historique.csv")
+        sources = [source]
+        if "--sources" in args:
+            sources = args[args.index("--sources") + 1].split(",")
+        sauvegarde = None
+        if "--sauver-stats" in args:
+            sauvegarde = args[args.index("--sauver-stats") + 1]
+        calculer_moyennes(*sources, sauvegarde=sauvegarde, debut_us=debut_us, fin_us=fin_us,
+                          brut="--brut" in args, coeurs=coeurs)
         sys.exit()
 
-    # COLLECTE SIMPLE
-    metriques = traitement.recuperer_tout()
+    # ANALYSE VECTORISÉE D'UNE COLONNE (NumPy) : --analyse disk_root_percent --fenetre 120
+    if "--analyse" in args:
+        try:
+            import analyse
+        except ImportError:
+            print("Le mode --analyse nécessite NumPy (pip install numpy).")
+            sys.exit(1)
+        colonne = args[args.index("--analyse") + 1]
+        reglages = {}
+        for option, cle, conversion in (("--fenetre", "fenetre", int), ("--ewma", "alpha", float),
+                                        ("--percentile", "q", float), ("--seuil-z", "seuil_z", float)):
+            if option in args:
+                reglages[cle] = conversion(args[args.index(option) + 1])
+        resultats = analyse.analyser(source, colonne, debut_us=debut_us, fin_us=fin_us, **reglages)
+        analyse.afficher_analyse(colonne, resultats)
+        if "--sauver-analyse" in args:
+            analyse.sauver_analyse(args[args.index("--sauver-analyse") + 1], resultats)
+        sys.exit()
 
-    afficher_systeme(metriques["systeme"])
-    afficher_cpu(metriques["cpu"])
-    afficher_memoire(metriques["memoire"])
-    afficher_disques(metriques["disques"])
+    # REQUÊTE SUR UNE FENÊTRE DE TEMPS
+    if debut_us is not None or fin_us is not None:
+        afficher_fenetre(source, debut_us, fin_us)
+        sys.exit()
+
+    # SONDES ACTIVES (ex : --sondes cpu,memoire pour un instantané moins coûteux)
+    sondes_choisies = None
+    if "--sondes" in args:
+        sondes_choisies = args[args.index("--sondes") + 1].split(",")
+    try:
+        noms_sondes = [sonde.nom for sonde in selectionner(sondes_choisies)]
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    # À partir d'ici on mesure : psutil est importé
+    import traitement
+
+    # JOURNAL : compression des segments archivés ("aucune" pour les garder en clair)
+    options_journal = {}
+    if "--journal-compression" in args:
+        compression = args[args.index("--journal-compression") + 1]
+        options_journal["compression"] = None if compression == "aucune" else compression
+    if "--journal-cle" in args:
+        options_journal["intervalle_cle"] = int(args[args.index("--journal-cle") + 1])
+
+    # ÉCHANTILLONNEUR CPU (activé d'office en collecte continue)
+    if "cpu" in noms_sondes and ("--echantillonneur" in args or "--continu" in args or "--demon" in args):
+        fenetre_cpu = 1.0
+        if "--fenetre-cpu" in args:
+            fenetre_cpu = float(args[args.index("--fenetre-cpu") + 1])
+        traitement.activer_echantillonneur(fenetre_cpu)
+
+    # SONDE DISQUES PARALLÈLE (délai global par collecte, filtre de types)
+    delai_disques = 2.0
+    if "--delai-disques" in args:
+        delai_disques = float(args[args.index("--delai-disques") + 1])
+    types_exclus = None
+    if "--exclure-fs" in args:
+        types_exclus = args[args.index("--exclure-fs") + 1].split(",")  # ex : reseau,tmpfs
+    if "disques" in noms_sondes:
+        traitement.activer_sonde_disques(delai_disques, types_exclus)
+
+    # COLLECTE CONTINUE (ou DÉMON : collecte continue + requêtes locales)
+    if "--continu" in args or "--demon" in args:
+        intervalle = 5
+        nombre = 0
+
+        if "--intervalle" in args:
+            intervalle = float(args[args.index("--intervalle") + 1])
 
-    exporter_csv(metriques, "historique.csv")
-    exporter_json(metriques, "derniere_collecte.json")
+        if "--nombre" in args:
+            nombre = int(args[args.index("--nombre") + 1])
+
+        options_csv = {"compresser": "--gzip" in args}
+        if "--tampon" in args:
+            options_csv["taille_tampon"] = int(args[args.index("--tampon") + 1])
+        if "--fsync" in args:
+            options_csv["fsync"] = args[args.index("--fsync") + 1]
+        if "--rotation-mo" in args:
+            options_csv["taille_max"] = int(float(args[args.index("--rotation-mo") + 1]) * 1024 ** 2)
+        if "--rotation-heures" in args:
+            options_csv["duree_max"] = float(args[args.index("--rotation-heures") + 1]) * 3600
+
+        # ex : --frequences cpu=1,memoire=5,disques=60
+        frequences = {}
+        if "--frequences" in args:
+            for couple in args[args.index("--frequences") + 1].split(","):
+                nom, periode = couple.split("=")
+                frequences[nom] = float(periode)
+
+        nb_processus = 5
+        if "--processus" in args:
+            nb_processus = int(args[args.index("--processus") + 1])
+
+        options = {"options_csv": options_csv, "stockage": stockage,
+                   "paliers": "--sans-paliers" not in args, "frequences": frequences,
+                   "nb_processus": nb_processus, "sondes": sondes_choisies}
+
+        # Chaque échantillon, complété des infos statiques, part aussi dans le journal
+        journal = JournalInstantanes("collectes.ndjson", **options_journal)
+        statique = REGISTRE["statique"]()
+        options["observateurs"] = [lambda metriques, ligne: journal.ajouter(instantane_complet(statique, metriques))]
+
+        # ALERTES : règles à seuil évaluées sur chaque échantillon (--alertes regles.json ou .yaml)
+        moteur_alertes = None
+        if "--alertes" in args:
+            from alertes import charger_alertes
+            try:
+                moteur_alertes = charger_alertes(args[args.index("--alertes") + 1])
+            except ImportError:
+                print("Les règles en YAML nécessitent PyYAML (pip install pyyaml), ou les écrire en JSON.")
+                sys.exit(1)
+            except (OSError, ValueError) as e:
+                print(f"Règles d'alerte invalides : {e}")
+                sys.exit(1)
+            options["observateurs"].append(moteur_alertes.evaluer)
+
+        # AGENT : pousse aussi les échantillons vers un agrégateur (--agent hote:port)
+        agent = None
+        if "--agent" in args:
+            from flotte import Agent
+            hote_agent = None
+            if "--agent-hote" in args:
+                hote_agent = args[args.index("--agent-hote") + 1]
+            agent = Agent(args[args.index("--agent") + 1], hote=hote_agent)
+            options["observateurs"].append(agent.envoyer)
+
+        try:
+            if "--demon" in args:
+                lancer_demon(adresse, intervalle, nombre, **options)
+            else:
+                collecter_en_continu(intervalle, nombre, **options)
+        finally:
+            journal.fermer()
+            if moteur_alertes is not None:
+                moteur_alertes.fermer()
+            if agent is not None:
+                agent.fermer()
+        sys.exit()
+
+    # COLLECTE SIMPLE
+    metriques = traitement.recuperer_tout(sondes_choisies)
+    afficher_rapport(metriques)
+
+    exporter_hote(traitement.recuperer_statique(), "hotes.json")
+    with EcrivainCSV("historique.csv") as ecrivain:
+        exporter_csv(metriques, ecrivain)
+    with JournalInstantanes("collectes.ndjson", **options_journal) as journal:
+        journal.ajouter(metriques)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules de syswatch s'importent par leur nom (import statistiques...), comme depuis syswatch_v3.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
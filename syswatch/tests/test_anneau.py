@@ -0,0 +1,74 @@
+import math
+import random
+
+import pytest
+
+from anneau import AnneauEchantillons, _FileMonotone
+
+
+def _verifier(anneau, echantillons, duree):
+    """Compare la fenêtre de l'anneau au calcul direct sur les échantillons encore dedans."""
+    temps_fin = echantillons[-1][0]
+    dedans = [
+        valeur for numero, (temps_us, valeur) in enumerate(echantillons)
+        if numero >= len(echantillons) - anneau.capacite and temps_us > temps_fin - duree * 1_000_000
+        and not math.isnan(valeur)
+    ]
+    resume = anneau.resume(duree)["cpu_percent"]
+    assert resume["nombre"] == len(dedans)
+    if dedans:
+        assert resume["min"] == min(dedans)
+        assert resume["max"] == max(dedans)
+        assert resume["moyenne"] == pytest.approx(sum(dedans) / len(dedans))
+    else:
+        assert math.isnan(resume["min"]) and math.isnan(resume["max"])
+
+
+@pytest.mark.parametrize("capacite", [8, 40])
+def test_min_max_apres_expiration(capacite):
+    # fenêtres de 10 s et 30 s, un échantillon par seconde environ : avec 8 cases,
+    # c'est la capacité qui tronque ; avec 40, ce sont les durées
+    rng = random.Random(capacite)
+    anneau = AnneauEchantillons(capacite, colonnes=("cpu_percent",), fenetres=(10, 30))
+    echantillons = []
+    temps_us = 0
+    for numero in range(500):
+        temps_us += rng.choice((500_000, 1_000_000, 1_000_000, 3_000_000))
+        if numero % 37 == 0:
+            valeur = math.nan  # valeur absente
+        elif numero < 100:
+            valeur = float(100 - numero)  # décroissant : le max sort à chaque pas
+        else:
+            valeur = float(rng.randint(0, 100))  # avec des égalités
+        echantillons.append((temps_us, valeur))
+        anneau.ajouter(temps_us, {"cpu_percent": "" if math.isnan(valeur) else valeur})
+        for duree in (10, 30):
+            _verifier(anneau, echantillons, duree)
+
+
+def test_fenetre_videe_par_un_long_silence():
+    anneau = AnneauEchantillons(16, colonnes=("cpu_percent",), fenetres=(10,))
+    for seconde in range(5):
+        anneau.ajouter(seconde * 1_000_000, {"cpu_percent": 50 + seconde})
+    anneau.ajouter(100 * 1_000_000, {"cpu_percent": ""})
+
+    resume = anneau.resume(10)["cpu_percent"]
+    assert resume["nombre"] == 0
+    assert math.isnan(resume["min"]) and math.isnan(resume["max"])
+
+
+def test_file_monotone_garde_le_minimum_apres_retrait():
+    valeurs = [5.0, 3.0, 4.0, 1.0, 2.0, 6.0]
+    file = _FileMonotone(len(valeurs), plus_petit=True)
+    for numero, valeur in enumerate(valeurs):
+        file.ajouter(numero, valeur, valeurs)
+    assert file.extremum(valeurs) == 1.0
+
+    # les échantillons 0 à 3 sortent dans l'ordre : il reste [2.0, 6.0]
+    for numero in range(4):
+        file.retirer(numero)
+    assert file.extremum(valeurs) == 2.0
+    file.retirer(4)
+    assert file.extremum(valeurs) == 6.0
+    file.retirer(5)
+    assert math.isnan(file.extremum(valeurs))
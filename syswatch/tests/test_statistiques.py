@@ -0,0 +1,81 @@
+import math
+import random
+
+import pytest
+
+from statistiques import Croquis, StatsFlux
+
+
+def _valeurs(graine, nombre=5000):
+    """Valeurs étalées sur plusieurs ordres de grandeur, avec des zéros et des négatifs."""
+    rng = random.Random(graine)
+    valeurs = [rng.lognormvariate(2, 1.5) for _ in range(nombre)]
+    valeurs += [0.0] * (nombre // 50)
+    valeurs += [-rng.expovariate(0.1) for _ in range(nombre // 10)]
+    rng.shuffle(valeurs)
+    return valeurs
+
+
+def _quantile_exact(valeurs, q):
+    # même rang que Croquis.quantile : la valeur de rang q * (n - 1)
+    triees = sorted(valeurs)
+    return triees[int(q * (len(triees) - 1))]
+
+
+@pytest.mark.parametrize("precision", [0.01, 0.05])
+def test_croquis_quantiles_a_la_precision_pres(precision):
+    valeurs = _valeurs(1)
+    croquis = Croquis(precision)
+    for valeur in valeurs:
+        croquis.ajouter(valeur)
+
+    assert croquis.nombre == len(valeurs)
+    for q in (0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0):
+        exact = _quantile_exact(valeurs, q)
+        assert croquis.quantile(q) == pytest.approx(exact, rel=precision * (1 + 1e-9), abs=1e-12)
+
+
+def test_croquis_vide():
+    assert Croquis().quantile(0.5) is None
+
+
+def test_croquis_fusion_de_precisions_differentes():
+    with pytest.raises(ValueError):
+        Croquis(0.01).fusionner(Croquis(0.02))
+
+
+def test_statsflux_fusion_egale_un_seul_passage():
+    valeurs = _valeurs(2)
+    tout = StatsFlux()
+    for valeur in valeurs:
+        tout.ajouter(valeur)
+
+    coupure = len(valeurs) // 3
+    debut, fin = StatsFlux(), StatsFlux()
+    for valeur in valeurs[:coupure]:
+        debut.ajouter(valeur)
+    for valeur in valeurs[coupure:]:
+        fin.ajouter(valeur)
+    fusion = debut.fusionner(fin).fusionner(StatsFlux())
+
+    assert fusion.nombre == tout.nombre
+    assert fusion.moyenne == pytest.approx(tout.moyenne, rel=1e-9)
+    assert fusion.variance == pytest.approx(tout.variance, rel=1e-9)
+    assert (fusion.min, fusion.max) == (tout.min, tout.max)
+    # les seaux s'additionnent : les quantiles sont exactement ceux du passage unique
+    assert fusion.croquis.positifs == tout.croquis.positifs
+    assert fusion.croquis.negatifs == tout.croquis.negatifs
+    assert fusion.croquis.zeros == tout.croquis.zeros
+    for cle in ("p50", "p95", "p99"):
+        assert fusion.resume()[cle] == tout.resume()[cle]
+
+
+def test_statsflux_ignore_nan_et_survit_a_la_serialisation():
+    stats = StatsFlux()
+    for valeur in (1.0, math.nan, 3.0, 8.0):
+        stats.ajouter(valeur)
+    copie = StatsFlux.depuis_dict(stats.vers_dict())
+
+    assert stats.nombre == 3
+    assert stats.moyenne == pytest.approx(4.0)
+    assert copie.resume() == stats.resume()
@@ -1,10 +1,54 @@
-import platform
+import hashlib
+import heapq
 import psutil
+import time
 from datetime import datetime
 
+from sondes import chronometrer, nouvelle_meta, selectionner
+
+# Ce module n'est importé que si une sonde est activée (voir sondes.py) ;
+# platform, l'échantillonneur et la sonde disques ne sont importés qu'à l'usage.
+
+# Échantillonneur CPU de fond, actif seulement après activer_echantillonneur()
+_echantillonneur = None
+# Sonde disques parallèle, active seulement après activer_sonde_disques()
+_sonde_disques = None
+# Infos statiques de l'hôte, calculées une seule fois (voir recuperer_statique)
+_statique = None
+# Temps CPU de chaque processus au tick précédent : pid -> (create_time, temps CPU, instant)
+_suivi_processus = {}
+# Points de montage ignorés au dernier passage de recuperer_disques() (sans sonde parallèle)
+_disques_ignores = []
+
+
+def terminer_meta(meta):
+    """Complète la section "_meta" (disques ignorés, durée totale) et la retourne."""
+    meta["disques_ignores"] = disques_ignores()
+    meta["total_ms"] = round(sum(meta["durees_ms"].values()), 3)
+    return meta
+
+
+def activer_echantillonneur(fenetre=1.0, periode=0.1):
+    """Active le mode échantillonneur : recuperer_cpu() ne bloque plus 1 s."""
+    global _echantillonneur
+    from echantillonneur import EchantillonneurCPU
+    if _echantillonneur is not None:
+        _echantillonneur.arreter()
+    _echantillonneur = EchantillonneurCPU(fenetre, periode).demarrer()
+    return _echantillonneur
+
+
+def desactiver_echantillonneur():
+    """Revient à la mesure bloquante psutil.cpu_percent(interval=1)."""
+    global _echantillonneur
+    if _echantillonneur is not None:
+        _echantillonneur.arreter()
+        _echantillonneur = None
+
 
 def recuperer_info_systeme():
     """Retourne les infos système sans les afficher."""
+    import platform
     return {
         "os": platform.system(),
         "version": platform.release(),
@@ -13,15 +57,62 @@ def recuperer_info_systeme():
     }
 
 
+def cle_hote(systeme):
+    """Retourne une clé courte et stable qui identifie l'hôte dans les exports."""
+    texte = f"{systeme['hostname']}|{systeme['os']}|{systeme['architecture']}"
+    return hashlib.sha1(texte.encode("utf-8")).hexdigest()[:8]
+
+
+def recuperer_statique():
+    """Retourne les infos qui ne changent pas pendant la vie du processus.
+
+    Le résultat est mis en cache ; invalider_statique() force un nouveau calcul.
+    """
+    global _statique
+    if _statique is None:
+        systeme = recuperer_info_systeme()
+        _statique = {
+            "hote": cle_hote(systeme),
+            "systeme": systeme,
+            "coeurs_physiques": psutil.cpu_count(logical=False),
+            "coeurs_logiques": psutil.cpu_count(logical=True),
+            "memoire_totale": psutil.virtual_memory().total
+        }
+    return _statique
+
+
+def invalider_statique():
+    """Vide le cache des infos statiques (ex : après un changement de nom d'hôte)."""
+    global _statique
+    _statique = None
+
+
+def recuperer_utilisation_cpu():
+    """Retourne uniquement l'utilisation CPU (partie dynamique)."""
+    if _echantillonneur is None:
+        return {"utilisation": psutil.cpu_percent(interval=1)}
+    mesure = _echantillonneur.lire()
+    return {"utilisation": mesure["utilisation"], "par_coeur": mesure["par_coeur"]}
+
+
 def recuperer_cpu():
     """Retourne les infos sur le CPU."""
+    statique = recuperer_statique()
     return {
-        "coeurs_physiques": psutil.cpu_count(logical=False),
-        "coeurs_logiques": psutil.cpu_count(logical=True),
-        "utilisation": psutil.cpu_percent(interval=1)
+        "coeurs_physiques": statique["coeurs_physiques"],
+        "coeurs_logiques": statique["coeurs_logiques"],
+        **recuperer_utilisation_cpu()
     }
 
 
+def activer_sonde_disques(delai=2.0, types_exclus=None, types_inclus=None):
+    """Active la sonde disques parallèle : recuperer_disques() répond en temps borné."""
+    global _sonde_disques
+    from sonde_disques import SondeDisques
+    _sonde_disques = SondeDisques(delai, types_exclus=types_exclus, types_inclus=types_inclus)
+    return _sonde_disques
+
+
 def recuperer_memoire():
     """Retourne les infos mémoire."""
     mem = psutil.virtual_memory()
@@ -32,10 +123,73 @@ def recuperer_memoire():
     }
 
 
+def recuperer_utilisation_memoire():
+    """Retourne uniquement la partie dynamique des infos mémoire."""
+    mem = psutil.virtual_memory()
+    return {
+        "disponible": mem.available,
+        "pourcentage": mem.percent
+    }
+
+
+def recuperer_processus(nombre=5):
+    """Retourne les `nombre` processus les plus gourmands en CPU et en mémoire (RSS).
+
+    Le CPU d'un processus est calculé à partir de la différence de temps CPU
+    depuis le tick précédent (en % d'un cœur, comme top), sans attente par
+    processus. À la première observation d'un processus, on prend sa moyenne
+    depuis son démarrage.
+    """
+    global _suivi_processus
+    maintenant = time.monotonic()
+    epoch = time.time()
+    suivi = {}
+    processus = []
+
+    # Avec attrs, psutil lit chaque processus dans un seul oneshot()
+    for p in psutil.process_iter(["pid", "name", "cpu_times", "memory_info", "create_time"]):
+        info = p.info
+        if info["cpu_times"] is None or info["memory_info"] is None:
+            continue  # accès refusé
+        temps_cpu = info["cpu_times"].user + info["cpu_times"].system
+        suivi[info["pid"]] = (info["create_time"], temps_cpu, maintenant)
+
+        precedent = _suivi_processus.get(info["pid"])
+        if precedent is not None and precedent[0] == info["create_time"] and maintenant > precedent[2]:
+            cpu = (temps_cpu - precedent[1]) / (maintenant - precedent[2]) * 100
+        else:
+            duree = epoch - (info["create_time"] or epoch)
+            cpu = temps_cpu / duree * 100 if duree > 0 else 0.0
+        processus.append((round(cpu, 1), info["memory_info"].rss, info["pid"], info["name"] or "?"))
+
+    # Les processus disparus sont oubliés
+    _suivi_processus = suivi
+
+    def decrire(p):
+        return {"pid": p[2], "nom": p[3], "cpu_percent": p[0], "rss": p[1]}
+
+    return {
+        "par_cpu": [decrire(p) for p in heapq.nlargest(nombre, processus, key=lambda p: p[0])],
+        "par_memoire": [decrire(p) for p in heapq.nlargest(nombre, processus, key=lambda p: p[1])]
+    }
+
+
+def disques_ignores():
+    """Points de montage ignorés par la dernière collecte des disques : [{point_montage, raison}]."""
+    if _sonde_disques is not None:
+        return list(_sonde_disques.derniers_ignores)
+    return list(_disques_ignores)
+
+
 def recuperer_disques():
     """Retourne les infos disques sous forme d'une liste."""
+    global _disques_ignores
+    if _sonde_disques is not None:
+        return _sonde_disques.recuperer()
+
     partitions = psutil.disk_partitions()
     resultat = []
+    ignores = []
 
     for p in partitions:
         try:
@@ -47,17 +201,45 @@ def recuperer_disques():
                 "pourcentage": usage.percent
             })
         except PermissionError:
-            continue
+            ignores.append({"point_montage": p.mountpoint, "raison": "permission refusée"})
 
+    _disques_ignores = ignores
     return resultat
 
 
-def recuperer_tout():
-    """Collecte toutes les informations et les regroupe dans un dictionnaire."""
+def recuperer_dynamique():
+    """Retourne un échantillon léger : seulement ce qui change d'une collecte à l'autre.
+
+    Les infos statiques sont référencées par la clé "hote" (voir recuperer_statique).
+    """
+    meta = nouvelle_meta()
     return {
         "timestamp": datetime.now().isoformat(),
-        "systeme": recuperer_info_systeme(),
-        "cpu": recuperer_cpu(),
-        "memoire": recuperer_memoire(),
-        "disques": recuperer_disques()
+        "hote": chronometrer(meta, "statique", recuperer_statique)["hote"],
+        "cpu": chronometrer(meta, "cpu", recuperer_utilisation_cpu),
+        "memoire": chronometrer(meta, "memoire", recuperer_utilisation_memoire),
+        "disques": chronometrer(meta, "disques", recuperer_disques),
+        "_meta": terminer_meta(meta)
+    }
+
+
+def recuperer_tout(sondes=None):
+    """Collecte toutes les informations et les regroupe dans un dictionnaire.
+
+    Les sondes viennent du registre (voir sondes.selectionner) ; sondes
+    limite la collecte à certaines d'entre elles (ex : ["cpu", "memoire"]) ;
+    les infos statiques sont toujours présentes. La section "_meta" donne
+    le coût de la collecte elle-même (voir chronometrer).
+    """
+    meta = nouvelle_meta()
+    statique = chronometrer(meta, "statique", recuperer_statique)
+    metriques = {
+        "timestamp": datetime.now().isoformat(),
+        "hote": statique["hote"],
+        "systeme": statique["systeme"]
     }
+    for sonde in selectionner(sondes):
+        if sonde.nom != "statique":
+            metriques[sonde.nom] = chronometrer(meta, sonde.nom, sonde.charger_complete())
+    metriques["_meta"] = terminer_meta(meta)
+    return metriques